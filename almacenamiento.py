@@ -0,0 +1,271 @@
+# almacenamiento.py
+
+"""
+Caché en disco del dataset ya limpio, en formato columnar (Parquet).
+Cada entrada se identifica con la huella del archivo fuente y la versión de las reglas de limpieza,
+así un proceso reiniciado o una segunda réplica cargan el resultado sin volver a limpiar.
+Una entrada es un archivo, o un directorio de partes cuando se armó agregando filas a otra entrada;
+a su lado quedan los hashes de fila, el cubo, los pronósticos, el tamaño del archivo fuente y, con el
+backend SQLite, la base de consultas (<huella>.*).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Directorio compartido por todos los procesos del servidor; se puede cambiar por variable de entorno.
+DIRECTORIO_CACHE = os.environ.get("DELITOS_CACHE_DIR", ".cache_delitos")
+# Entradas que se conservan; las menos usadas recientemente se eliminan al guardar una nueva.
+MAX_ENTRADAS_CACHE = int(os.environ.get("DELITOS_CACHE_MAX_ENTRADAS", "3"))
+
+
+def ruta_cache(huella: str) -> str:
+    return os.path.join(DIRECTORIO_CACHE, f"{huella}.parquet")
+
+
+def _partes(ruta: str) -> List[str]:
+    # Las partes de una entrada directorio se leen en orden de nombre (parte-00000, parte-00001, ...).
+    if not os.path.isdir(ruta): return [ruta]
+    return [os.path.join(ruta, nombre) for nombre in sorted(os.listdir(ruta)) if nombre.startswith("parte-")]
+
+
+def leer_attrs_cache(huella: str) -> Dict[str, Any]:
+    """attrs guardados con la entrada de `huella` (formato de fecha, duplicados eliminados), sin leer las filas."""
+    ruta = ruta_cache(huella)
+    if os.path.isdir(ruta):
+        with open(os.path.join(ruta, "_attrs.json"), encoding="utf-8") as f: return json.load(f)
+    # Se leen del pie del archivo: ahí también quedan los que guardar_cache_por_bloques agrega al cerrar,
+    # que read_parquet no devuelve porque no son parte del esquema.
+    pie = pq.read_metadata(ruta).metadata or {}
+    return json.loads(pie[b"PANDAS_ATTRS"]) if b"PANDAS_ATTRS" in pie else {}
+
+
+def leer_cache(huella: str) -> Optional[pd.DataFrame]:
+    """Devuelve el dataset limpio guardado para `huella`, o None si no existe."""
+    ruta = ruta_cache(huella)
+    try:
+        df = pd.read_parquet(ruta)
+        df.attrs.update(leer_attrs_cache(huella))
+    except (FileNotFoundError, OSError, ValueError, pa.ArrowException):
+        return None
+    # Se actualiza la fecha de uso para que el desalojo sea por uso reciente.
+    try: os.utime(ruta)
+    except OSError: pass
+    return df
+
+
+def leer_cache_por_bloques(huella: str, filas_bloque: int) -> Iterator[pd.DataFrame]:
+    """
+    Entrega la entrada de `huella` en bloques de hasta `filas_bloque` filas, parte por parte, sin cargarla
+    entera. Los tipos salen como en leer_cache, pero las categorías de cada bloque son solo las suyas.
+    """
+    for parte in _partes(ruta_cache(huella)):
+        for lote in pq.ParquetFile(parte).iter_batches(batch_size=filas_bloque):
+            yield lote.to_pandas()
+
+
+def guardar_cache(huella: str, df: pd.DataFrame) -> bool:
+    """
+    Guarda el dataset limpio de forma atómica (archivo temporal + rename), para que otra réplica
+    nunca lea una entrada a medio escribir. Devuelve False si el frame no se pudo serializar.
+    """
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=DIRECTORIO_CACHE, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        df.to_parquet(ruta_temporal, index=False)
+        os.replace(ruta_temporal, ruta_cache(huella))
+    except (OSError, ValueError, TypeError, pa.ArrowException):
+        # Columnas con tipos mezclados no caben en Parquet: se sigue sin caché.
+        if os.path.exists(ruta_temporal): os.remove(ruta_temporal)
+        return False
+    desalojar_entradas_antiguas()
+    return True
+
+
+def guardar_cache_por_bloques(huella: str, bloques: Iterable[pd.DataFrame]) -> int:
+    """
+    Escribe los bloques en la entrada de caché a medida que llegan, sin juntar el dataset en memoria.
+    El esquema lo fija el primer bloque y los attrs los del último (los acumulados, como el conteo
+    de duplicados), igual que los guardaría to_parquet. Devuelve el número de filas escritas.
+    """
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=DIRECTORIO_CACHE, suffix=".tmp")
+    os.close(descriptor)
+    escritor: Optional[pq.ParquetWriter] = None
+    filas = 0
+    attrs: Dict[str, Any] = {}
+    try:
+        for bloque in bloques:
+            esquema = escritor.schema if escritor is not None else None
+            tabla = pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False)
+            if escritor is None: escritor = pq.ParquetWriter(ruta_temporal, tabla.schema)
+            escritor.write_table(tabla)
+            filas += len(bloque)
+            attrs = bloque.attrs
+        if escritor is None: raise ValueError("El archivo no tiene filas.")
+        # Misma clave que usa pandas, así read_parquet devuelve los attrs.
+        if attrs: escritor.add_key_value_metadata({"PANDAS_ATTRS": json.dumps(attrs)})
+        escritor.close()
+        os.replace(ruta_temporal, ruta_cache(huella))
+    except BaseException:
+        if escritor is not None: escritor.close()
+        if os.path.exists(ruta_temporal): os.remove(ruta_temporal)
+        raise
+    desalojar_entradas_antiguas()
+    return filas
+
+
+def anexar_a_cache(huella_base: str, huella: str, delta: pd.DataFrame, attrs: Dict[str, Any]) -> bool:
+    """
+    Crea la entrada `huella` como las partes de `huella_base` más `delta` como parte nueva, sin reescribir
+    la base: las partes existentes entran por enlace duro, así la entrada nueva sigue completa aunque
+    la base se desaloje. El delta se escribe con el esquema de la base; devuelve False si no es compatible.
+    """
+    partes_base = _partes(ruta_cache(huella_base))
+    if not all(os.path.isfile(parte) for parte in partes_base): return False
+    directorio = tempfile.mkdtemp(dir=DIRECTORIO_CACHE, suffix=".tmp")
+    try:
+        esquema = pq.read_schema(partes_base[0])
+        tabla = pa.Table.from_pandas(delta, preserve_index=False).select(esquema.names).cast(esquema)
+        for i, parte in enumerate(partes_base): os.link(parte, os.path.join(directorio, f"parte-{i:05d}.parquet"))
+        pq.write_table(tabla, os.path.join(directorio, f"parte-{len(partes_base):05d}.parquet"))
+        with open(os.path.join(directorio, "_attrs.json"), "w", encoding="utf-8") as f: json.dump(attrs, f)
+        os.replace(directorio, ruta_cache(huella))
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        # Columnas distintas o tipos que no se pueden llevar al esquema de la base: se limpia todo de nuevo.
+        shutil.rmtree(directorio, ignore_errors=True)
+        return False
+    desalojar_entradas_antiguas()
+    return True
+
+
+def ruta_hashes(huella: str) -> str:
+    return os.path.join(DIRECTORIO_CACHE, f"{huella}.hashes.npy")
+
+
+def leer_hashes(huella: str) -> Optional[np.ndarray]:
+    """Hashes de fila (uint64, ordenados) guardados junto a la entrada de `huella`, o None."""
+    try:
+        return np.load(ruta_hashes(huella), allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_hashes(huella: str, hashes: np.ndarray) -> bool:
+    """Guarda los hashes de fila de `huella` de forma atómica, como las entradas del dataset."""
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=DIRECTORIO_CACHE, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f: np.save(f, hashes, allow_pickle=False)
+        os.replace(ruta_temporal, ruta_hashes(huella))
+    except OSError:
+        if os.path.exists(ruta_temporal): os.remove(ruta_temporal)
+        return False
+    return True
+
+
+def ruta_cubo(huella: str) -> str:
+    return os.path.join(DIRECTORIO_CACHE, f"{huella}.cubo.parquet")
+
+
+def leer_cubo(huella: str) -> Optional[pd.DataFrame]:
+    """Cubo guardado junto a la entrada de `huella`, o None."""
+    try:
+        return pd.read_parquet(ruta_cubo(huella))
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def _guardar_parquet(ruta: str, df: pd.DataFrame) -> bool:
+    # Escritura atómica de un archivo que acompaña a una entrada; los attrs viajan en el Parquet.
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=DIRECTORIO_CACHE, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        df.to_parquet(ruta_temporal, index=False)
+        os.replace(ruta_temporal, ruta)
+    except (OSError, ValueError, TypeError, pa.ArrowException):
+        if os.path.exists(ruta_temporal): os.remove(ruta_temporal)
+        return False
+    return True
+
+
+def guardar_cubo(huella: str, cubo: pd.DataFrame) -> bool:
+    """Guarda el cubo de `huella` de forma atómica; sus attrs (filas de origen) viajan en el Parquet."""
+    return _guardar_parquet(ruta_cubo(huella), cubo)
+
+
+def ruta_pronosticos(huella: str) -> str:
+    return os.path.join(DIRECTORIO_CACHE, f"{huella}.pronosticos.parquet")
+
+
+def leer_pronosticos(huella: str) -> Optional[pd.DataFrame]:
+    """Pronósticos guardados junto a la entrada de `huella`, o None."""
+    try:
+        return pd.read_parquet(ruta_pronosticos(huella))
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def guardar_pronosticos(huella: str, pronosticos: pd.DataFrame) -> bool:
+    """Guarda los pronósticos de `huella` de forma atómica, con sus attrs."""
+    return _guardar_parquet(ruta_pronosticos(huella), pronosticos)
+
+
+def ruta_sqlite(huella: str) -> str:
+    return os.path.join(DIRECTORIO_CACHE, f"{huella}.sqlite")
+
+
+def guardar_origen(huella: str, bytes_origen: int) -> None:
+    """Anota el tamaño del archivo fuente de `huella`, para reconocerlo como prefijo de un export que creció."""
+    try:
+        with open(os.path.join(DIRECTORIO_CACHE, f"{huella}.origen.json"), "w", encoding="utf-8") as f:
+            json.dump({"bytes": bytes_origen}, f)
+    except OSError:
+        pass
+
+
+def origenes_guardados() -> Dict[str, int]:
+    """Tamaño del archivo fuente de cada entrada que lo tiene anotado, por huella."""
+    origenes: Dict[str, int] = {}
+    if not os.path.isdir(DIRECTORIO_CACHE): return origenes
+    for nombre in os.listdir(DIRECTORIO_CACHE):
+        if not nombre.endswith(".origen.json"): continue
+        huella = nombre[:-len(".origen.json")]
+        if not os.path.exists(ruta_cache(huella)): continue
+        try:
+            with open(os.path.join(DIRECTORIO_CACHE, nombre), encoding="utf-8") as f: origenes[huella] = int(json.load(f)["bytes"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return origenes
+
+
+def desalojar_entradas_antiguas(max_entradas: int = MAX_ENTRADAS_CACHE) -> None:
+    """Elimina las entradas menos usadas recientemente cuando se supera `max_entradas`."""
+    if not os.path.isdir(DIRECTORIO_CACHE): return
+    nombres = os.listdir(DIRECTORIO_CACHE)
+    entradas = []
+    for nombre in nombres:
+        # Solo "<huella>.parquet"; los "<huella>.cubo.parquet" y demás acompañan a su entrada.
+        if not nombre.endswith(".parquet") or "." in nombre[:-len(".parquet")]: continue
+        ruta = os.path.join(DIRECTORIO_CACHE, nombre)
+        # Otra réplica pudo borrar la entrada entre el listado y la consulta.
+        try: entradas.append((os.path.getmtime(ruta), nombre[:-len(".parquet")]))
+        except OSError: continue
+    entradas.sort(reverse=True)
+    for _, huella in entradas[max_entradas:]:
+        # Los hashes de fila, el cubo, los pronósticos, el origen y la base SQLite de una entrada se van con ella.
+        for nombre in nombres:
+            if not nombre.startswith(huella + "."): continue
+            ruta = os.path.join(DIRECTORIO_CACHE, nombre)
+            try:
+                if os.path.isdir(ruta): shutil.rmtree(ruta)
+                else: os.remove(ruta)
+            except OSError: pass
@@ -0,0 +1,545 @@
+# analisis.py
+
+"""
+Agregados del dataset limpio que consultan los gráficos y los KPIs del dashboard.
+Tampoco depende de Streamlit: se usa igual desde app.py que desde scripts.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from instrumentacion import etapa
+
+# Dimensiones del cubo. ZONA queda fuera: ningún gráfico la agrupa y multiplicaría el tamaño por 3.
+DIMENSIONES_CUBO: List[str] = ['ANIO', 'MES', 'DEPARTAMENTO', 'ARTICULO']
+
+
+def construir_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Suma CANTIDAD sobre ANIO × MES × DEPARTAMENTO × ARTICULO, solo en las combinaciones que existen.
+    El cubo conserva los nombres de columna del dataset, así que cualquier gráfico que agrupe y sume
+    CANTIDAD obtiene lo mismo sobre el cubo que sobre las filas, pero su tamaño ya no depende
+    del número de registros sino de la cantidad de combinaciones.
+    """
+    if df.empty: return pd.DataFrame()
+    dimensiones = [col for col in DIMENSIONES_CUBO if col in df.columns]
+    with etapa("cubo", len(df)) as registro:
+        cubo = df.groupby(dimensiones, observed=True)['CANTIDAD'].sum().reset_index()
+        registro.filas_salida = len(cubo)
+    cubo['CANTIDAD'] = cubo['CANTIDAD'].astype(np.int64)
+    cubo.attrs.update(df.attrs)
+    cubo.attrs['filas_origen'] = len(df)
+    return cubo
+
+
+def combinar_cubos(*cubos: pd.DataFrame) -> pd.DataFrame:
+    """
+    Suma, celda por celda, cubos armados sobre filas distintas (el dataset guardado y un delta).
+    Da el mismo cubo que construir_cubo sobre todas las filas juntas, con un costo que depende
+    del tamaño de los cubos y no del número de registros.
+    """
+    cubos = tuple(cubo for cubo in cubos if not cubo.empty)
+    if not cubos: return pd.DataFrame()
+    dimensiones = [col for col in DIMENSIONES_CUBO if col in cubos[0].columns]
+    columnas = {}
+    for col in dimensiones:
+        series = [cubo[col] for cubo in cubos]
+        if all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            columnas[col] = pd.api.types.union_categoricals(series, sort_categories=True)
+        else:
+            columnas[col] = pd.concat(series, ignore_index=True)
+    columnas['CANTIDAD'] = pd.concat([cubo['CANTIDAD'] for cubo in cubos], ignore_index=True)
+    with etapa("cubo.combinar", sum(len(cubo) for cubo in cubos)) as registro:
+        cubo = pd.DataFrame(columnas).groupby(dimensiones, observed=True)['CANTIDAD'].sum().reset_index()
+        registro.filas_salida = len(cubo)
+    cubo['CANTIDAD'] = cubo['CANTIDAD'].astype(np.int64)
+    cubo.attrs.update(cubos[0].attrs)
+    cubo.attrs['filas_origen'] = sum(cubo.attrs.get('filas_origen', 0) for cubo in cubos)
+    return cubo
+
+
+# ==============================================================================
+# MOTOR DE KPIs
+# ==============================================================================
+
+@dataclass(frozen=True)
+class ResumenKPI:
+    """Métricas del panorama general. Los textos valen "N/A" cuando no hay datos suficientes."""
+    total_casos: int = 0
+    anio_min: Optional[int] = None
+    anio_max: Optional[int] = None
+    delito_mas_frecuente: str = "N/A"
+    departamento_mas_afectado: str = "N/A"
+    tendencia_diff: float = 0.0
+    tendencia_general: str = "N/A"
+    # Meses con datos del último año: con menos de 12 la tendencia usa el año completo estimado.
+    meses_ultimo_anio: int = 12
+
+    @property
+    def rango_anios(self) -> str:
+        return f"{self.anio_min} - {self.anio_max}" if self.anio_min and self.anio_max else "N/A"
+
+
+class MemoLRU:
+    """
+    Resultados ya calculados por clave (la huella del dataset y los parámetros), compartidos por todas las
+    sesiones del proceso, que corren cada una en su hilo. Como en CacheFiguras, un candado protege el
+    diccionario y el cálculo se hace fuera de él; al superar `maximo` entradas se descartan las usadas
+    hace más tiempo.
+    """
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._entradas: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._candado = threading.Lock()
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Devuelve el resultado de `clave`; si no está, lo calcula con `calcular()` y lo guarda."""
+        with self._candado:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                return self._entradas[clave]
+        resultado = calcular()
+        self.guardar(clave, resultado)
+        return resultado
+
+    def guardar(self, clave: Hashable, resultado: Any) -> None:
+        """Guarda un resultado ya calculado (por ejemplo, el que recibe un proceso del modo batch)."""
+        with self._candado:
+            self._entradas[clave] = resultado
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo: self._entradas.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._candado: return len(self._entradas)
+
+
+# Resúmenes ya calculados, por huella del dataset (compartidos por todas las sesiones del proceso).
+MAX_MEMO_KPIS = 64
+_MEMO_KPIS = MemoLRU(MAX_MEMO_KPIS)
+
+
+def _codigos_y_valores(serie: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    # Las categóricas ya traen sus códigos; cualquier otra columna se factoriza en orden alfabético.
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    codigos, valores = pd.factorize(serie, sort=True)
+    return codigos, valores
+
+
+def _mas_frecuente(df: pd.DataFrame, col: str) -> str:
+    # Valor con más casos, desempatando por orden alfabético (como groupby().sum().idxmax()); con un solo
+    # valor presente (un departamento filtrado) es ese mismo. "N/A" solo si la columna no tiene valores.
+    if not totales_por(df, col)[2].any(): return "N/A"
+    return str(top_k(df, col, 1)[col].iloc[0])
+
+
+def calcular_kpis(df: pd.DataFrame) -> ResumenKPI:
+    """Calcula todos los KPIs con conteos vectorizados (np.bincount) sobre los códigos, sin groupby."""
+    if df.empty: return ResumenKPI()
+    cantidad = df['CANTIDAD'].to_numpy(dtype=np.int64)
+    anios = df['ANIO'].to_numpy(dtype=np.int64)
+
+    # Los registros sin fecha válida tienen ANIO = 0 y no cuentan para el rango.
+    con_fecha = anios[anios > 0]
+    anio_min = int(con_fecha.min()) if len(con_fecha) else None
+    anio_max = int(con_fecha.max()) if len(con_fecha) else None
+
+    delito = _mas_frecuente(df, 'ARTICULO') if 'ARTICULO' in df.columns else "N/A"
+    depto = _mas_frecuente(df, 'DEPARTAMENTO') if 'DEPARTAMENTO' in df.columns else "N/A"
+
+    tendencia_diff, tendencia_general, meses = 0.0, "N/A", 12
+    # Se hizo la lógica para calcular la variación entre el año inicial y final (estimado completo si es parcial).
+    total = calcular_tendencias(df) if anio_min and anio_max and anio_min != anio_max else None
+    if total is not None:
+        casos_inicial, casos_final, meses = total.casos[0, 0], total.casos[-1, 0], total.meses_ultimo_anio
+        if casos_inicial > 0 and casos_final > 0:
+            tendencia_diff = float((casos_final - casos_inicial) / casos_inicial * 100)
+            if tendencia_diff > 5: tendencia_general = "crecimiento"
+            elif tendencia_diff < -5: tendencia_general = "disminución"
+            else: tendencia_general = "estable"
+        elif casos_final > 0 and casos_inicial == 0: tendencia_general = "crecimiento explosivo"
+        else: tendencia_general = "datos insuficientes"
+
+    return ResumenKPI(
+        total_casos=int(cantidad.sum()),
+        anio_min=anio_min,
+        anio_max=anio_max,
+        delito_mas_frecuente=delito,
+        departamento_mas_afectado=depto,
+        tendencia_diff=tendencia_diff,
+        tendencia_general=tendencia_general,
+        meses_ultimo_anio=meses,
+    )
+
+
+def generar_kpis_y_analisis(df: pd.DataFrame) -> ResumenKPI:
+    """
+    Calculamos los KPIs clave para tener un Resumen Ejecutivo rápido de los hallazgos.
+    El resultado se memoriza por la huella del dataset (df.attrs['huella']): mientras los datos
+    no cambien, los reruns reciben el mismo resumen sin recorrer nada.
+    """
+    def calcular() -> ResumenKPI:
+        with etapa("kpis", len(df)): return calcular_kpis(df)
+
+    huella = df.attrs.get('huella')
+    return calcular() if huella is None else _MEMO_KPIS.obtener(huella, calcular)
+
+
+# ==============================================================================
+# TOP-K SOBRE TOTALES PRECALCULADOS
+# ==============================================================================
+
+# Totales por dimensión y rebanada, por huella del dataset: los KPIs y los gráficos de top-N los comparten.
+MAX_MEMO_TOTALES = 256
+_MEMO_TOTALES = MemoLRU(MAX_MEMO_TOTALES)
+
+
+def _mascara_rebanada(df: pd.DataFrame, rebanada: Tuple[Tuple[str, Any], ...]) -> Optional[np.ndarray]:
+    # Un valor filtra por igualdad; una tupla (desde, hasta) es un rango cerrado, como ANIO=(2015, 2020).
+    mascara = None
+    for col, valor in rebanada:
+        if isinstance(valor, tuple):
+            serie = df[col].to_numpy()
+            condicion = (serie >= valor[0]) & (serie <= valor[1])
+        else:
+            condicion = (df[col] == valor).to_numpy()
+        mascara = condicion if mascara is None else mascara & condicion
+    return mascara
+
+
+def totales_por(df: pd.DataFrame, dimension: str, **rebanada: Any) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Total de CANTIDAD por valor de `dimension` como arreglo indexado por código (np.bincount), y qué
+    valores aparecen, opcionalmente dentro de una rebanada (DEPARTAMENTO="ANTIOQUIA", ANIO=(2015, 2020)).
+    Se memoriza por huella del dataset, dimensión y rebanada.
+    """
+    huella = df.attrs.get('huella')
+    clave = (huella, dimension, tuple(sorted(rebanada.items())))
+
+    def calcular() -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+        codigos, valores = _codigos_y_valores(df[dimension])
+        cantidad = df['CANTIDAD'].to_numpy(dtype=np.int64)
+        validos = codigos >= 0
+        mascara = _mascara_rebanada(df, clave[2])
+        if mascara is not None: validos &= mascara
+        presentes = np.bincount(codigos[validos], minlength=len(valores)) > 0
+        totales = np.bincount(codigos[validos], weights=cantidad[validos], minlength=len(valores)).astype(np.int64)
+        return valores, totales, presentes
+
+    return calcular() if huella is None else _MEMO_TOTALES.obtener(clave, calcular)
+
+
+def top_k(df: pd.DataFrame, dimension: str, k: int, **rebanada: Any) -> pd.DataFrame:
+    """
+    Los `k` valores de `dimension` con más casos dentro de la rebanada, de mayor a menor, con las columnas
+    [dimension, CANTIDAD]: lo mismo que groupby().sum().nlargest(k).reset_index(), empates por orden
+    alfabético incluidos. Es una selección parcial (np.partition) sobre los totales memorizados, sin groupby.
+    """
+    valores, totales, presentes = totales_por(df, dimension, **rebanada)
+    candidatos = np.flatnonzero(presentes)
+    if len(candidatos) > k:
+        # Todo lo que iguala o supera el k-ésimo total; los empates del borde los decide el orden por código.
+        subtotales = totales[candidatos]
+        umbral = np.partition(subtotales, len(subtotales) - k)[len(subtotales) - k]
+        candidatos = candidatos[subtotales >= umbral]
+    elegidos = candidatos[np.lexsort((candidatos, -totales[candidatos]))[:k]]
+    if isinstance(df[dimension].dtype, pd.CategoricalDtype):
+        columna = pd.Categorical.from_codes(elegidos, dtype=df[dimension].dtype)
+    else:
+        columna = valores[elegidos]
+    return pd.DataFrame({dimension: columna, 'CANTIDAD': totales[elegidos]})
+
+
+
+# ==============================================================================
+# MOTOR DE TENDENCIAS: TODAS LAS SERIES DE UNA DIMENSIÓN EN UNA MATRIZ AÑO × SERIE
+# ==============================================================================
+
+# Años que abarca el CAGR del ranking de crecimiento, y ventana de la media móvil.
+ANIOS_CAGR = 5
+VENTANA_MEDIA_MOVIL = 3
+
+# Tendencias ya calculadas, por huella del dataset y dimensión.
+MAX_MEMO_TENDENCIAS = 64
+_MEMO_TENDENCIAS = MemoLRU(MAX_MEMO_TENDENCIAS)
+
+
+@dataclass(frozen=True, eq=False)
+class Tendencias:
+    """
+    Series anuales de todos los valores de una dimensión a la vez: en las matrices, las filas son `anios` y las
+    columnas `valores`. Si el último año está incompleto (`meses_ultimo_anio` < 12), su fila de `casos` es la
+    estimación del año completo: el año anterior por la variación del mismo período (enero a ese mes) en ambos.
+    Las variaciones y el CAGR están en %, con NaN donde no hay casos en la base.
+    """
+    anios: np.ndarray
+    valores: pd.Index
+    casos: np.ndarray
+    variacion_anual: np.ndarray
+    media_movil: np.ndarray
+    cagr: np.ndarray
+    meses_ultimo_anio: int = 12
+
+    @property
+    def anio_parcial(self) -> bool:
+        return self.meses_ultimo_anio < 12
+
+
+def _variacion(final: np.ndarray, base: np.ndarray, exponente: float = 1.0) -> np.ndarray:
+    # Variación porcentual (o tasa compuesta con exponente 1/años); NaN donde la base no tiene casos.
+    resultado = np.full(np.broadcast(final, base).shape, np.nan)
+    con_base = np.broadcast_to(base > 0, resultado.shape)
+    razon = np.divide(final, base, out=np.zeros(resultado.shape), where=con_base)
+    resultado[con_base] = (razon[con_base] ** exponente - 1) * 100
+    return resultado
+
+
+def matriz_mensual(df: pd.DataFrame, dimension: str) -> Optional[Tuple[int, pd.Index, np.ndarray]]:
+    """
+    Casos de cada valor de `dimension` por mes, del primer al último mes con fecha válida: (primer período,
+    valores, matriz mes × valor). El período es ANIO * 12 + MES - 1. None si no hay meses válidos.
+    """
+    if df.empty or 'ANIO' not in df.columns or 'MES' not in df.columns: return None
+    anios = df['ANIO'].to_numpy(dtype=np.int64)
+    meses = df['MES'].to_numpy(dtype=np.int64)
+    codigos, valores = _codigos_y_valores(df[dimension])
+    validos = (anios > 0) & (meses > 0) & (codigos >= 0)
+    if not validos.any(): return None
+    periodo = anios[validos] * 12 + meses[validos] - 1
+    primero, n_series = int(periodo.min()), len(valores)
+    n_periodos = int(periodo.max()) - primero + 1
+    casos = np.bincount((periodo - primero) * n_series + codigos[validos], weights=df['CANTIDAD'].to_numpy()[validos],
+                        minlength=n_periodos * n_series).reshape(n_periodos, n_series)
+    return primero, valores, casos
+
+
+def calcular_tendencias(df: pd.DataFrame, dimension: Optional[str] = None) -> Optional[Tendencias]:
+    """
+    Variación anual, CAGR de los últimos ANIOS_CAGR años y media móvil de VENTANA_MEDIA_MOVIL años para cada
+    valor de `dimension` (sin dimensión, una sola serie con el total). La matriz sale de un np.bincount sobre
+    año × código, sin recorrer las series una por una. None si no hay años válidos.
+    """
+    if df.empty or 'ANIO' not in df.columns: return None
+    anios = df['ANIO'].to_numpy(dtype=np.int64)
+    cantidad = df['CANTIDAD'].to_numpy(dtype=np.int64)
+    if dimension is None:
+        codigos, valores = np.zeros(len(df), dtype=np.int64), pd.Index(['TOTAL'])
+    else:
+        codigos, valores = _codigos_y_valores(df[dimension])
+    validos = (anios > 0) & (codigos >= 0)
+    if not validos.any(): return None
+    primero, ultimo = int(anios[validos].min()), int(anios[validos].max())
+    n_anios, n_series = ultimo - primero + 1, len(valores)
+    celda = (anios[validos] - primero) * n_series + codigos[validos]
+    casos = np.bincount(celda, weights=cantidad[validos], minlength=n_anios * n_series).reshape(n_anios, n_series)
+
+    # Año final incompleto: se compara con el mismo período del año anterior en vez de con el año entero.
+    meses = 12
+    if 'MES' in df.columns and n_anios > 1:
+        mes = df['MES'].to_numpy(dtype=np.int64)
+        meses = int(mes[validos & (anios == ultimo)].max())
+        if 0 < meses < 12:
+            # Los registros sin mes (MES = 0) no son del período comparable de ningún año.
+            periodo = validos & (anios >= ultimo - 1) & (mes > 0) & (mes <= meses)
+            celda = (anios[periodo] - ultimo + 1) * n_series + codigos[periodo]
+            mismo_periodo = np.bincount(celda, weights=cantidad[periodo], minlength=2 * n_series).reshape(2, n_series)
+            # Sin casos en ese período del año anterior, se anualiza en proporción a los meses.
+            razon = np.divide(mismo_periodo[1], mismo_periodo[0], out=np.zeros(n_series), where=mismo_periodo[0] > 0)
+            casos[-1] = np.where(mismo_periodo[0] > 0, casos[-2] * razon, casos[-1] * 12 / meses)
+        else: meses = 12
+
+    variacion_anual = np.full(casos.shape, np.nan)
+    variacion_anual[1:] = _variacion(casos[1:], casos[:-1])
+    acumulado = np.vstack([np.zeros(n_series), np.cumsum(casos, axis=0)])
+    media_movil = np.full(casos.shape, np.nan)
+    if n_anios >= VENTANA_MEDIA_MOVIL:
+        media_movil[VENTANA_MEDIA_MOVIL - 1:] = (acumulado[VENTANA_MEDIA_MOVIL:] - acumulado[:-VENTANA_MEDIA_MOVIL]) / VENTANA_MEDIA_MOVIL
+    periodos = min(ANIOS_CAGR, n_anios - 1)
+    cagr = _variacion(casos[-1], casos[-1 - periodos], 1 / periodos) if periodos else np.full(n_series, np.nan)
+
+    return Tendencias(
+        anios=np.arange(primero, ultimo + 1), valores=valores, casos=casos, variacion_anual=variacion_anual,
+        media_movil=media_movil, cagr=cagr, meses_ultimo_anio=meses,
+    )
+
+
+def tendencias(df: pd.DataFrame, dimension: Optional[str] = None) -> Optional[Tendencias]:
+    """calcular_tendencias memorizado por huella del dataset y dimensión."""
+    def calcular() -> Optional[Tendencias]:
+        with etapa("tendencias", len(df), dimension=dimension): return calcular_tendencias(df, dimension)
+
+    huella = df.attrs.get('huella')
+    return calcular() if huella is None else _MEMO_TENDENCIAS.obtener((huella, dimension), calcular)
+
+
+def ranking_crecimiento(df: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """
+    Valores de `dimension` de mayor a menor CAGR (los sin base al final), con los casos del último año
+    (ajustados si es parcial), su variación anual y la media móvil. Solo entran los que tienen casos en la
+    ventana del CAGR. attrs lleva el último año y sus meses.
+    """
+    resultado = tendencias(df, dimension)
+    if resultado is None: return pd.DataFrame()
+    periodos = min(ANIOS_CAGR, len(resultado.anios) - 1)
+    con_casos = resultado.casos[-1 - periodos:].sum(axis=0) > 0
+    ranking = pd.DataFrame({
+        dimension: np.asarray(resultado.valores, dtype=object), 'CAGR': resultado.cagr,
+        'VARIACION_ANUAL': resultado.variacion_anual[-1], 'CASOS_ULTIMO_ANIO': resultado.casos[-1],
+        'MEDIA_MOVIL': resultado.media_movil[-1],
+    })[con_casos]
+    ranking = ranking.sort_values(['CAGR', dimension], ascending=[False, True], na_position='last', kind='stable')
+    ranking.attrs.update({'anio': int(resultado.anios[-1]), 'meses': resultado.meses_ultimo_anio, 'anios_cagr': periodos})
+    return ranking.reset_index(drop=True)
+
+
+# ==============================================================================
+# ESTACIONALIDAD Y ANOMALÍAS: TODAS LAS SERIES DEPARTAMENTO × ARTÍCULO EN UNA MATRIZ MES × SERIE
+# ==============================================================================
+
+# Meses marcados como anomalía: |z robusto| por encima del umbral (el 3.5 de Iglewicz y Hoaglin).
+UMBRAL_Z_ANOMALIA = 3.5
+# Series con menos casos en un mes típico (mediana desestacionalizada) no se evalúan: con conteos tan bajos,
+# cualquier mes con unos pocos casos saldría anómalo.
+MIN_MEDIANA_MENSUAL_ANOMALIAS = 5.0
+COLUMNAS_MEDIA_MES = [f"MEDIA_{mes:02d}" for mes in range(1, 13)]
+
+# Estacionalidad ya calculada, por huella del dataset.
+MAX_MEMO_ESTACIONALIDAD = 16
+_MEMO_ESTACIONALIDAD = MemoLRU(MAX_MEMO_ESTACIONALIDAD)
+
+
+@dataclass(frozen=True, eq=False)
+class Estacionalidad:
+    """
+    Tablas precalculadas de estacionalidad. `series` tiene una fila por par DEPARTAMENTO × ARTICULO con casos:
+    CASOS, MES_PICO, INDICE_PICO y el promedio de casos de cada mes del calendario (MEDIA_01 … MEDIA_12).
+    `anomalias` tiene los meses con |Z| > UMBRAL_Z_ANOMALIA: CANTIDAD observada, ESPERADO y Z.
+    """
+    series: pd.DataFrame
+    anomalias: pd.DataFrame
+
+
+def _seleccion(tabla: pd.DataFrame, departamentos: Tuple[str, ...], articulos: Tuple[str, ...]) -> pd.DataFrame:
+    # Una selección vacía en una dimensión equivale a todos sus valores.
+    mascara = np.ones(len(tabla), dtype=bool)
+    if departamentos: mascara &= tabla['DEPARTAMENTO'].isin(departamentos).to_numpy()
+    if articulos: mascara &= tabla['ARTICULO'].isin(articulos).to_numpy()
+    return tabla[mascara]
+
+
+def calcular_estacionalidad(df: pd.DataFrame) -> Estacionalidad:
+    """
+    Índices estacionales y anomalías de todas las series DEPARTAMENTO × ARTICULO a la vez. Un np.bincount arma la
+    matriz densa mes × serie (del primer al último mes con datos); completada con NaN hasta años enteros, el
+    promedio de cada mes del calendario es un nanmean sobre el eje de los años. Con menos de doce meses del
+    calendario observados, los no observados quedan en NaN y el pico no se define. Las anomalías son z robustos
+    (mediana y MAD, o la desviación absoluta media si la MAD es 0) de la serie desestacionalizada.
+    """
+    columnas = ('ANIO', 'MES', 'DEPARTAMENTO', 'ARTICULO', 'CANTIDAD')
+    vacia = Estacionalidad(
+        series=pd.DataFrame(columns=['DEPARTAMENTO', 'ARTICULO', 'CASOS', 'MES_PICO', 'INDICE_PICO', *COLUMNAS_MEDIA_MES]),
+        anomalias=pd.DataFrame(columns=['DEPARTAMENTO', 'ARTICULO', 'ANIO', 'MES', 'CANTIDAD', 'ESPERADO', 'Z']),
+    )
+    if df.empty or any(col not in df.columns for col in columnas): return vacia
+    anios = df['ANIO'].to_numpy(dtype=np.int64)
+    meses = df['MES'].to_numpy(dtype=np.int64)
+    cantidad = df['CANTIDAD'].to_numpy(dtype=np.int64)
+    cod_depto, deptos = _codigos_y_valores(df['DEPARTAMENTO'])
+    cod_articulo, articulos = _codigos_y_valores(df['ARTICULO'])
+    validos = (anios > 0) & (meses > 0) & (cod_depto >= 0) & (cod_articulo >= 0)
+    if not validos.any(): return vacia
+
+    periodo = anios[validos] * 12 + meses[validos] - 1
+    primero = int(periodo.min())
+    n_periodos = int(periodo.max()) - primero + 1
+    # Solo entran las series con casos: los pares sin ninguno no ocupan columna.
+    pares, serie = np.unique(cod_depto[validos].astype(np.int64) * len(articulos) + cod_articulo[validos], return_inverse=True)
+    n_series = len(pares)
+    matriz = np.bincount((periodo - primero) * n_series + serie, weights=cantidad[validos],
+                         minlength=n_periodos * n_series).reshape(n_periodos, n_series)
+
+    # Meses fuera del rango observado quedan en NaN para no contarlos como ceros.
+    antes, despues = primero % 12, -(primero + n_periodos) % 12
+    por_anio = np.pad(matriz, ((antes, despues), (0, 0)), constant_values=np.nan).reshape(-1, 12, n_series)
+    # Un mes del calendario sin ningún año observado queda en NaN: el índice se normaliza sobre los observados.
+    observados = ~np.isnan(por_anio[:, :, 0]).all(axis=0)
+    medias = np.full((12, n_series), np.nan)
+    medias[observados] = np.nanmean(por_anio[:, observados], axis=0)
+    indices = medias / np.nanmean(medias, axis=0)
+    # Sin una temporada completa no hay mes pico: MES_PICO queda en 0 (como un mes sin fecha) e INDICE_PICO en NaN.
+    completa = observados.all()
+
+    mes_del_periodo = (np.arange(n_periodos) + primero) % 12
+    indice_periodo = indices[mes_del_periodo]
+    # En los meses del calendario sin ningún caso (índice 0) la serie desestacionalizada no está definida.
+    ajustada = np.divide(matriz, indice_periodo, out=np.full(matriz.shape, np.nan), where=indice_periodo > 0)
+    mediana = np.nanmedian(ajustada, axis=0)
+    desvio = np.abs(ajustada - mediana)
+    mad = np.nanmedian(desvio, axis=0)
+    escala = np.where(mad > 0, 1.4826 * mad, 1.2533 * np.nanmean(desvio, axis=0))
+    z = np.divide(ajustada - mediana, escala, out=np.full(matriz.shape, np.nan), where=escala > 0)
+    z[:, ~(mediana >= MIN_MEDIANA_MENSUAL_ANOMALIAS)] = np.nan
+
+    depto_serie, articulo_serie = pares // len(articulos), pares % len(articulos)
+    series = pd.DataFrame({
+        'DEPARTAMENTO': pd.Categorical.from_codes(depto_serie, categories=deptos),
+        'ARTICULO': pd.Categorical.from_codes(articulo_serie, categories=articulos),
+        'CASOS': matriz.sum(axis=0).astype(np.int64),
+        'MES_PICO': (np.nanargmax(medias, axis=0) + 1 if completa else np.zeros(n_series)).astype(np.int8),
+        'INDICE_PICO': np.nanmax(indices, axis=0) if completa else np.full(n_series, np.nan),
+        **dict(zip(COLUMNAS_MEDIA_MES, medias)),
+    }).sort_values(['CASOS', 'DEPARTAMENTO', 'ARTICULO'], ascending=[False, True, True], kind='stable')
+
+    fila, columna = np.nonzero(np.abs(np.nan_to_num(z)) > UMBRAL_Z_ANOMALIA)
+    anomalias = pd.DataFrame({
+        'DEPARTAMENTO': pd.Categorical.from_codes(depto_serie[columna], categories=deptos),
+        'ARTICULO': pd.Categorical.from_codes(articulo_serie[columna], categories=articulos),
+        'ANIO': ((fila + primero) // 12).astype(np.int16),
+        'MES': (mes_del_periodo[fila] + 1).astype(np.int8),
+        'CANTIDAD': matriz[fila, columna].astype(np.int64),
+        'ESPERADO': mediana[columna] * indice_periodo[fila, columna],
+        'Z': z[fila, columna],
+    })
+    anomalias = anomalias.iloc[np.argsort(-np.abs(anomalias['Z'].to_numpy()), kind='stable')]
+    return Estacionalidad(series=series.reset_index(drop=True), anomalias=anomalias.reset_index(drop=True))
+
+
+def estacionalidad(df: pd.DataFrame) -> Estacionalidad:
+    """calcular_estacionalidad memorizado por huella del dataset."""
+    def calcular() -> Estacionalidad:
+        with etapa("estacionalidad", len(df)): return calcular_estacionalidad(df)
+
+    huella = df.attrs.get('huella')
+    return calcular() if huella is None else _MEMO_ESTACIONALIDAD.obtener(huella, calcular)
+
+
+def memorizar_estacionalidad(huella: str, resultado: Estacionalidad) -> None:
+    """Deja en la memoria una estacionalidad ya calculada (por ejemplo, la que exporta el modo batch)."""
+    _MEMO_ESTACIONALIDAD.guardar(huella, resultado)
+
+
+def indice_estacional(tabla: Estacionalidad, departamentos: Tuple[str, ...] = (),
+                      articulos: Tuple[str, ...] = ()) -> pd.DataFrame:
+    """
+    Perfil mensual de la selección (vacía = todos): MES, MEDIA de casos y INDICE (1 = un mes promedio).
+    Los promedios mensuales se suman entre series, así que el índice es el de la serie agregada; los meses
+    del calendario sin datos quedan en NaN.
+    """
+    seleccion = _seleccion(tabla.series, departamentos, articulos)
+    medias = seleccion[COLUMNAS_MEDIA_MES].to_numpy(dtype=float).sum(axis=0)
+    promedio = np.nanmean(medias) if not np.isnan(medias).all() else 0.0
+    return pd.DataFrame({
+        'MES': np.arange(1, 13), 'MEDIA': medias,
+        'INDICE': medias / promedio if promedio > 0 else np.full(12, np.nan),
+    })
+
+
+def picos_y_anomalias(tabla: Estacionalidad, departamentos: Tuple[str, ...] = (),
+                      articulos: Tuple[str, ...] = ()) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Filas de `series` y de `anomalias` de la selección (vacía = todos), en el orden de las tablas."""
+    return _seleccion(tabla.series, departamentos, articulos), _seleccion(tabla.anomalias, departamentos, articulos)
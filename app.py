@@ -6,12 +6,30 @@ Dashboard Unificado de Análisis de Delitos Ambientales
 GRUPO 3 de Talentotech.
 """
 
+import json
+import time
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from procesamiento import (
+    cargar_datos_limpios, cubo_del_dataset, solo_lectura, uso_memoria_por_columna, contar_fechas_invalidas,
+)
+from analisis import (
+    MIN_MEDIANA_MENSUAL_ANOMALIAS, UMBRAL_Z_ANOMALIA, ResumenKPI, estacionalidad, generar_kpis_y_analisis,
+    memorizar_estacionalidad, picos_y_anomalias, ranking_crecimiento,
+)
+from cache_figuras import CacheFiguras, clave_figura
+from batch import leer_cubo_precalculado, leer_estacionalidad_precalculada, precargar_figuras
+from filtros import Filtros, FuenteDatos, IndiceFiltros
+from fuente_sqlite import BACKEND_DATOS, FuenteSQLite, abrir_fuente_sqlite
+from instrumentacion import etapa, iniciar_corrida, registros_corrida, volcar_log
+from graficos import (
+    TEMA_POR_DEFECTO, para_transporte, generar_tendencia_anual, generar_top_conductas, generar_top_departamentos,
+    generar_heatmap_conducta_anual, generar_evolucion_top5_conductas, generar_distribucion_top_depto_bar,
+    generar_distribucion_mensual, generar_indice_estacional, generar_pronostico_mensual, NOMBRES_MESES,
+)
 
 # ==============================================================================
 # CONFIGURACIÓN INICIAL Y ESTILO (SIN BARRA LATERAL)
@@ -25,19 +43,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed", 
 )
 
-# Diccionario de reemplazos (CORREGIDO)
-REEMPLAZOS_CARACTERES: Dict[str, str] = {
-    "Ã‘O": "NO", "Ã‘o": "NO", "Ã‘": "N", "Ã±": "N", "Ñ": "N", "ñ": "N",
-    "Ã¡": "A", "Ã©": "E", "Ã­": "I", "Ã³": "O", "Ãº": "U", "Á": "A", "É": "E",
-    "Í": "I", "Ó": "O", "Ú": "U", "ÃÁ": "A", "ÃÉ": "E", "ÃÍ": "I", "ÃÓ": "O", 
-    "ÃÚ": "U", "ÃA": "A", "ÃE": "E", "ÃI": "I", "ÃO": "O", "ÃU": "U", "á": "A", 
-    "é": "E", "í": "I", "ó": "O", "ú": "U", "Ã¼": "U", "Ãœ": "U", "Ü": "U", 
-    "ü": "U", "¿": "", "?": "", "¡": "", "!": "", "Â¿": "", "Â¡": "",
-    "ï¿½": "", "Â": "", "â€œ": "", "â€": "", "â€™": "", "â€¢": "", "â€": "",
-    "â€\"": "", "\u2122": "", "\u00AE": "", "\u00A9": "", "\u00BA": "", "\u00AA": "", 
-    "\u20AC": "", "$": "", "\u00A3": "", "\u00BC": "", "\u00BD": "", "\u00BE": "",
-}
-
 # --- ESTILO CSS CON FONDO NEGRO PROFESIONAL ---
 st.markdown("""
 <style>
@@ -290,532 +295,326 @@ hr {
 """, unsafe_allow_html=True)
 
 # ==============================================================================
-# LAS FUNCIONES CLAVE DE PREPROCESAMIENTO Y LIMPIEZA DE DATOS
+# CARGA DEL DATASET (LA LIMPIEZA VIVE EN procesamiento.py)
 # ==============================================================================
 
-def _corregir_caracteres(texto: Any) -> str:
-    # Esta pequeña función se hizo para corregir caracteres uno a uno.
-    if pd.isna(texto): return ""
-    texto = str(texto).strip()
-    for malo, bueno in REEMPLAZOS_CARACTERES.items(): texto = texto.replace(malo, bueno)
-    return texto
-
-def limpiar_texto(texto: Any, mayusculas: bool = True, espacios_a_guion: bool = False) -> str:
-    # Función general que se usó para estandarizar el formato de las celdas.
-    if pd.isna(texto): return ""
-    texto = str(texto).strip()
-    texto = _corregir_caracteres(texto)
-    texto = " ".join(texto.split())
-    if mayusculas: texto = texto.upper()
-    if espacios_a_guion: texto = texto.replace(" ", "_")
-    if texto in ["NAN", "NONE", "NULL", ""]: return ""
-    return texto
-
-def estandarizar_nombres_columnas(df: pd.DataFrame) -> pd.DataFrame:
-    # Aquí se hizo el trabajo de limpiar los nombres de las columnas para facilitar el manejo.
-    df_copy = df.copy()
-    columnas_nuevas: List[str] = []
-    for col in df_copy.columns:
-        col_limpia = limpiar_texto(col, mayusculas=True, espacios_a_guion=True)
-        columnas_nuevas.append(col_limpia)
-    df_copy.columns = columnas_nuevas
-    return df_copy
-
-def limpiar_columnas_texto(df: pd.DataFrame) -> pd.DataFrame:
-    # Esta parte se trabajó para asegurar la consistencia del texto en las celdas.
-    df_copy = df.copy()
-    columnas_texto = df_copy.select_dtypes(include=['object']).columns.tolist()
-
-    for col in columnas_texto:
-        usar_guion = col not in ['DEPARTAMENTO', 'MUNICIPIO']
-        df_copy[col] = df_copy[col].apply(
-            lambda x: limpiar_texto(x, mayusculas=True, espacios_a_guion=usar_guion)
-        )
-    return df_copy
-
-
-@st.cache_data
+@st.cache_resource
 def cargar_y_limpiar_datos(data_input: Any) -> pd.DataFrame:
     """
     Función donde se hizo la carga inicial del CSV, la limpieza de caracteres especiales 
-    y la estandarización de columnas.
+    y la estandarización de columnas. Si otro proceso ya limpió el mismo archivo, 
+    el resultado se toma de la caché en disco.
+    Todas las sesiones reciben el mismo DataFrame de solo lectura (cache_data le daría una copia a cada una).
     """
-    if data_input is None: return pd.DataFrame()
-        
-    try:
-        df_delitos = pd.read_csv(data_input)
-    except FileNotFoundError:
-        return pd.DataFrame()
-    except Exception as e:
-        return pd.DataFrame()
-
-    df = estandarizar_nombres_columnas(df_delitos)
-    df = limpiar_columnas_texto(df)
-    
-    # Se extrajo el año de la fecha.
-    if 'FECHA_HECHO' in df.columns:
-        df['ANIO'] = pd.to_numeric(df['FECHA_HECHO'].astype(str).str[-4:], errors='coerce').fillna(0).astype(int)
-    else: df['ANIO'] = 0 
-        
-    # Se hizo la unificación de la columna de cantidad.
-    columnas_cantidad = [col for col in df.columns if 'CANTIDAD' in col]
-    if columnas_cantidad:
-        col_cantidad = columnas_cantidad[0]
-        if col_cantidad != 'CANTIDAD':
-            df = df.rename(columns={col_cantidad: 'CANTIDAD'})
-        df['CANTIDAD'] = pd.to_numeric(df['CANTIDAD'], errors='coerce').fillna(0).astype(int)
-    else: df['CANTIDAD'] = 1 
-
-    # Se eliminaron los duplicados encontrados en el set de datos.
-    if df.duplicated().sum() > 0:
-        df = df.drop_duplicates().reset_index(drop=True)
-        
-    df = df.fillna("")
-    
-    # Se hizo la extracción del artículo de delito para una mejor categorización.
-    if 'DESCRIPCION_CONDUCTA' in df.columns:
-        df['ARTICULO'] = df['DESCRIPCION_CONDUCTA'].astype(str).str.split('.').str[0]
-        df['ARTICULO'] = df['ARTICULO'].apply(lambda x: limpiar_texto(x, espacios_a_guion=False))
-
-    return df
+    return solo_lectura(cargar_datos_limpios(data_input))
 
-def generar_kpis_y_analisis(df: pd.DataFrame) -> Dict[str, Any]:
+@st.cache_resource
+def obtener_cubo(data_input: Any) -> pd.DataFrame:
     """
-    Calculamos los KPIs clave para tener un Resumen Ejecutivo rápido de los hallazgos.
-    Se hizo un cálculo para la tendencia histórica.
+    Se construye una sola vez por archivo el cubo ANIO × MES × DEPARTAMENTO × ARTICULO que consultan los gráficos.
+    Si el modo batch ya lo exportó para estos datos, se lee de los artefactos; si no, del que está guardado
+    con la caché en disco (la ingesta incremental lo mantiene al día). Como el dataset, es uno solo
+    y de solo lectura para todas las sesiones.
     """
-    if df.empty: return {}
-
-    kpis = {}
-    kpis["Total Casos"] = df['CANTIDAD'].sum()
-    
-    min_anio = df['ANIO'].min() if df['ANIO'].min() > 0 else None
-    max_anio = df['ANIO'].max() if df['ANIO'].max() > 0 else None
-    kpis["Rango Años"] = f"{min_anio} - {max_anio}" if min_anio and max_anio else "N/A"
-    
-    if 'ARTICULO' in df.columns and len(df['ARTICULO'].unique()) > 1:
-        kpis["Delito Mas Frecuente"] = df.groupby('ARTICULO')['CANTIDAD'].sum().idxmax()
-        
-    if 'DEPARTAMENTO' in df.columns and len(df['DEPARTAMENTO'].unique()) > 1:
-        kpis["Departamento Mas Afecstado"] = df.groupby('DEPARTAMENTO')['CANTIDAD'].sum().idxmax()
-        
-    kpis["Tendencia Diff"] = 0
-    kpis["Tendencia General"] = "N/A"
-    # Se hizo la lógica para calcular la variación entre el año inicial y final
-    if min_anio and max_anio and min_anio != max_anio:
-        casos_inicial = df[df['ANIO'] == min_anio]['CANTIDAD'].sum()
-        casos_final = df[df['ANIO'] == max_anio]['CANTIDAD'].sum()
-        
-        if casos_inicial > 0 and casos_final > 0:
-            crecimiento_porcentual = ((casos_final - casos_inicial) / casos_inicial) * 100
-            kpis["Tendencia Diff"] = crecimiento_porcentual
-            if crecimiento_porcentual > 5: kpis["Tendencia General"] = "crecimiento"
-            elif crecimiento_porcentual < -5: kpis["Tendencia General"] = "disminución"
-            else: kpis["Tendencia General"] = "estable"
-        elif casos_final > 0 and casos_inicial == 0: kpis["Tendencia General"] = "crecimiento explosivo"
-        else: kpis["Tendencia General"] = "datos insuficientes"
-        
-    return kpis
+    df = cargar_y_limpiar_datos(data_input)
+    cubo = leer_cubo_precalculado(df.attrs['huella']) if 'huella' in df.attrs else None
+    return solo_lectura(cubo if cubo is not None else cubo_del_dataset(df))
+
+@st.cache_resource
+def obtener_indice_filtros(data_input: Any) -> IndiceFiltros:
+    """Se arman una sola vez por archivo los índices del panel de filtros, compartidos por todas las sesiones."""
+    df = cargar_y_limpiar_datos(data_input)
+    with etapa("filtros.indice", len(df)): return IndiceFiltros(df, obtener_cubo(data_input))
+
+@st.cache_resource
+def obtener_fuente_sqlite(data_input: Any) -> Optional[FuenteSQLite]:
+    """Con DELITOS_BACKEND=sqlite, una sola base abierta por archivo para todas las sesiones; las filas no se cargan."""
+    with etapa("sqlite.apertura"): return abrir_fuente_sqlite(data_input)
+
+def resumen_dataset(df: pd.DataFrame) -> Dict[str, Any]:
+    """Datos de la vista previa del dataset en memoria, con las mismas claves que FuenteSQLite.resumen."""
+    # Como en rango_anios, los registros sin fecha (ANIO = 0) no cuentan para los años cubiertos.
+    anios = df['ANIO'].to_numpy()
+    anios = anios[anios > 0]
+    return {
+        "filas": len(df), "columnas": len(df.columns),
+        "anios": (int(anios.min()), int(anios.max())) if len(anios) else (0, 0),
+        "fechas_invalidas": contar_fechas_invalidas(df), "duplicados_eliminados": df.attrs.get('duplicados_eliminados', 0),
+        "mb": uso_memoria_por_columna(df).sum() / 2**20,
+    }
+
+@st.cache_resource
+def obtener_cache_figuras() -> CacheFiguras:
+    """Una sola caché de figuras por proceso, compartida por todas las sesiones."""
+    return CacheFiguras()
+
+@st.cache_resource
+def precargar_artefactos(huella: str) -> int:
+    """
+    Una vez por proceso y por dataset, las figuras exportadas por el modo batch entran a la caché de figuras
+    y sus tablas de estacionalidad a la memoria de analisis.py.
+    """
+    with etapa("artefactos.precarga") as registro:
+        registro.detalle['figuras'] = precargar_figuras(huella, obtener_cache_figuras())
+        tablas = leer_estacionalidad_precalculada(huella)
+        if tablas is not None: memorizar_estacionalidad(huella, tablas)
+        registro.detalle['estacionalidad'] = tablas is not None
+    return registro.detalle['figuras']
+
+def figura_cacheada(generador: Callable[..., go.Figure], cubo: pd.DataFrame, **parametros: Any) -> go.Figure:
+    """Se sirve la figura ya construida para estos datos y parámetros; solo se genera en el primer pedido."""
+    clave = clave_figura(cubo.attrs.get('huella', ''), generador.__name__, **parametros)
+    construida = False
+    def construir() -> go.Figure:
+        nonlocal construida
+        construida = True
+        return para_transporte(generador(cubo, **parametros))
+
+    with etapa(f"figura.{generador.__name__}", len(cubo)) as registro:
+        figura = obtener_cache_figuras().obtener(clave, construir)
+        registro.detalle['cache'] = "fallo" if construida else "acierto"
+        registro.detalle['kb'] = round((obtener_cache_figuras().bytes_de(clave) or 0) / 1024, 1)
+    return figura
 
 # ==============================================================================
-# FUNCIONES DE VISUALIZACIÓN (MEJORADAS PARA FONDO NEGRO)
+# SECCIONES DEL DASHBOARD (SOLO SE CONSTRUYE LA QUE ESTÁ ABIERTA)
 # ==============================================================================
 
-def generar_tendencia_anual(df: pd.DataFrame, theme: Optional[str] = None) -> go.Figure:
-    """Se hizo este gráfico de barras para visualizar la tendencia histórica por intervalos de año."""
-    if df.empty or 'ANIO' not in df.columns: return go.Figure()
-    max_anio = df['ANIO'].max() if not df.empty else 2025
-    bins = [2000, 2005, 2010, 2015, 2020, max_anio + 1]
-    labels = [f"{bins[i]}-{bins[i+1]-1}" for i in range(len(bins)-1)]
-    df_tendencia = df[(df['ANIO'] >= 2000) & (df['ANIO'] <= max_anio)].copy()
-    df_tendencia['INTERVALO_ANIO'] = pd.cut(df_tendencia['ANIO'], bins=bins, labels=labels, right=False)
-    df_tendencia_intervalos = (df_tendencia.groupby('INTERVALO_ANIO', observed=False)['CANTIDAD'].sum().reset_index())
-
-    fig = px.bar(
-        df_tendencia_intervalos, 
-        x='INTERVALO_ANIO', 
-        y='CANTIDAD', 
-        color='CANTIDAD',
-        color_continuous_scale='Viridis',  # Escala que funciona bien en fondo oscuro
-        text_auto=True,
-        template='plotly_dark'  # Tema oscuro para Plotly
-    )
-    
-    # Mejoras en la visualización para fondo negro
-    fig.update_traces(
-        texttemplate='%{value:,.0f}', 
-        textposition='outside',
-        textfont=dict(color='#ffffff', size=12),
-        marker_line_color='rgba(255, 255, 255, 0.3)',
-        marker_line_width=1,
-        opacity=0.9
-    )
-    
-    fig.update_layout(
-        title_text="<b>📈 Tendencia de Casos por Intervalos de Año</b>", 
-        title_font=dict(size=18, color='#ffffff'),
-        xaxis_title="Intervalo de Años", 
-        yaxis_title="Número de Casos", 
-        margin=dict(t=60, b=50, l=50, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        font=dict(size=12, color='#e0e0e0'),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
-        )
-    )
-    return fig
-
-
-def generar_top_conductas(df: pd.DataFrame, n_top: int = 8, theme: Optional[str] = None) -> go.Figure:
-    """Se hizo este gráfico de barras horizontales para identificar el Top N de Artículos de delito (Visión General)."""
-    if df.empty or 'ARTICULO' not in df.columns: return go.Figure()
-    df_conducta_top = (df.groupby('ARTICULO')['CANTIDAD'].sum().nlargest(n_top).reset_index())
-
-    fig = px.bar(
-        df_conducta_top, 
-        x='CANTIDAD', 
-        y='ARTICULO', 
-        orientation='h', 
-        color='CANTIDAD',
-        color_continuous_scale='Plasma',  # Escala vibrante para fondo oscuro
-        text_auto=True,
-        template='plotly_dark'
-    )
-    
-    # Mejoras en la visualización
-    fig.update_traces(
-        texttemplate='%{value:,.0f}',
-        textposition='outside',
-        textfont=dict(color='#ffffff', size=11),
-        marker_line_color='rgba(255, 255, 255, 0.3)',
-        marker_line_width=1,
-        opacity=0.9
-    )
-    
-    fig.update_layout(
-        title_text=f"<b>🔥 Top {n_top} Artículos de Conductas Delictivas Ambientales</b>", 
-        title_font=dict(size=18, color='#ffffff'),
-        xaxis_title="Número de Casos", 
-        yaxis_title="Artículo de Delito", 
-        margin=dict(t=60, b=50, l=200, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        font=dict(size=12, color='#e0e0e0'),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
-        ),
-        yaxis=dict(
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0', size=11),
-            autorange="reversed",
-            categoryorder='total ascending'
-        )
-    )
-    return fig
-
-
-def generar_top_departamentos(df: pd.DataFrame, n_top: int = 10, theme: Optional[str] = None) -> go.Figure:
-    """Este gráfico se hizo para mostrar el Top N de departamentos más afectados, el foco geográfico."""
-    if df.empty or 'DEPARTAMENTO' not in df.columns: return go.Figure()
-    df_depto_top = (df.groupby('DEPARTAMENTO')['CANTIDAD'].sum().nlargest(n_top).reset_index())
-
-    fig = px.bar(
-        df_depto_top, 
-        x='DEPARTAMENTO', 
-        y='CANTIDAD', 
-        color='CANTIDAD',
-        color_continuous_scale='Oranges',
-        text_auto=True,
-        template='plotly_dark'
-    )
+def seccion_evolucion_temporal(cubo: pd.DataFrame, kpis: ResumenKPI, plotly_theme: str) -> None:
+    """Se hizo la sección de evolución temporal: trayectoria de los delitos principales y mapa de calor."""
+    st.markdown("""
+    <div style="background: linear-gradient(90deg, rgba(0, 212, 255, 0.1), transparent); 
+                padding: 15px; border-radius: 8px; margin-bottom: 20px;">
+        <h2>📈 ANÁLISIS DE LA DINÁMICA DEL DELITO AMBIENTAL</h2>
+        <p style="color: #b0b0b0;">Evolución histórica y patrones temporales de los delitos ambientales</p>
+    </div>
+    """, unsafe_allow_html=True)
     
-    # Mejoras en la visualización
-    fig.update_traces(
-        texttemplate='%{value:,.0f}',
-        textposition='outside',
-        textfont=dict(color='#ffffff', size=11),
-        marker_line_color='rgba(255, 255, 255, 0.3)',
-        marker_line_width=1,
-        opacity=0.9
-    )
+    col_t1_1, col_t1_2 = st.columns(2)
     
-    fig.update_layout(
-        title_text=f"<b>📍 Top {n_top} Departamentos más Afectados</b>", 
-        title_font=dict(size=18, color='#ffffff'),
-        xaxis_title="Departamento", 
-        yaxis_title="Número de Casos", 
-        xaxis_tickangle=-45, 
-        margin=dict(t=60, b=120, l=50, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        font=dict(size=12, color='#e0e0e0'),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0', size=10)
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
-        )
-    )
-    return fig
-
-
-def generar_heatmap_conducta_anual(df: pd.DataFrame, theme: Optional[str] = None) -> go.Figure:
-    """Se hizo un Mapa de calor para mostrar la evolución de los delitos por año (usando Escala Log para suavizar)."""
-    if df.empty or 'ARTICULO' not in df.columns or 'ANIO' not in df.columns: return go.Figure()
-    df_heatmap_data = (df.groupby(['ANIO', 'ARTICULO'])['CANTIDAD'].sum().reset_index())
-    df_heatmap_pivot = df_heatmap_data.pivot_table(index='ARTICULO', columns='ANIO', values='CANTIDAD', fill_value=0)
-    df_heatmap_log = np.log1p(df_heatmap_pivot)
-
-    fig = px.imshow(
-        df_heatmap_log, 
-        x=df_heatmap_log.columns.astype(str), 
-        y=df_heatmap_log.index,
-        color_continuous_scale='YlOrRd',
-        aspect="auto", 
-        template='plotly_dark',
-        text_auto=False,
-        labels=dict(color="Log(1 + Casos)")
-    )
+    with col_t1_1:
+        fig_evolucion = figura_cacheada(generar_evolucion_top5_conductas, cubo, theme=plotly_theme)
+        st.plotly_chart(fig_evolucion, use_container_width=True)
 
-    # Mejoras en la visualización
-    fig.update_layout(
-        title_text="<b>🌡️ Mapa de Calor: Evolución Temporal por Tipo de Delito (Log)</b>", 
-        title_font=dict(size=18, color='#ffffff'),
-        xaxis_title="Año", 
-        yaxis_title="Artículo de Delito", 
-        xaxis_tickangle=-45, 
-        height=700, 
-        margin=dict(t=70, b=50, l=200, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        font=dict(size=12, color='#e0e0e0'),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0', size=10)
-        ),
-        yaxis=dict(
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0', size=9)
-        )
-    )
-    fig.update_coloraxes(
-        colorbar_title='Log(1 + Casos)',
-        colorbar_title_font=dict(size=12, color='#e0e0e0'),
-        colorbar_tickfont=dict(size=10, color='#b0b0b0')
-    )
+    with col_t1_2:
+        fig_heatmap = figura_cacheada(generar_heatmap_conducta_anual, cubo, theme=plotly_theme)
+        st.plotly_chart(fig_heatmap, use_container_width=True)
+        
+    st.info("""
+    💡 **ANÁLISIS DE LA SECCIÓN:**  
+    • El gráfico de líneas muestra la trayectoria individual de los delitos más significativos.  
+    • El Mapa de Calor (con escala logarítmica) revela visualmente qué delitos persisten o emergen con fuerza a lo largo de los años.
+    """)
+
+    tabla_crecimiento(cubo)
+
+
+def tabla_crecimiento(cubo: pd.DataFrame) -> None:
+    """Se hizo el ranking de crecimiento: CAGR, variación anual y media móvil de cada artículo o departamento."""
+    st.subheader("🚀 **CRECIMIENTO MÁS RÁPIDO**")
+    etiquetas = {"Artículo": 'ARTICULO', "Departamento": 'DEPARTAMENTO'}
+    eleccion = st.radio("Serie", list(etiquetas), horizontal=True, key="serie_crecimiento", label_visibility="collapsed")
+    ranking = ranking_crecimiento(cubo, etiquetas[eleccion])
+    if ranking.empty:
+        st.warning("⚠️ **Datos insuficientes para calcular tendencias.**")
+        return
+    anio = ranking.attrs['anio']
+    # Las columnas se ordenan con un clic en el encabezado.
+    st.dataframe(ranking, hide_index=True, column_config={
+        etiquetas[eleccion]: eleccion,
+        'CAGR': st.column_config.NumberColumn(f"CAGR {ranking.attrs['anios_cagr']} años (%)", format="%.1f"),
+        'VARIACION_ANUAL': st.column_config.NumberColumn(f"Variación {anio} (%)", format="%.1f"),
+        'CASOS_ULTIMO_ANIO': st.column_config.NumberColumn(f"Casos {anio}", format="%.0f"),
+        'MEDIA_MOVIL': st.column_config.NumberColumn("Media móvil 3 años", format="%.0f"),
+    })
+    if ranking.attrs['meses'] < 12:
+        st.caption(f"{anio} tiene datos hasta el mes {ranking.attrs['meses']}: sus casos son el año completo estimado "
+                   f"con la variación frente al mismo período de {anio - 1}.")
+
+
+def seccion_concentracion_geografica(cubo: pd.DataFrame, kpis: ResumenKPI, plotly_theme: str) -> None:
+    """Se hizo la sección de concentración por departamento y por artículo, con la tendencia a largo plazo."""
+    st.markdown("""
+    <div style="background: linear-gradient(90deg, rgba(0, 255, 136, 0.1), transparent); 
+                padding: 15px; border-radius: 8px; margin-bottom: 20px;">
+        <h2>🗺️ DISTRIBUCIÓN DE CASOS POR UBICACIÓN Y TIPOLOGÍA</h2>
+        <p style="color: #b0b0b0;">Análisis espacial y clasificación de tipos de delito</p>
+    </div>
+    """, unsafe_allow_html=True)
     
-    return fig
+    col_t2_1, col_t2_2 = st.columns(2)
 
-
-def generar_evolucion_top5_conductas(df: pd.DataFrame, theme: Optional[str] = None) -> go.Figure:
-    """Se hizo este gráfico de líneas para rastrear la evolución anual de las 5 conductas más frecuentes."""
-    if df.empty or 'ARTICULO' not in df.columns or 'ANIO' not in df.columns: return go.Figure()
-
-    top5_articulos = df.groupby('ARTICULO')['CANTIDAD'].sum().nlargest(5).index.tolist()
-    df_top5_filtrado = df[df['ARTICULO'].isin(top5_articulos)].copy()
-    df_tendencia = (df_top5_filtrado.groupby(['ANIO', 'ARTICULO'])['CANTIDAD'].sum().reset_index())
-    
-    fig = px.line(
-        df_tendencia, 
-        x='ANIO', 
-        y='CANTIDAD', 
-        color='ARTICULO', 
-        markers=True, 
-        line_shape='spline', 
-        template='plotly_dark',
-        line_dash_sequence=['solid', 'dash', 'dot', 'dashdot', 'longdash'],
-        symbol_sequence=['circle', 'square', 'diamond', 'cross', 'x']
-    )
+    with col_t2_1:
+        fig_depto = figura_cacheada(generar_top_departamentos, cubo, theme=plotly_theme)
+        st.plotly_chart(fig_depto, use_container_width=True)
     
-    # Mejoras en la visualización
-    fig.update_traces(
-        mode='lines+markers',
-        marker=dict(size=9),
-        line=dict(width=3.5)
-    )
-    
-    fig.update_layout(
-        title="<b>📊 Evolución Anual de las 5 Conductas más Frecuentes</b>",
-        title_font=dict(size=18, color='#ffffff'),
-        xaxis_title="Año", 
-        yaxis_title="Cantidad de Casos", 
-        legend_title="Artículo", 
-        hovermode="x unified",
-        font=dict(color="#e0e0e0"),
-        hoverlabel=dict(
-            bgcolor="rgba(20, 20, 30, 0.9)", 
-            font_color="white",
-            font_size=12
-        ), 
-        margin=dict(t=70, b=50, l=50, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickformat="d",
-            tickfont=dict(color='#b0b0b0')
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
-        ),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.3,
-            xanchor="center",
-            x=0.5,
-            font=dict(size=11, color='#e0e0e0'),
-            bgcolor='rgba(20, 20, 30, 0.7)',
-            bordercolor='rgba(0, 212, 255, 0.3)',
-            borderwidth=1
-        )
-    )
+    with col_t2_2:
+        fig_conducta = figura_cacheada(generar_top_conductas, cubo, theme=plotly_theme)
+        st.plotly_chart(fig_conducta, use_container_width=True)
+        
+    st.info("""
+    💡 **ANÁLISIS DE LA SECCIÓN:**  
+    • Comparación de concentraciones por Departamento (dónde ocurre) y por Artículo (qué ocurre).  
+    • El gráfico de tendencia a largo plazo proporciona contexto histórico general.
+    """)
     
-    return fig
+    fig_tendencia = figura_cacheada(generar_tendencia_anual, cubo, theme=plotly_theme)
+    st.plotly_chart(fig_tendencia, use_container_width=True)
 
 
-def generar_distribucion_top_depto_bar(df: pd.DataFrame, depto_critico: str, theme: Optional[str] = None) -> go.Figure:
-    """Generamos un gráfico de barras horizontal de la distribución de delitos en el departamento más afectado."""
-    if df.empty or 'DEPARTAMENTO' not in df.columns or depto_critico == "N/A": return go.Figure()
-    
-    df_filtrado = df[df['DEPARTAMENTO'] == depto_critico].copy()
-    df_distribucion = df_filtrado.groupby('ARTICULO')['CANTIDAD'].sum().nlargest(5).reset_index()
-    
-    fig = px.bar(
-        df_distribucion, 
-        x='CANTIDAD', 
-        y='ARTICULO', 
-        orientation='h',
-        title=f'<b>📋 Composición del Delito en: {depto_critico}</b>',
-        template='plotly_dark',
-        color='CANTIDAD',
-        color_continuous_scale='Reds',
-        text_auto=True
-    )
-    
-    # Mejoras en la visualización
-    fig.update_traces(
-        texttemplate='%{value:,.0f}',
-        textposition='outside',
-        textfont=dict(color='#ffffff', size=11),
-        marker_line_color='rgba(255, 255, 255, 0.3)',
-        marker_line_width=1,
-        opacity=0.9
-    )
+def seccion_focos_decision(cubo: pd.DataFrame, kpis: ResumenKPI, plotly_theme: str) -> None:
+    """Se hizo la sección de conclusiones visuales sobre el departamento y el delito más críticos."""
+    st.markdown("""
+    <div style="background: linear-gradient(90deg, rgba(255, 107, 0, 0.1), transparent); 
+                padding: 15px; border-radius: 8px; margin-bottom: 20px;">
+        <h2>🎯 RECOMENDACIONES ESTRATÉGICAS BASADAS EN HALLAZGOS</h2>
+        <p style="color: #b0b0b0;">Enfoque en puntos críticos para maximizar impacto en mitigación</p>
+    </div>
+    """, unsafe_allow_html=True)
     
-    fig.update_layout(
-        title_font=dict(size=16, color='#ffffff'),
-        yaxis_title="Artículo de Delito", 
-        xaxis_title="Número de Casos", 
-        margin=dict(t=60, b=50, l=200, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        font=dict(size=12, color='#e0e0e0'),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
-        ),
-        yaxis=dict(
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0', size=11),
-            autorange="reversed",
-            categoryorder='total ascending'
-        )
+    # Uso de kpis para obtener los focos
+    depto_critico = kpis.departamento_mas_afectado
+    delito_critico = kpis.delito_mas_frecuente
+    
+    col_t3_1, col_t3_2 = st.columns(2)
+    
+    # Desglose Geográfico (Gráfico de barras horizontal)
+    with col_t3_1:
+        st.markdown(f"""
+        <div style="background: rgba(20, 20, 30, 0.7); padding: 15px; border-radius: 8px; border-left: 4px solid #00d4ff;">
+            <h3>📍 COMPOSICIÓN DEL DELITO EN: {depto_critico}</h3>
+            <p style="color: #b0b0b0;">
+            <strong>Recomendación:</strong> Priorizar los <strong>2-3 artículos</strong> más relevantes en este gráfico 
+            para maximizar la reducción del delito en <strong>{depto_critico}</strong>.
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        if depto_critico != 'N/A':
+            fig_dist_depto = figura_cacheada(generar_distribucion_top_depto_bar, cubo, depto_critico=depto_critico, theme=plotly_theme)
+            st.plotly_chart(fig_dist_depto, use_container_width=True)
+            fig_pronostico = figura_cacheada(generar_pronostico_mensual, cubo, dimension='DEPARTAMENTO', valor=depto_critico, theme=plotly_theme)
+            st.plotly_chart(fig_pronostico, use_container_width=True)
+        else:
+            st.warning("⚠️ **Datos insuficientes para desglose geográfico.**")
+    
+    # Estacionalidad del Delito Principal
+    with col_t3_2:
+        st.markdown(f"""
+        <div style="background: rgba(20, 20, 30, 0.7); padding: 15px; border-radius: 8px; border-left: 4px solid #ff6b00;">
+            <h3>⏱️ ESTACIONALIDAD DEL DELITO PRINCIPAL: {delito_critico}</h3>
+            <p style="color: #b0b0b0;">
+            <strong>Recomendación:</strong> Asignar recursos operativos <strong>1-2 meses antes</strong> 
+            de los <strong>picos de casos</strong> observados en este gráfico de estacionalidad 
+            y de los que anticipa el <strong>pronóstico</strong> (línea naranja).
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        if delito_critico != 'N/A':
+            fig_dist_mensual = figura_cacheada(generar_distribucion_mensual, cubo, delito_critico=delito_critico, theme=plotly_theme)
+            st.plotly_chart(fig_dist_mensual, use_container_width=True)
+        else:
+            st.warning("⚠️ **Datos insuficientes para análisis de estacionalidad.**")
+
+    panel_estacionalidad(cubo, plotly_theme)
+
+
+def panel_estacionalidad(cubo: pd.DataFrame, plotly_theme: str) -> None:
+    """Se hizo el panel de meses pico y anomalías de cada departamento × artículo, para planear despliegues."""
+    st.subheader("📆 **MESES PICO Y ANOMALÍAS POR DEPARTAMENTO × ARTÍCULO**")
+    tablas = estacionalidad(cubo)
+    if tablas.series.empty:
+        st.warning("⚠️ **Datos insuficientes para análisis de estacionalidad.**")
+        return
+    col_sel1, col_sel2 = st.columns(2)
+    with col_sel1:
+        departamentos = st.multiselect("**Departamento**", sorted(tablas.series['DEPARTAMENTO'].unique()),
+                                       key="estacionalidad_departamentos", placeholder="Todos")
+    with col_sel2:
+        articulos = st.multiselect("**Artículo**", sorted(tablas.series['ARTICULO'].unique()),
+                                   key="estacionalidad_articulos", placeholder="Todos")
+    seleccion = (tuple(sorted(departamentos)), tuple(sorted(articulos)))
+
+    fig_indice = figura_cacheada(generar_indice_estacional, cubo, departamentos=seleccion[0], articulos=seleccion[1], theme=plotly_theme)
+    st.plotly_chart(fig_indice, use_container_width=True)
+
+    series, anomalias = picos_y_anomalias(tablas, *seleccion)
+    col_tab1, col_tab2 = st.columns(2)
+    with col_tab1:
+        st.dataframe(
+            series[['DEPARTAMENTO', 'ARTICULO', 'CASOS', 'MES_PICO', 'INDICE_PICO']]
+            .assign(MES_PICO=[NOMBRES_MESES[mes - 1] if mes > 0 else None for mes in series['MES_PICO']]),
+            hide_index=True, column_config={
+                'CASOS': st.column_config.NumberColumn("Casos", format="%d"),
+                'MES_PICO': "Mes pico",
+                'INDICE_PICO': st.column_config.NumberColumn("Índice del pico", format="%.2f"),
+            })
+    with col_tab2:
+        st.dataframe(anomalias, hide_index=True, column_config={
+            'ANIO': st.column_config.NumberColumn("Año", format="%d"),
+            'CANTIDAD': st.column_config.NumberColumn("Casos", format="%d"),
+            'ESPERADO': st.column_config.NumberColumn("Esperado", format="%.1f"),
+            'Z': st.column_config.NumberColumn("Z robusto", format="%.1f"),
+        })
+    st.caption(f"El índice de cada mes es su promedio de casos sobre el de un mes promedio de la serie. Las anomalías son "
+               f"meses con |Z| > {UMBRAL_Z_ANOMALIA} frente a la serie desestacionalizada (mediana y MAD), en las series "
+               f"con al menos {MIN_MEDIANA_MENSUAL_ANOMALIAS:.0f} casos en un mes típico.")
+
+
+# Secciones del selector, en el orden de las antiguas pestañas.
+SECCIONES: Dict[str, Callable[[pd.DataFrame, ResumenKPI, str], None]] = {
+    "📉 **EVOLUCIÓN TEMPORAL**": seccion_evolucion_temporal,
+    "🗺️ **CONCENTRACIÓN GEOGRÁFICA**": seccion_concentracion_geografica,
+    "🎯 **FOCOS DE DECISIÓN**": seccion_focos_decision,
+}
+
+
+def panel_filtros(indice: FuenteDatos) -> Filtros:
+    """Se hizo el panel de filtros; sin selección se analiza el dataset completo."""
+    anio_min, anio_max = indice.rango_anios()
+    with st.expander("🎛️ **FILTROS**"):
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            desde, hasta = anio_min, anio_max
+            if anio_min < anio_max: desde, hasta = st.slider("**Años**", anio_min, anio_max, (anio_min, anio_max))
+            departamentos = st.multiselect("**Departamento**", indice.valores('DEPARTAMENTO'))
+            # Solo se ofrecen los municipios de los departamentos elegidos.
+            municipios = st.multiselect("**Municipio**", indice.valores('MUNICIPIO', Filtros(departamentos=tuple(departamentos))))
+        with col_f2:
+            articulos = st.multiselect("**Artículo**", indice.valores('ARTICULO'))
+            zonas = st.multiselect("**Zona**", indice.valores('ZONA'))
+
+    rango_completo = (desde, hasta) == (anio_min, anio_max)
+    return Filtros(
+        anio_desde=None if rango_completo else desde,
+        anio_hasta=None if rango_completo else hasta,
+        departamentos=tuple(departamentos), municipios=tuple(municipios),
+        articulos=tuple(articulos), zonas=tuple(zonas),
     )
-    return fig
 
 
-def generar_distribucion_mensual(df: pd.DataFrame, delito_critico: str, theme: Optional[str] = None) -> go.Figure:
-    """Generamos un gráfico de barras para la distribución mensual del delito más frecuente (Estacionalidad)."""
-    if df.empty or 'FECHA_HECHO' not in df.columns or delito_critico == "N/A": return go.Figure()
-    
-    df_filtrado = df[df['ARTICULO'] == delito_critico].copy()
-    
-    try:
-        # Se hizo la conversión segura a datetime
-        df_filtrado['FECHA_DT'] = pd.to_datetime(df_filtrado['FECHA_HECHO'], errors='coerce')
-        df_filtrado = df_filtrado.dropna(subset=['FECHA_DT'])
-    except Exception: return go.Figure()
-        
-    df_filtrado['MES'] = df_filtrado['FECHA_DT'].dt.month
-    df_mensual = (df_filtrado.groupby('MES')['CANTIDAD'].sum().reset_index())
-    
-    meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-    df_mensual['NOMBRE_MES'] = df_mensual['MES'].apply(lambda x: meses[x-1])
-    
-    fig = px.bar(
-        df_mensual, 
-        x='NOMBRE_MES', 
-        y='CANTIDAD', 
-        title=f'<b>📅 Estacionalidad Mensual del Delito: {delito_critico}</b>',
-        template='plotly_dark',
-        color='CANTIDAD',
-        color_continuous_scale='Viridis',
-        text_auto=True,
-        category_orders={"NOMBRE_MES": meses}
-    )
-    
-    # Mejoras en la visualización
-    fig.update_traces(
-        texttemplate='%{value:,.0f}',
-        textposition='outside',
-        textfont=dict(color='#ffffff', size=11),
-        marker_line_color='rgba(255, 255, 255, 0.3)',
-        marker_line_width=1,
-        opacity=0.9
-    )
-    
-    fig.update_layout(
-        title_font=dict(size=16, color='#ffffff'),
-        xaxis_title="Mes", 
-        yaxis_title="Casos Acumulados", 
-        margin=dict(t=60, b=50, l=50, r=50),
-        plot_bgcolor='rgba(15, 15, 25, 0.8)',
-        paper_bgcolor='rgba(15, 15, 25, 0.5)',
-        font=dict(size=12, color='#e0e0e0'),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickangle=0,
-            tickfont=dict(color='#b0b0b0')
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 100, 150, 0.2)',
-            title_font=dict(size=14, color='#00d4ff'),
-            tickfont=dict(color='#b0b0b0')
+def panel_diagnostico(segundos_corrida: float) -> None:
+    """Se hizo el panel de diagnóstico: cada etapa medida en este rerun, con tiempo, filas y memoria."""
+    registros = registros_corrida()
+    with st.expander("🩺 **DIAGNÓSTICO DE RENDIMIENTO**"):
+        kb_figuras = sum(r.detalle.get('kb', 0) for r in registros)
+        st.caption(f"Rerun completo en {segundos_corrida * 1000:,.0f} ms · {len(registros)} etapas medidas · "
+                   f"{kb_figuras:,.1f} KB de figuras enviadas")
+        if not registros: return
+        tabla = pd.DataFrame([{
+            "Etapa": " " * r.nivel + r.nombre,
+            "Filas entrada": r.filas_entrada,
+            "Filas salida": r.filas_salida,
+            "Tiempo (ms)": round(r.segundos * 1000, 1),
+            "Δ Memoria (MB)": round(r.memoria_delta_mb, 1),
+            "Detalle": ", ".join(f"{k}={v}" for k, v in r.detalle.items()),
+        } for r in registros])
+        st.dataframe(tabla, hide_index=True)
+        st.download_button(
+            "⬇️ Descargar JSON", json.dumps([vars(r) for r in registros], default=str, indent=2),
+            file_name="diagnostico_etapas.json", mime="application/json",
         )
-    )
-    return fig
 
 
 # ==============================================================================
@@ -823,11 +622,13 @@ def generar_distribucion_mensual(df: pd.DataFrame, delito_critico: str, theme: O
 # ==============================================================================
 
 def main():
-    """Se hizo el montaje del layout minimalista y estructurado usando pestañas (st.tabs)."""
+    """Se hizo el montaje del layout minimalista y estructurado por secciones (una visible a la vez)."""
     
     # --- 1. INICIALIZACIÓN DE VARIABLES CRÍTICAS ---
+    iniciar_corrida()
+    inicio_corrida = time.perf_counter()
     df = pd.DataFrame()
-    plotly_theme = 'plotly_dark'  # Tema oscuro por defecto
+    plotly_theme = TEMA_POR_DEFECTO  # Tema oscuro por defecto
     data_input = None
 
     # Título principal con estilo profesional
@@ -864,7 +665,16 @@ def main():
 
     # --- Carga de Datos y Verificación de la Integridad ---
     with st.spinner('🔄 Cargando, limpiando y estandarizando datos...'):
-        df = cargar_y_limpiar_datos(data_input) 
+        with etapa("carga_dataset", backend=BACKEND_DATOS) as registro:
+            if BACKEND_DATOS == "sqlite":
+                # Solo la muestra de la vista previa sale de la base; el resto se consulta allí.
+                fuente_sqlite = obtener_fuente_sqlite(data_input)
+                df = pd.DataFrame() if fuente_sqlite is None else fuente_sqlite.muestra(5)
+                resumen = {} if fuente_sqlite is None else fuente_sqlite.resumen()
+            else:
+                df = cargar_y_limpiar_datos(data_input)
+                resumen = resumen_dataset(df)
+            registro.filas_salida = resumen.get('filas', 0)
 
     # Verificación de datos
     if df.empty:
@@ -885,9 +695,19 @@ def main():
                 'border-color': 'rgba(0, 212, 255, 0.2)'
             }))
         with col_data2:
-            st.metric("**Registros Totales**", f"{len(df):,}")
-            st.metric("**Columnas**", len(df.columns))
-            st.metric("**Años Cubiertos**", f"{df['ANIO'].min()} - {df['ANIO'].max()}")
+            st.metric("**Registros Totales**", f"{resumen['filas']:,}")
+            st.metric("**Columnas**", resumen['columnas'])
+            st.metric("**Años Cubiertos**", f"{resumen['anios'][0]} - {resumen['anios'][1]}")
+            st.metric("**SQLite en Disco**" if BACKEND_DATOS == "sqlite" else "**Memoria en Uso**", f"{resumen['mb']:,.1f} MB")
+            st.metric("**Fechas Inválidas**", f"{resumen['fechas_invalidas']:,}")
+            st.metric("**Duplicados Eliminados**", f"{resumen['duplicados_eliminados']:,}")
+
+    # Los KPIs y todos los gráficos consultan el cubo pre-agregado (ya filtrado), no las filas.
+    if 'huella' in df.attrs: precargar_artefactos(df.attrs['huella'])
+    indice_filtros = fuente_sqlite if BACKEND_DATOS == "sqlite" else obtener_indice_filtros(data_input)
+    filtros = panel_filtros(indice_filtros)
+    cubo = indice_filtros.cubo_filtrado(filtros)
+    kpis = generar_kpis_y_analisis(cubo)
 
     st.markdown("<hr>", unsafe_allow_html=True)
     
@@ -895,165 +715,69 @@ def main():
     # RESUMEN (KPIs DINÁMICOS)
     # --------------------------------------------------------------------------
     st.subheader("📊 **PANORAMA GENERAL: KPIs CLAVE**")
-    
-    kpis = generar_kpis_y_analisis(df)
+    if not filtros.vacios:
+        st.caption(f"🎛️ Filtro activo: {cubo.attrs.get('filas_origen', 0):,} de {indice_filtros.filas:,} registros")
     
     col_kpi1, col_kpi2, col_kpi3, col_kpi4 = st.columns(4)
 
     with col_kpi1: 
         st.metric(
             label="🚨 **TOTAL CASOS REGISTRADOS**", 
-            value=f"{kpis.get('Total Casos', 0):,}",
-            delta=kpis.get('Rango Años', 'N/A'),
+            value=f"{kpis.total_casos:,}",
+            delta=kpis.rango_anios,
             delta_color="off"
         )
 
     with col_kpi2:
         st.metric(
             label="💥 **DELITO PRINCIPAL**",
-            value=kpis.get('Delito Mas Frecuente', 'N/A')[:20] + "..." if len(str(kpis.get('Delito Mas Frecuente', 'N/A'))) > 20 else kpis.get('Delito Mas Frecuente', 'N/A'),
+            value=kpis.delito_mas_frecuente[:20] + "..." if len(kpis.delito_mas_frecuente) > 20 else kpis.delito_mas_frecuente,
             delta="Artículo más frecuente"
         )
 
     with col_kpi3:
         st.metric(
             label="📍 **GEOGRAFÍA CRÍTICA**",
-            value=kpis.get('Departamento Mas Afecstado', 'N/A')[:15] + "..." if len(str(kpis.get('Departamento Mas Afecstado', 'N/A'))) > 15 else kpis.get('Departamento Mas Afecstado', 'N/A'),
+            value=kpis.departamento_mas_afectado[:15] + "..." if len(kpis.departamento_mas_afectado) > 15 else kpis.departamento_mas_afectado,
             delta="Departamento más afectado"
         )
 
-    tendencia_value = f"{kpis.get('Tendencia General', 'N/A').upper()}"
-    tendencia_delta = kpis.get('Tendencia Diff', 0)
+    tendencia_value = kpis.tendencia_general.upper()
+    tendencia_delta = kpis.tendencia_diff
     
     with col_kpi4:
         st.metric(
             label="📈 **VARIACIÓN HISTÓRICA**",
             value=tendencia_value,
-            delta=f"{tendencia_delta:.1f}% vs Año Inicial",
+            delta=f"{tendencia_delta:.1f}% vs Año Inicial" + (f" ({kpis.anio_max} estimado)" if kpis.meses_ultimo_anio < 12 else ""),
             delta_color="inverse" if tendencia_delta < -5 else "normal"
         )
         
     st.markdown("<hr>", unsafe_allow_html=True)
 
     # --------------------------------------------------------------------------
-    # 📑 ESTRUCTURA MODULAR CON PESTAÑAS
+    # 📑 ESTRUCTURA MODULAR POR SECCIONES
     # --------------------------------------------------------------------------
     
-    tab1, tab2, tab3 = st.tabs([
-        "📉 **EVOLUCIÓN TEMPORAL**", 
-        "🗺️ **CONCENTRACIÓN GEOGRÁFICA**", 
-        "🎯 **FOCOS DE DECISIÓN**"
-    ])
-
-    # --- PESTAÑA EVOLUCIÓN TEMPORAL ---
-    with tab1:
-        st.markdown("""
-        <div style="background: linear-gradient(90deg, rgba(0, 212, 255, 0.1), transparent); 
-                    padding: 15px; border-radius: 8px; margin-bottom: 20px;">
-            <h2>📈 ANÁLISIS DE LA DINÁMICA DEL DELITO AMBIENTAL</h2>
-            <p style="color: #b0b0b0;">Evolución histórica y patrones temporales de los delitos ambientales</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col_t1_1, col_t1_2 = st.columns(2)
-        
-        with col_t1_1:
-            fig_evolucion = generar_evolucion_top5_conductas(df, theme=plotly_theme)
-            st.plotly_chart(fig_evolucion, use_container_width=True)
-
-        with col_t1_2:
-            fig_heatmap = generar_heatmap_conducta_anual(df, theme=plotly_theme)
-            st.plotly_chart(fig_heatmap, use_container_width=True)
-            
-        st.info("""
-        💡 **ANÁLISIS DE LA PESTAÑA:**  
-        • El gráfico de líneas muestra la trayectoria individual de los delitos más significativos.  
-        • El Mapa de Calor (con escala logarítmica) revela visualmente qué delitos persisten o emergen con fuerza a lo largo de los años.
-        """)
-
-    # --- PESTAÑA CONCENTRACIÓN GEOGRÁFICA Y TIPOLÓGICA ---
-    with tab2:
-        st.markdown("""
-        <div style="background: linear-gradient(90deg, rgba(0, 255, 136, 0.1), transparent); 
-                    padding: 15px; border-radius: 8px; margin-bottom: 20px;">
-            <h2>🗺️ DISTRIBUCIÓN DE CASOS POR UBICACIÓN Y TIPOLOGÍA</h2>
-            <p style="color: #b0b0b0;">Análisis espacial y clasificación de tipos de delito</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col_t2_1, col_t2_2 = st.columns(2)
-
-        with col_t2_1:
-            fig_depto = generar_top_departamentos(df, theme=plotly_theme)
-            st.plotly_chart(fig_depto, use_container_width=True)
-        
-        with col_t2_2:
-            fig_conducta = generar_top_conductas(df, theme=plotly_theme)
-            st.plotly_chart(fig_conducta, use_container_width=True)
-            
-        st.info("""
-        💡 **ANÁLISIS DE LA PESTAÑA:**  
-        • Comparación de concentraciones por Departamento (dónde ocurre) y por Artículo (qué ocurre).  
-        • El gráfico de tendencia a largo plazo proporciona contexto histórico general.
-        """)
-        
-        fig_tendencia = generar_tendencia_anual(df, theme=plotly_theme)
-        st.plotly_chart(fig_tendencia, use_container_width=True)
-
-    # --- PESTAÑA FOCOS DE DECISIÓN (Conclusiones Visuales) ---
-    with tab3:
-        st.markdown("""
-        <div style="background: linear-gradient(90deg, rgba(255, 107, 0, 0.1), transparent); 
-                    padding: 15px; border-radius: 8px; margin-bottom: 20px;">
-            <h2>🎯 RECOMENDACIONES ESTRATÉGICAS BASADAS EN HALLAZGOS</h2>
-            <p style="color: #b0b0b0;">Enfoque en puntos críticos para maximizar impacto en mitigación</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Uso de kpis para obtener los focos
-        depto_critico = kpis.get('Departamento Mas Afecstado', 'N/A')
-        delito_critico = kpis.get('Delito Mas Frecuente', 'N/A')
-        
-        col_t3_1, col_t3_2 = st.columns(2)
-        
-        # Desglose Geográfico (Gráfico de barras horizontal)
-        with col_t3_1:
-            st.markdown(f"""
-            <div style="background: rgba(20, 20, 30, 0.7); padding: 15px; border-radius: 8px; border-left: 4px solid #00d4ff;">
-                <h3>📍 COMPOSICIÓN DEL DELITO EN: {depto_critico}</h3>
-                <p style="color: #b0b0b0;">
-                <strong>Recomendación:</strong> Priorizar los <strong>2-3 artículos</strong> más relevantes en este gráfico 
-                para maximizar la reducción del delito en <strong>{depto_critico}</strong>.
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if depto_critico != 'N/A':
-                fig_dist_depto = generar_distribucion_top_depto_bar(df, depto_critico, theme=plotly_theme)
-                st.plotly_chart(fig_dist_depto, use_container_width=True)
-            else:
-                st.warning("⚠️ **Datos insuficientes para desglose geográfico.**")
-        
-        # Estacionalidad del Delito Principal
-        with col_t3_2:
-            st.markdown(f"""
-            <div style="background: rgba(20, 20, 30, 0.7); padding: 15px; border-radius: 8px; border-left: 4px solid #ff6b00;">
-                <h3>⏱️ ESTACIONALIDAD DEL DELITO PRINCIPAL: {delito_critico}</h3>
-                <p style="color: #b0b0b0;">
-                <strong>Recomendación:</strong> Asignar recursos operativos <strong>1-2 meses antes</strong> 
-                de los <strong>picos de casos</strong> observados en este gráfico de estacionalidad.
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if delito_critico != 'N/A':
-                fig_dist_mensual = generar_distribucion_mensual(df, delito_critico, theme=plotly_theme)
-                st.plotly_chart(fig_dist_mensual, use_container_width=True)
-            else:
-                st.warning("⚠️ **Datos insuficientes para análisis de estacionalidad.**")
+    # A diferencia de st.tabs, que construye las tres pestañas en cada rerun, el selector
+    # solo construye los gráficos de la sección abierta. Las ya vistas salen de la caché de figuras.
+    seccion = st.radio(
+        "Sección", list(SECCIONES), horizontal=True, key="seccion", label_visibility="collapsed"
+    )
+    inicio_seccion = time.perf_counter()
+    SECCIONES[seccion](cubo, kpis, plotly_theme)
+    tiempo_seccion = time.perf_counter() - inicio_seccion
 
     # --- Pie de página profesional ---
     st.markdown("<hr>", unsafe_allow_html=True)
+
+    estado_cache = obtener_cache_figuras().estadisticas()
+    st.caption(
+        f"🗂️ Caché de figuras: {estado_cache['aciertos']:,} aciertos · {estado_cache['fallos']:,} fallos · "
+        f"{estado_cache['entradas']} figuras ({estado_cache['memoria_mb']:.1f} MB) · "
+        f"sección renderizada en {tiempo_seccion * 1000:,.0f} ms"
+    )
+    panel_diagnostico(time.perf_counter() - inicio_corrida)
     
     st.markdown("""
     <div style="text-align: center; margin-top: 30px; padding: 20px; border-top: 1px solid rgba(255, 255, 255, 0.1);">
@@ -1065,4 +789,6 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    # El log de etapas (si está activado) recibe la corrida entera al terminar, también si terminó antes de tiempo.
+    try: main()
+    finally: volcar_log()
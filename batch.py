@@ -0,0 +1,193 @@
+# batch.py
+
+"""
+Modo batch, sin Streamlit: limpia el CSV, arma el cubo, los KPIs, las tablas de estacionalidad y anomalías
+de cada departamento × artículo y los pronósticos mensuales, y exporta cada figura del dashboard como JSON
+y/o HTML autónomo, construyendo las figuras en un pool de procesos.
+Todo queda en artefactos/<huella>/ con un manifiesto, que app.py lee al arrancar para servir
+el cubo y las figuras sin calcularlos.
+Uso: python batch.py BD_Delitos_ambientales.csv --formatos json html --procesos 4
+Con --delta nuevas_filas.csv (uno o varios, en orden), las filas del mes se anexan al dataset limpio del export
+en la caché y solo ellas se limpian; el export no se modifica.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from itertools import repeat
+from typing import Any, Dict, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+
+from procesamiento import cargar_con_deltas, cargar_datos_limpios, cubo_del_dataset, VERSION_LIMPIEZA
+from analisis import Estacionalidad, calcular_estacionalidad, generar_kpis_y_analisis
+from cache_figuras import CacheFiguras, clave_figura
+from graficos import GENERADORES, figuras_del_tablero, para_transporte, tamanio_figura
+from instrumentacion import etapa, iniciar_corrida, volcar_log
+from pronosticos import memorizar_pronosticos, pronosticos
+
+# Directorio de los artefactos precalculados; se puede cambiar por variable de entorno.
+DIRECTORIO_ARTEFACTOS = os.environ.get("DELITOS_ARTEFACTOS_DIR", "artefactos")
+FORMATOS_EXPORTACION = ("json", "html")
+
+# Cubo de cada proceso del pool: se recibe una sola vez al iniciar, no con cada figura
+# (con los pronósticos ya ajustados, para que ningún proceso vuelva a ajustarlos).
+_cubo_trabajador: Optional[pd.DataFrame] = None
+
+
+def directorio_artefactos(huella: str) -> str:
+    return os.path.join(DIRECTORIO_ARTEFACTOS, huella)
+
+
+def _iniciar_trabajador(cubo: pd.DataFrame, tabla_pronosticos: pd.DataFrame) -> None:
+    global _cubo_trabajador
+    _cubo_trabajador = cubo
+    memorizar_pronosticos(cubo.attrs['huella'], tabla_pronosticos)
+
+
+def _exportar_figura(generador: str, parametros: Dict[str, Any], destino: str, formatos: Sequence[str]) -> Dict[str, Any]:
+    """Construye una figura en el proceso del pool y la escribe en los formatos pedidos."""
+    inicio = time.perf_counter()
+    figura = para_transporte(GENERADORES[generador](_cubo_trabajador, **parametros))
+    sufijo = hashlib.blake2b(repr(sorted(parametros.items())).encode(), digest_size=4).hexdigest()
+    base = os.path.join("figuras", f"{generador}-{sufijo}")
+    archivos: Dict[str, str] = {}
+    if "json" in formatos:
+        archivos["json"] = base + ".json"
+        with open(os.path.join(destino, archivos["json"]), "w", encoding="utf-8") as f: f.write(figura.to_json())
+    if "html" in formatos:
+        archivos["html"] = base + ".html"
+        figura.write_html(os.path.join(destino, archivos["html"]), include_plotlyjs=True, full_html=True)
+    return {"generador": generador, "parametros": parametros, "archivos": archivos,
+            "bytes": tamanio_figura(figura), "segundos": time.perf_counter() - inicio}
+
+
+def ejecutar_batch(data_input: Any, formatos: Sequence[str] = ("json",), procesos: Optional[int] = None,
+                   deltas: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Precalcula todo lo que pide el dashboard sin filtros y devuelve el manifiesto; con `deltas`, del export
+    más esas filas (cargar_con_deltas).
+    El manifiesto se escribe al final (y de forma atómica): si no existe, los artefactos están incompletos.
+    """
+    df = cargar_con_deltas(data_input, deltas) if deltas else cargar_datos_limpios(data_input)
+    if df.empty: raise ValueError("No se pudo cargar o limpiar el archivo de datos.")
+    huella = df.attrs['huella']
+    cubo = cubo_del_dataset(df)
+    kpis = generar_kpis_y_analisis(cubo)
+
+    destino = directorio_artefactos(huella)
+    os.makedirs(os.path.join(destino, "figuras"), exist_ok=True)
+    with etapa("batch.cubo_parquet", len(cubo)): cubo.to_parquet(os.path.join(destino, "cubo.parquet"), index=False)
+    with etapa("batch.estacionalidad", len(cubo)):
+        tablas = calcular_estacionalidad(cubo)
+        tablas.series.to_parquet(os.path.join(destino, "estacionalidad.parquet"), index=False)
+        tablas.anomalias.to_parquet(os.path.join(destino, "anomalias.parquet"), index=False)
+    # Se ajustan una vez (en su propio pool) y quedan junto a la caché en disco, donde los lee app.py.
+    tabla_pronosticos = pronosticos(cubo)
+
+    trabajos = figuras_del_tablero(kpis.departamento_mas_afectado, kpis.delito_mas_frecuente)
+    procesos = procesos or min(len(trabajos), os.cpu_count() or 1)
+    with etapa("batch.figuras", len(cubo), procesos=procesos):
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                                 initargs=(cubo, tabla_pronosticos)) as pool:
+            figuras = list(pool.map(_exportar_figura, [g for g, _ in trabajos], [p for _, p in trabajos],
+                                    repeat(destino), repeat(tuple(formatos))))
+
+    manifiesto = {
+        "huella": huella, "version_limpieza": VERSION_LIMPIEZA,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "filas": len(df), "filas_cubo": len(cubo), "kpis": asdict(kpis), "figuras": figuras,
+        "series_estacionales": len(tablas.series), "anomalias": len(tablas.anomalias),
+        "series_pronosticadas": tabla_pronosticos.groupby(['DIMENSION', 'VALOR'], observed=True).ngroups,
+    }
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=destino, suffix=".tmp")
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f: json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_temporal, os.path.join(destino, "manifest.json"))
+    return manifiesto
+
+
+# ==============================================================================
+# LECTURA DE ARTEFACTOS (LA USA app.py AL ARRANCAR)
+# ==============================================================================
+
+def leer_manifiesto(huella: str) -> Optional[Dict[str, Any]]:
+    """Manifiesto de los artefactos de `huella`, o None si no hay artefactos completos."""
+    try:
+        with open(os.path.join(directorio_artefactos(huella), "manifest.json"), encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifiesto if manifiesto.get("version_limpieza") == VERSION_LIMPIEZA else None
+
+
+def leer_cubo_precalculado(huella: str) -> Optional[pd.DataFrame]:
+    """Cubo exportado por el batch para `huella`, con los mismos attrs que deja construir_cubo."""
+    manifiesto = leer_manifiesto(huella)
+    if manifiesto is None: return None
+    try:
+        cubo = pd.read_parquet(os.path.join(directorio_artefactos(huella), "cubo.parquet"))
+    except (OSError, pa.ArrowException):
+        return None
+    cubo.attrs.update({"huella": huella, "filas_origen": manifiesto["filas"]})
+    return cubo
+
+
+def leer_estacionalidad_precalculada(huella: str) -> Optional[Estacionalidad]:
+    """Tablas de estacionalidad y anomalías exportadas por el batch para `huella`, o None si no están."""
+    if leer_manifiesto(huella) is None: return None
+    try:
+        return Estacionalidad(
+            series=pd.read_parquet(os.path.join(directorio_artefactos(huella), "estacionalidad.parquet")),
+            anomalias=pd.read_parquet(os.path.join(directorio_artefactos(huella), "anomalias.parquet")),
+        )
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def precargar_figuras(huella: str, cache: CacheFiguras) -> int:
+    """Carga en `cache` las figuras JSON exportadas para `huella`. Devuelve cuántas se cargaron."""
+    manifiesto = leer_manifiesto(huella)
+    if manifiesto is None: return 0
+    cargadas = 0
+    for figura in manifiesto["figuras"]:
+        if "json" not in figura["archivos"]: continue
+        try:
+            with open(os.path.join(directorio_artefactos(huella), figura["archivos"]["json"]), encoding="utf-8") as f:
+                figura_json = f.read()
+        except OSError:
+            continue
+        cache.guardar(clave_figura(huella, figura["generador"], **figura["parametros"]), figura_json)
+        cargadas += 1
+    return cargadas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", help="CSV de delitos ambientales.")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS_EXPORTACION, default=["json"])
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU).")
+    parser.add_argument("--delta", nargs="+", default=[], help="CSV con las filas nuevas, en orden; no se escriben en el archivo.")
+    args = parser.parse_args()
+
+    iniciar_corrida()
+    inicio = time.perf_counter()
+    try: manifiesto = ejecutar_batch(args.archivo, args.formatos, args.procesos, args.delta)
+    finally: volcar_log()
+    print(f"{manifiesto['filas']:,} filas -> cubo de {manifiesto['filas_cubo']:,} | "
+          f"{manifiesto['series_estacionales']:,} series estacionales ({manifiesto['anomalias']:,} anomalías) | "
+          f"{len(manifiesto['figuras'])} figuras en {directorio_artefactos(manifiesto['huella'])} "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    for figura in manifiesto["figuras"]:
+        print(f"    {figura['generador']:<36} {figura['segundos']:6.2f} s {figura['bytes'] / 1024:7.1f} KB  "
+              f"{', '.join(figura['archivos'].values())}")
+
+
+if __name__ == "__main__":
+    main()
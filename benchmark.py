@@ -0,0 +1,652 @@
+# benchmark.py
+
+"""
+Benchmarks del preprocesamiento con datos sintéticos de delitos ambientales.
+Uso: python benchmark.py --filas 1000000
+     python benchmark.py --suite --salida resultados.json
+     python benchmark.py --comparar base.json resultados.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no hay getrusage, la memoria pico queda sin medir.
+    resource = None
+
+from procesamiento import (
+    REEMPLAZOS_CARACTERES, limpiar_texto, estandarizar_nombres_columnas, limpiar_columnas_texto,
+    _corregir_caracteres, corregir_caracteres_serie, limpiar_dataset, uso_memoria_por_columna,
+    cargar_datos_limpios, limpiar_bloque, parsear_fechas, UMBRAL_STREAMING_MB, VERSION_LIMPIEZA,
+    procesos_limpieza, solo_lectura, leer_csv, asegurar_cache, eliminar_duplicados, hash_filas, ConjuntoHashes,
+)
+from almacenamiento import guardar_cache
+from analisis import construir_cubo, calcular_kpis, generar_kpis_y_analisis
+from filtros import Filtros, IndiceFiltros
+from fuente_sqlite import abrir_fuente_sqlite, construir_sqlite
+from instrumentacion import memoria_actual_mb
+import graficos
+
+DIRECTORIO_DATOS = "datos_benchmark"
+# Los CSV más grandes se generan por lotes de este tamaño para no armar todo el export en memoria.
+FILAS_POR_LOTE_GENERADOR = 1_000_000
+TAMANIOS_SUITE: List[int] = [10_000, 1_000_000, 10_000_000]
+
+DEPARTAMENTOS: List[str] = [
+    "ANTIOQUIA", "VALLE DEL CAUCA", "BOGOTÁ, D.C.", "CUNDINAMARCA", "SANTANDER", "META", "CAUCA",
+    "NARIÑO", "BOYACÁ", "TOLIMA", "HUILA", "CALDAS", "CÓRDOBA", "BOLÍVAR", "CAQUETÁ", "PUTUMAYO",
+    "CASANARE", "NORTE DE SANTANDER", "ATLÁNTICO", "MAGDALENA", "CESAR", "RISARALDA", "QUINDÍO",
+    "CHOCÓ", "SUCRE", "LA GUAJIRA", "GUAVIARE", "ARAUCA", "AMAZONAS", "VICHADA", "GUAINÍA",
+    "VAUPÉS", "SAN ANDRÉS",
+]
+
+CONDUCTAS: List[str] = [
+    "ARTÍCULO 328. APROVECHAMIENTO ILÍCITO DE LOS RECURSOS NATURALES RENOVABLES",
+    "ARTÍCULO 338. EXPLOTACIÓN ILÍCITA DE YACIMIENTO MINERO Y OTROS MATERIALES",
+    "ARTÍCULO 331. DAÑOS EN LOS RECURSOS NATURALES",
+    "ARTÍCULO 336. CAZA ILEGAL",
+    "ARTÍCULO 332. CONTAMINACIÓN AMBIENTAL",
+    "ARTÍCULO 337. INVASIÓN DE ÁREAS DE ESPECIAL IMPORTANCIA ECOLÓGICA",
+    "ARTÍCULO 335. PESCA ILEGAL",
+    "ARTÍCULO 333. CONTAMINACIÓN AMBIENTAL POR EXPLOTACIÓN DE YACIMIENTO MINERO O HIDROCARBURO",
+    "ARTÍCULO 328A. TRÁFICO DE FAUNA",
+    "ARTÍCULO 329. VIOLACIÓN DE FRONTERAS PARA LA EXPLOTACIÓN DE RECURSOS NATURALES",
+    "ARTÍCULO 332A. CONTAMINACIÓN AMBIENTAL POR RESIDUOS SÓLIDOS PELIGROSOS",
+    "ARTÍCULO 330. MANEJO ILÍCITO DE MICROORGANISMOS NOCIVOS",
+    "ARTÍCULO 330A. MANEJO ILÍCITO DE ESPECIES EXÓTICAS",
+    "ARTÍCULO 334. EXPERIMENTACIÓN ILEGAL CON ESPECIES, AGENTES BIOLÓGICOS O BIOQUÍMICOS",
+    "ARTÍCULO 339. MODALIDAD CULPOSA",
+]
+
+ZONAS: List[str] = ["RURAL", "URBANA", "rural", " Urbana ", "SIN DATO"]
+
+
+def _mojibake(texto: str) -> str:
+    # Se simula el error típico de leer UTF-8 como Windows-1252 ("NARIÃ‘O").
+    try: return texto.encode("utf-8").decode("cp1252")
+    except UnicodeDecodeError: return texto.encode("utf-8").decode("latin-1")
+
+
+def _pesos_zipf(n: int, s: float = 1.1) -> np.ndarray:
+    pesos = 1.0 / np.arange(1, n + 1) ** s
+    return pesos / pesos.sum()
+
+
+def _con_variantes(valores: List[str], n_variantes: int = 3) -> List[str]:
+    # Cada valor real aparece escrito de varias formas: original, con mojibake y en minúsculas.
+    variantes = []
+    for valor in valores:
+        variantes.extend([valor, _mojibake(valor), valor.lower()][:n_variantes])
+    return variantes
+
+
+def generar_datos_sinteticos(n_filas: int, semilla: int = 42) -> pd.DataFrame:
+    """Genera un export sintético con el esquema, el sesgo y la suciedad del CSV de la Fiscalía."""
+    rng = np.random.default_rng(semilla)
+    n_unicas = max(1, int(n_filas * 0.98))
+
+    deptos = _con_variantes(DEPARTAMENTOS)
+    idx_depto = rng.choice(len(DEPARTAMENTOS), size=n_unicas, p=_pesos_zipf(len(DEPARTAMENTOS)))
+    depto = np.array(deptos, dtype=object)[idx_depto * 3 + rng.integers(0, 3, n_unicas)]
+
+    # Unos 1.100 municipios repartidos entre los departamentos.
+    municipio_local = rng.integers(0, 34, n_unicas)
+    municipios = np.array([f"MUNICIPIO {i:02d}" for i in range(34)], dtype=object)
+    municipio = municipios[municipio_local] + " (" + np.array(DEPARTAMENTOS, dtype=object)[idx_depto] + ")"
+
+    conductas = _con_variantes(CONDUCTAS)
+    idx_conducta = rng.choice(len(CONDUCTAS), size=n_unicas, p=_pesos_zipf(len(CONDUCTAS), 1.3))
+    conducta = np.array(conductas, dtype=object)[idx_conducta * 3 + rng.integers(0, 3, n_unicas)]
+
+    # Fechas 2003 - mediados de 2025 (último año incompleto) en formato dd/mm/aaaa.
+    inicio = np.datetime64("2003-01-01")
+    dias = rng.integers(0, (np.datetime64("2025-06-30") - inicio).astype(int), n_unicas)
+    fechas = pd.Series(inicio + dias.astype("timedelta64[D]")).dt.strftime("%d/%m/%Y").to_numpy(dtype=object, copy=True)
+    fechas[rng.random(n_unicas) < 0.001] = None
+
+    datos = pd.DataFrame({
+        "DEPARTAMENTO": depto,
+        "MUNICIPIO": municipio,
+        "CODIGO DANE": rng.integers(5001, 99999, n_unicas),
+        "ARMAS MEDIOS": rng.choice(np.array(["NO REPORTADO", "SIN EMPLEO DE ARMAS", "CONTUNDENTES"], dtype=object), n_unicas),
+        "FECHA HECHO": fechas,
+        "GENERO": rng.choice(np.array(["MASCULINO", "FEMENINO", "NO REPORTA"], dtype=object), n_unicas),
+        "AGRUPA EDAD PERSONA": rng.choice(np.array(["ADULTOS", "MENORES", "ADOLESCENTES"], dtype=object), n_unicas),
+        "CANTIDAD": rng.geometric(0.7, n_unicas),
+        "DESCRIPCIÓN CONDUCTA": conducta,
+        "ZONA": rng.choice(np.array(ZONAS, dtype=object), n_unicas),
+    })
+    # Cerca del 2% de las filas son duplicados exactos, como en el export real.
+    duplicados = datos.iloc[rng.integers(0, n_unicas, n_filas - n_unicas)]
+    return pd.concat([datos, duplicados], ignore_index=True).sample(frac=1, random_state=semilla)
+
+
+def generar_csv_sintetico(n_filas: int, semilla: int = 42) -> str:
+    """Escribe (o reutiliza) el CSV sintético de `n_filas` filas y devuelve su ruta."""
+    os.makedirs(DIRECTORIO_DATOS, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_DATOS, f"delitos_{n_filas}_{semilla}.csv")
+    if os.path.exists(ruta): return ruta
+    # Se escribe a un temporal y se renombra, así un generador interrumpido no deja un CSV a medias.
+    ruta_temporal = ruta + ".tmp"
+    for lote, inicio in enumerate(range(0, n_filas, FILAS_POR_LOTE_GENERADOR)):
+        filas_lote = min(FILAS_POR_LOTE_GENERADOR, n_filas - inicio)
+        generar_datos_sinteticos(filas_lote, semilla + lote).to_csv(
+            ruta_temporal, index=False, mode="w" if lote == 0 else "a", header=lote == 0
+        )
+    os.replace(ruta_temporal, ruta)
+    return ruta
+
+
+def _limpiar_columnas_texto_por_celda(df: pd.DataFrame) -> pd.DataFrame:
+    # Implementación anterior (una llamada a limpiar_texto por celda), usada como referencia.
+    df_copy = df.copy()
+    for col in df_copy.select_dtypes(include=["object"]).columns:
+        usar_guion = col not in ['DEPARTAMENTO', 'MUNICIPIO']
+        df_copy[col] = df_copy[col].apply(lambda x: limpiar_texto(x, mayusculas=True, espacios_a_guion=usar_guion))
+    return df_copy
+
+
+def _corregir_caracteres_secuencial(texto: Any) -> str:
+    # Implementación anterior (un str.replace por entrada del diccionario), usada como referencia.
+    if pd.isna(texto): return ""
+    texto = str(texto).strip()
+    for malo, bueno in REEMPLAZOS_CARACTERES.items(): texto = texto.replace(malo, bueno)
+    return texto
+
+
+def muestras_mojibake() -> List[str]:
+    """Textos reales del export en sus tres escrituras: correcta, con mojibake y en minúsculas."""
+    return _con_variantes(DEPARTAMENTOS) + _con_variantes(CONDUCTAS) + ZONAS
+
+
+def _cronometrar(funcion, *args) -> tuple:
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def benchmark_limpieza(ruta: str) -> Dict[str, Any]:
+    """Compara la limpieza de texto por celda contra la limpieza por valores únicos."""
+    df = estandarizar_nombres_columnas(pd.read_csv(ruta))
+    referencia, t_celda = _cronometrar(_limpiar_columnas_texto_por_celda, df)
+    resultado, t_unicos = _cronometrar(limpiar_columnas_texto, df)
+    pd.testing.assert_frame_equal(referencia, resultado)
+    return {"filas": len(df), "por_celda_s": t_celda, "por_unicos_s": t_unicos, "aceleracion": t_celda / t_unicos}
+
+
+def benchmark_reemplazos(n_textos: int = 200_000) -> Dict[str, Any]:
+    """
+    Micro-benchmark del corrector de caracteres: bucle de str.replace contra la regex compilada.
+    Que den lo mismo lo comprueba tests/test_reemplazos.py.
+    """
+    muestras = muestras_mojibake()
+    textos = (muestras * (n_textos // len(muestras) + 1))[:n_textos]
+    _, t_bucle = _cronometrar(lambda: [_corregir_caracteres_secuencial(t) for t in textos])
+    _, t_regex = _cronometrar(lambda: [_corregir_caracteres(t) for t in textos])
+    _, t_serie = _cronometrar(corregir_caracteres_serie, pd.Series(textos))
+    return {"textos": n_textos, "bucle_s": t_bucle, "regex_s": t_regex, "serie_s": t_serie}
+
+
+def _sin_compactar(df: pd.DataFrame) -> pd.DataFrame:
+    # Esquema anterior del dataset limpio: texto como objetos de Python y enteros de 64 bits.
+    tipos = {col: object for col in df.select_dtypes(include=['category']).columns}
+    tipos.update({col: np.int64 for col in ['ANIO', 'CANTIDAD'] if col in df.columns})
+    return df.drop(columns=['MES', 'DIA_ANIO'], errors='ignore').astype(tipos)
+
+
+def benchmark_memoria(ruta: str) -> pd.DataFrame:
+    """Memoria por columna del dataset limpio, con el esquema anterior y con el esquema compacto."""
+    compacto = limpiar_dataset(pd.read_csv(ruta))
+    reporte = pd.DataFrame({
+        "antes_mb": uso_memoria_por_columna(_sin_compactar(compacto)) / 2**20,
+        "despues_mb": uso_memoria_por_columna(compacto) / 2**20,
+        "tipo": compacto.dtypes.astype(str),
+    })
+    reporte.loc["TOTAL", ["antes_mb", "despues_mb"]] = reporte[["antes_mb", "despues_mb"]].sum()
+    return reporte
+
+
+def benchmark_primer_grafico(ruta: str) -> Dict[str, Any]:
+    """
+    Tiempo hasta el primer gráfico con la caché fría: cargar, armar el cubo y construir (y serializar,
+    como hace st.plotly_chart) solo la sección abierta, contra construir las tres secciones como st.tabs.
+    """
+    cubo, t_carga = _cronometrar(lambda: construir_cubo(cargar_datos_limpios(ruta, usar_cache=False)))
+    kpis = generar_kpis_y_analisis(cubo)
+    tema = 'plotly_dark'
+    secciones = {
+        "evolucion": [
+            lambda: graficos.generar_evolucion_top5_conductas(cubo, theme=tema),
+            lambda: graficos.generar_heatmap_conducta_anual(cubo, theme=tema),
+        ],
+        "concentracion": [
+            lambda: graficos.generar_top_departamentos(cubo, theme=tema),
+            lambda: graficos.generar_top_conductas(cubo, theme=tema),
+            lambda: graficos.generar_tendencia_anual(cubo, theme=tema),
+        ],
+        "focos": [
+            lambda: graficos.generar_distribucion_top_depto_bar(cubo, kpis.departamento_mas_afectado, theme=tema),
+            lambda: graficos.generar_distribucion_mensual(cubo, kpis.delito_mas_frecuente, theme=tema),
+        ],
+    }
+    tiempos = {nombre: _cronometrar(lambda: [g().to_json() for g in graficos])[1] for nombre, graficos in secciones.items()}
+    return {
+        "filas": cubo.attrs.get('filas_origen', 0), "carga_s": t_carga,
+        "primera_seccion_s": tiempos["evolucion"], "todas_s": sum(tiempos.values()),
+    }
+
+
+def benchmark_filtros(ruta: str) -> Dict[str, Any]:
+    """
+    Re-render tras cambiar un filtro: cubo filtrado por índices, KPIs y la primera sección
+    (figuras serializadas). Se compara cada cubo filtrado con el de una máscara booleana.
+    """
+    df = cargar_datos_limpios(ruta)
+    cubo = construir_cubo(df)
+    indice, t_indice = _cronometrar(IndiceFiltros, df, cubo)
+    anio_min, anio_max = indice.rango_anios()
+    casos = {
+        "años": Filtros(anio_desde=anio_max - 5, anio_hasta=anio_max),
+        "departamento": Filtros(departamentos=tuple(indice.valores('DEPARTAMENTO')[:2])),
+        "zona": Filtros(zonas=tuple(indice.valores('ZONA')[-1:])),
+        "combinado": Filtros(anio_desde=anio_min + 5, anio_hasta=anio_max, zonas=tuple(indice.valores('ZONA')[-1:]),
+                             articulos=tuple(indice.valores('ARTICULO')[:3])),
+    }
+    # La primera figura de Plotly carga plantillas y validadores; no es parte del re-render.
+    graficos.generar_evolucion_top5_conductas(cubo).to_json()
+    tiempos = {}
+    for nombre, filtros in casos.items():
+        def rerender():
+            filtrado = indice.cubo_filtrado(filtros)
+            generar_kpis_y_analisis(filtrado)
+            graficos.generar_evolucion_top5_conductas(filtrado).to_json()
+            graficos.generar_heatmap_conducta_anual(filtrado).to_json()
+            return filtrado
+        filtrado, tiempos[f"{nombre}_s"] = _cronometrar(rerender)
+        _, tiempos[f"{nombre}_cubo_s"] = _cronometrar(indice.cubo_filtrado, filtros)
+
+        mascara = pd.Series(True, index=df.index)
+        if filtros.anio_desde: mascara &= df['ANIO'].between(filtros.anio_desde, filtros.anio_hasta)
+        for col, seleccion in filtros.por_columna().items():
+            if seleccion: mascara &= df[col].isin(seleccion)
+        referencia = construir_cubo(df[mascara])
+        pd.testing.assert_frame_equal(filtrado, referencia, check_categorical=False)
+    return {"filas": len(df), "indice_s": t_indice, **tiempos}
+
+
+def benchmark_paralelo(ruta: str, max_procesos: Optional[int] = None) -> pd.DataFrame:
+    """Escalamiento de la limpieza de 1 a N procesos; cada resultado se compara con el serial."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    max_procesos = max_procesos or max(cpus, 2)
+    serial, t_serial = _cronometrar(lambda: cargar_datos_limpios(ruta, usar_cache=False, procesos=1))
+    filas = [{"procesos": 1, "segundos": t_serial, "aceleracion": 1.0}]
+    procesos = 2
+    while procesos <= max_procesos:
+        paralelo, segundos = _cronometrar(lambda: cargar_datos_limpios(ruta, usar_cache=False, procesos=procesos))
+        pd.testing.assert_frame_equal(serial, paralelo)
+        filas.append({"procesos": procesos, "segundos": segundos, "aceleracion": t_serial / segundos})
+        procesos *= 2
+    tabla = pd.DataFrame(filas)
+    tabla.attrs.update({"cpus": cpus, "automatico": procesos_limpieza(ruta)})
+    return tabla
+
+
+def benchmark_transporte(ruta: str) -> pd.DataFrame:
+    """Bytes que viajan al navegador por cada figura del tablero, tal como sale de Plotly y compacta."""
+    cubo = construir_cubo(cargar_datos_limpios(ruta))
+    kpis = generar_kpis_y_analisis(cubo)
+    filas = []
+    for nombre, parametros in graficos.figuras_del_tablero(kpis.departamento_mas_afectado, kpis.delito_mas_frecuente):
+        figura = graficos.GENERADORES[nombre](cubo, **parametros)
+        original = graficos.tamanio_figura(figura)
+        compacta, segundos = _cronometrar(graficos.compactar_figura, figura)
+        filas.append({"figura": nombre, "kb_original": original / 1024,
+                      "kb_compacta": graficos.tamanio_figura(compacta) / 1024, "compactar_ms": segundos * 1000})
+    tabla = pd.DataFrame(filas)
+    tabla.loc[len(tabla)] = {"figura": "TOTAL", **tabla.drop(columns="figura").sum()}
+    tabla["reduccion_%"] = (1 - tabla["kb_compacta"] / tabla["kb_original"]) * 100
+    return tabla
+
+
+def _medir_sesiones(ruta: str, n_sesiones: int, compartido: bool) -> Dict[str, Any]:
+    """
+    Simula `n_sesiones` sesiones concurrentes, cada una en su hilo como en Streamlit, que piden el dataset
+    a la caché de la app y lo retienen a la vez. Se ejecuta en un proceso propio para partir de la misma RSS.
+    """
+    import logging
+    import streamlit as st
+
+    # Fuera de `streamlit run` las cachés avisan que no hay runtime ni contexto de sesión; aquí es lo esperado.
+    for nombre in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.runtime.caching.cache_data_api"):
+        logging.getLogger(nombre).setLevel(logging.ERROR)
+    if compartido:
+        cargar = st.cache_resource(lambda r: solo_lectura(cargar_datos_limpios(r)))
+    else:
+        cargar = st.cache_data(lambda r: cargar_datos_limpios(r))
+    inicial = memoria_actual_mb()
+    primero = cargar(ruta)
+    con_dataset = memoria_actual_mb()
+
+    # Cada sesión retiene su DataFrame hasta que se mide la memoria con todas abiertas.
+    barrera = threading.Barrier(n_sesiones + 1)
+    def sesion() -> None:
+        df = cargar(ruta)
+        barrera.wait()
+        barrera.wait()
+        del df
+
+    hilos = [threading.Thread(target=sesion) for _ in range(n_sesiones)]
+    for hilo in hilos: hilo.start()
+    barrera.wait()
+    con_sesiones = memoria_actual_mb()
+    barrera.wait()
+    for hilo in hilos: hilo.join()
+    return {
+        "modo": "cache_resource" if compartido else "cache_data", "sesiones": n_sesiones, "filas": len(primero),
+        "dataset_mb": con_dataset - inicial, "total_mb": con_sesiones - inicial,
+        "mb_por_sesion": (con_sesiones - con_dataset) / n_sesiones,
+    }
+
+
+def benchmark_sesiones(ruta: str, n_sesiones: int) -> pd.DataFrame:
+    """Memoria de N sesiones concurrentes con una copia del dataset por sesión frente a un dataset compartido."""
+    cargar_datos_limpios(ruta)  # La caché en disco queda lista, así las dos variantes solo la leen.
+    contexto = multiprocessing.get_context("spawn")
+    filas = []
+    for compartido in (False, True):
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as proceso:
+            filas.append(proceso.submit(_medir_sesiones, ruta, n_sesiones, compartido).result())
+    return pd.DataFrame(filas)
+
+def benchmark_ingesta(ruta: str, repeticiones: int = 3) -> pd.DataFrame:
+    """Lectura del CSV completo con tipos inferidos frente al esquema de ingesta, con cada motor."""
+    variantes = {
+        "todas las columnas (c)": lambda: pd.read_csv(ruta),
+        "esquema (c)": lambda: leer_csv(lambda: ruta, engine="c"),
+        "esquema (pyarrow)": lambda: leer_csv(lambda: ruta),
+    }
+    filas = []
+    for nombre, leer in variantes.items():
+        tiempos = []
+        for _ in range(repeticiones):
+            crudo, segundos = _cronometrar(leer)
+            tiempos.append(segundos)
+        filas.append({"lectura": nombre, "columnas": crudo.shape[1], "segundos": min(tiempos),
+                      "memoria_mb": crudo.memory_usage(deep=True).sum() / 2**20})
+        del crudo
+    return pd.DataFrame(filas)
+
+def _medir_backend(ruta: str, backend: str) -> Dict[str, Any]:
+    """
+    Arranque en frío con los artefactos en disco ya armados (caché Parquet o base SQLite) y cubo filtrado
+    por caso, en un proceso propio: la RSS final es lo que el backend deja en memoria.
+    """
+    inicial = memoria_actual_mb()
+    inicio = time.perf_counter()
+    if backend == "sqlite":
+        fuente = abrir_fuente_sqlite(ruta)
+    else:
+        df = cargar_datos_limpios(ruta)
+        fuente = IndiceFiltros(df, construir_cubo(df))
+    resultado: Dict[str, Any] = {"backend": backend, "arranque_s": time.perf_counter() - inicio}
+    anio_min, anio_max = fuente.rango_anios()
+    casos = {
+        "años": Filtros(anio_desde=anio_max - 5, anio_hasta=anio_max),
+        "departamento": Filtros(departamentos=tuple(fuente.valores('DEPARTAMENTO')[:2])),
+        "zona": Filtros(zonas=tuple(fuente.valores('ZONA')[-1:])),
+        "combinado": Filtros(anio_desde=anio_min + 5, anio_hasta=anio_max, departamentos=tuple(fuente.valores('DEPARTAMENTO')[:1]),
+                             articulos=tuple(fuente.valores('ARTICULO')[:3])),
+    }
+    for nombre, filtros in casos.items():
+        _, resultado[f"{nombre}_ms"] = _cronometrar(fuente.cubo_filtrado, filtros)
+        resultado[f"{nombre}_ms"] *= 1000
+    resultado["rss_mb"] = memoria_actual_mb() - inicial
+    return resultado
+
+
+def benchmark_sqlite(ruta: str) -> pd.DataFrame:
+    """Backend en memoria frente a SQLite: preparación, arranque en frío, memoria y cubos filtrados."""
+    huella, t_cache = _cronometrar(asegurar_cache, ruta)
+    _, t_sqlite = _cronometrar(construir_sqlite, huella)
+    contexto = multiprocessing.get_context("spawn")
+    filas = []
+    for backend in ("memoria", "sqlite"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as proceso:
+            filas.append(proceso.submit(_medir_backend, ruta, backend).result())
+    tabla = pd.DataFrame(filas)
+    tabla.attrs.update({"cache_s": t_cache, "construccion_sqlite_s": t_sqlite,
+                        "sqlite_mb": os.path.getsize(abrir_fuente_sqlite(ruta).ruta) / 2**20})
+    return tabla
+
+# ==============================================================================
+# SUITE COMPLETA: TIEMPO Y MEMORIA PICO POR ETAPA, RESULTADOS EN JSON
+# ==============================================================================
+
+def _pico_memoria_mb() -> float:
+    if resource is None: return float("nan")
+    # ru_maxrss viene en KB en Linux y en bytes en macOS.
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == "darwin" else pico / 1024
+
+
+def _medir_tamanio(n_filas: int, repeticiones: int = 1) -> Dict[str, Any]:
+    """
+    Corre todas las etapas para un tamaño. Se ejecuta en un proceso propio, así la memoria pico
+    (máximo del proceso hasta el final de cada etapa) corresponde solo a este tamaño.
+    """
+    ruta = generar_csv_sintetico(n_filas)
+    etapas: Dict[str, Dict[str, float]] = {}
+
+    def medir(nombre: str, funcion, *args):
+        tiempos = []
+        for _ in range(repeticiones):
+            resultado, segundos = _cronometrar(funcion, *args)
+            tiempos.append(segundos)
+        etapas[nombre] = {"s": min(tiempos), "pico_mb": _pico_memoria_mb()}
+        return resultado
+
+    # Las sub-etapas de la limpieza se miden en memoria; los archivos que van por bloques no caben enteros.
+    por_bloques = os.path.getsize(ruta) > UMBRAL_STREAMING_MB * 2**20
+    if not por_bloques:
+        crudo = medir("lectura_csv", leer_csv, lambda: ruta)
+        df = medir("limpieza.nombres_columnas", estandarizar_nombres_columnas, crudo)
+        df = medir("limpieza.texto", limpiar_columnas_texto, df)
+        medir("limpieza.fechas", parsear_fechas, df['FECHA_HECHO'])
+        limpio = medir("limpieza.bloque_completo", limpiar_bloque, crudo)
+        medir("limpieza.duplicados", eliminar_duplicados, limpio)
+        # Con los hashes de una carga anterior (la primera mitad), como en cargar_incremental y anexar_delta.
+        previos = np.sort(hash_filas(limpio.iloc[:len(limpio) // 2]))
+        medir("limpieza.duplicados_con_vistos", lambda: eliminar_duplicados(limpio, ConjuntoHashes(previos)))
+        del crudo, df, limpio
+
+    df = medir("carga_sin_cache", lambda: cargar_datos_limpios(ruta, usar_cache=False))
+    if not por_bloques: medir("guardar_cache", guardar_cache, df.attrs['huella'], df)
+    df = medir("carga_con_cache", cargar_datos_limpios, ruta)
+    cubo = medir("cubo", construir_cubo, df)
+    medir("kpis.filas", calcular_kpis, df)
+    kpis = medir("kpis.cubo", calcular_kpis, cubo)
+
+    # La primera figura de Plotly carga plantillas y validadores; no se cuenta en ninguna etapa.
+    graficos.generar_tendencia_anual(cubo).to_json()
+    figuras = {
+        "tendencia_anual": lambda: graficos.generar_tendencia_anual(cubo),
+        "top_conductas": lambda: graficos.generar_top_conductas(cubo),
+        "top_departamentos": lambda: graficos.generar_top_departamentos(cubo),
+        "heatmap_conducta_anual": lambda: graficos.generar_heatmap_conducta_anual(cubo),
+        "evolucion_top5_conductas": lambda: graficos.generar_evolucion_top5_conductas(cubo),
+        "distribucion_top_depto": lambda: graficos.generar_distribucion_top_depto_bar(cubo, kpis.departamento_mas_afectado),
+        "distribucion_mensual": lambda: graficos.generar_distribucion_mensual(cubo, kpis.delito_mas_frecuente),
+    }
+    for nombre, generar in figuras.items():
+        medir(f"figura.{nombre}", lambda: generar().to_json())
+
+    return {
+        "filas": n_filas, "filas_limpias": len(df), "filas_cubo": len(cubo),
+        "csv_mb": os.path.getsize(ruta) / 2**20, "por_bloques": por_bloques, "etapas": etapas,
+    }
+
+
+def benchmark_suite(tamanios: List[int], repeticiones: int = 1) -> Dict[str, Any]:
+    """Mide cada tamaño en un proceso nuevo y junta los resultados con los datos del entorno."""
+    contexto = multiprocessing.get_context("spawn")
+    resultados = {}
+    for n_filas in tamanios:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as proceso:
+            resultados[str(n_filas)] = proceso.submit(_medir_tamanio, n_filas, repeticiones).result()
+    return {
+        "entorno": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "plataforma": platform.platform(),
+            "pandas": pd.__version__, "numpy": np.__version__, "version_limpieza": VERSION_LIMPIEZA,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar_resultados(base: Dict[str, Any], nuevo: Dict[str, Any], tolerancia: float = 0.10,
+                        minimo_s: float = 0.005) -> pd.DataFrame:
+    """
+    Compara dos corridas de la suite etapa por etapa. Una etapa es regresión si tarda más de
+    `tolerancia` por encima de la base y la diferencia supera `minimo_s` (el ruido de las etapas cortas).
+    """
+    filas = []
+    for n_filas, medicion in nuevo["resultados"].items():
+        etapas_base = base["resultados"].get(n_filas, {}).get("etapas", {})
+        for etapa, despues in medicion["etapas"].items():
+            antes = etapas_base.get(etapa)
+            if antes is None: continue
+            filas.append({
+                "filas": int(n_filas), "etapa": etapa, "antes_s": antes["s"], "despues_s": despues["s"],
+                "cambio": despues["s"] / antes["s"] if antes["s"] else float("nan"),
+                "antes_pico_mb": antes["pico_mb"], "despues_pico_mb": despues["pico_mb"],
+            })
+    tabla = pd.DataFrame(filas)
+    if tabla.empty: return tabla
+    tabla["regresion"] = (tabla["cambio"] > 1 + tolerancia) & (tabla["despues_s"] - tabla["antes_s"] > minimo_s)
+    return tabla
+
+
+def _imprimir_suite(resultado: Dict[str, Any]) -> None:
+    for n_filas, medicion in resultado["resultados"].items():
+        modo = "por bloques" if medicion["por_bloques"] else "en memoria"
+        print(f"{int(n_filas):>10,} filas ({medicion['csv_mb']:,.0f} MB, {modo}) -> "
+              f"{medicion['filas_limpias']:,} limpias, cubo de {medicion['filas_cubo']:,}")
+        for etapa, m in medicion["etapas"].items():
+            print(f"    {etapa:<36} {m['s']:9.3f} s | pico {m['pico_mb']:8,.0f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, nargs="+", default=None,
+                        help="Tamaños a medir (por defecto 100k y 1M; en la suite, 10k, 1M y 10M).")
+    parser.add_argument("--memoria", action="store_true", help="Reporta la memoria por columna antes y después.")
+    parser.add_argument("--primer-grafico", action="store_true", help="Mide el tiempo hasta el primer gráfico.")
+    parser.add_argument("--filtros", action="store_true", help="Mide el re-render tras cambiar un filtro.")
+    parser.add_argument("--paralelo", type=int, nargs="?", const=0, metavar="MAX_PROCESOS",
+                        help="Escalamiento de la limpieza en paralelo de 1 a N procesos (por defecto, las CPU).")
+    parser.add_argument("--transporte", action="store_true", help="Bytes por figura enviados al navegador.")
+    parser.add_argument("--ingesta", action="store_true", help="Lectura del CSV con y sin el esquema de ingesta.")
+    parser.add_argument("--sqlite", action="store_true", help="Backend en memoria frente al backend SQLite.")
+    parser.add_argument("--sesiones", type=int, default=None, metavar="N",
+                        help="Memoria de N sesiones concurrentes: una copia del dataset por sesión o compartido.")
+    parser.add_argument("--suite", action="store_true", help="Tiempo y memoria pico de cada etapa, por tamaño.")
+    parser.add_argument("--repeticiones", type=int, default=1, help="En la suite, se guarda el mínimo de N corridas.")
+    parser.add_argument("--salida", help="Archivo JSON donde se guardan los resultados de la suite.")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos JSON de la suite.")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0], encoding="utf-8") as f: base = json.load(f)
+        with open(args.comparar[1], encoding="utf-8") as f: nuevo = json.load(f)
+        tabla = comparar_resultados(base, nuevo)
+        print(tabla.round(3).to_string(index=False))
+        # Código de salida 1 si hay regresiones, para usarlo en CI.
+        sys.exit(1 if not tabla.empty and tabla["regresion"].any() else 0)
+
+    if args.paralelo is not None:
+        for n_filas in args.filas or [1_000_000]:
+            tabla = benchmark_paralelo(generar_csv_sintetico(n_filas), args.paralelo or None)
+            print(f"{n_filas:>10,} filas | {tabla.attrs['cpus']} CPU, automático = {tabla.attrs['automatico']} procesos")
+            print(tabla.round(2).to_string(index=False))
+        return
+
+    if args.transporte:
+        for n_filas in args.filas or [100_000]:
+            print(f"{n_filas:>10,} filas")
+            print(benchmark_transporte(generar_csv_sintetico(n_filas)).round(1).to_string(index=False))
+        return
+
+    if args.ingesta:
+        for n_filas in args.filas or [100_000, 1_000_000]:
+            print(f"{n_filas:>10,} filas")
+            print(benchmark_ingesta(generar_csv_sintetico(n_filas)).round(2).to_string(index=False))
+        return
+
+    if args.sqlite:
+        for n_filas in args.filas or [1_000_000]:
+            tabla = benchmark_sqlite(generar_csv_sintetico(n_filas))
+            print(f"{n_filas:>10,} filas | caché {tabla.attrs['cache_s']:.1f} s | base SQLite "
+                  f"{tabla.attrs['construccion_sqlite_s']:.1f} s, {tabla.attrs['sqlite_mb']:,.0f} MB")
+            print(tabla.round(2).to_string(index=False))
+        return
+
+    if args.sesiones:
+        for n_filas in args.filas or [1_000_000]:
+            print(f"{n_filas:>10,} filas | {args.sesiones} sesiones")
+            print(benchmark_sesiones(generar_csv_sintetico(n_filas), args.sesiones).round(1).to_string(index=False))
+        return
+
+    if args.suite:
+        resultado = benchmark_suite(args.filas or TAMANIOS_SUITE, args.repeticiones)
+        _imprimir_suite(resultado)
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as f: json.dump(resultado, f, indent=2)
+        return
+
+    args.filas = args.filas or [100_000, 1_000_000]
+
+    if args.filtros:
+        for n_filas in args.filas:
+            r = benchmark_filtros(generar_csv_sintetico(n_filas))
+            print(f"{r['filas']:>10,} filas | índices {r['indice_s']:5.2f} s")
+            for nombre in ["años", "departamento", "zona", "combinado"]:
+                print(f"{'':>10} {nombre:<12} | cubo filtrado {r[f'{nombre}_cubo_s'] * 1000:6.1f} ms | "
+                      f"re-render {r[f'{nombre}_s'] * 1000:6.1f} ms")
+        return
+
+    if args.primer_grafico:
+        for n_filas in args.filas:
+            r = benchmark_primer_grafico(generar_csv_sintetico(n_filas))
+            print(f"{r['filas']:>10,} filas | carga + cubo {r['carga_s']:6.2f} s | "
+                  f"primera sección {r['primera_seccion_s']:5.2f} s | tres secciones {r['todas_s']:5.2f} s")
+        return
+
+    if args.memoria:
+        for n_filas in args.filas:
+            print(f"Memoria por columna ({n_filas:,} filas):")
+            print(benchmark_memoria(generar_csv_sintetico(n_filas)).round(1).to_string())
+        return
+
+    r = benchmark_reemplazos()
+    print(f"{r['textos']:>10,} textos | bucle {r['bucle_s']:6.2f} s | regex {r['regex_s']:6.2f} s | "
+          f"serie {r['serie_s']:6.2f} s | x{r['bucle_s'] / r['regex_s']:.1f}")
+    for n_filas in args.filas:
+        r = benchmark_limpieza(generar_csv_sintetico(n_filas))
+        print(f"{r['filas']:>10,} filas | por celda {r['por_celda_s']:7.2f} s | "
+              f"por únicos {r['por_unicos_s']:6.2f} s | x{r['aceleracion']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
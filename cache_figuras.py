@@ -0,0 +1,96 @@
+# cache_figuras.py
+
+"""
+Caché LRU de figuras de Plotly ya construidas, guardadas como JSON.
+La clave combina la huella del dataset, el nombre del gráfico y sus parámetros, así que
+dos sesiones que miran los mismos datos comparten la figura. No depende de Streamlit:
+app.py crea una sola instancia por proceso con st.cache_resource.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Memoria máxima que ocupan los JSON guardados; se puede cambiar por variable de entorno.
+MAX_MB_CACHE_FIGURAS = float(os.environ.get("DELITOS_CACHE_FIGURAS_MB", "64"))
+
+ClaveFigura = Tuple[Any, ...]
+
+
+def clave_figura(huella: str, nombre: str, **parametros: Any) -> ClaveFigura:
+    """Clave estable de una figura: huella del dataset, gráfico y parámetros ordenados por nombre."""
+    return (huella, nombre) + tuple(sorted(parametros.items()))
+
+
+class CacheFiguras:
+    """
+    Guarda el JSON de cada figura y la reconstruye en cada acierto (una figura de Plotly es mutable,
+    así que no se comparte el objeto entre sesiones). Al superar `max_bytes` se descartan
+    las figuras usadas hace más tiempo.
+    """
+
+    def __init__(self, max_bytes: int = int(MAX_MB_CACHE_FIGURAS * 2**20)):
+        self.max_bytes = max_bytes
+        self._entradas: "OrderedDict[ClaveFigura, str]" = OrderedDict()
+        self._bytes = 0
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, clave: ClaveFigura, construir: Callable[[], go.Figure]) -> go.Figure:
+        """Devuelve la figura de `clave`; si no está, la construye con `construir()` y la guarda."""
+        with self._candado:
+            figura_json = self._entradas.get(clave)
+            if figura_json is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+            else: self.fallos += 1
+        if figura_json is not None: return pio.from_json(figura_json)
+
+        # Se construye fuera del candado para no bloquear a las demás sesiones.
+        figura = construir()
+        self.guardar(clave, figura.to_json())
+        return figura
+
+    def guardar(self, clave: ClaveFigura, figura_json: str) -> None:
+        """Guarda una figura ya serializada (por ejemplo, las que exporta el modo batch)."""
+        tamanio = len(figura_json)
+        if tamanio > self.max_bytes: return
+        with self._candado:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None: self._bytes -= len(anterior)
+            self._entradas[clave] = figura_json
+            self._bytes += tamanio
+            while self._bytes > self.max_bytes:
+                _, descartada = self._entradas.popitem(last=False)
+                self._bytes -= len(descartada)
+                self.desalojos += 1
+
+    def bytes_de(self, clave: ClaveFigura) -> Optional[int]:
+        """Tamaño del JSON guardado para `clave` (lo que viaja al navegador), o None si no está."""
+        with self._candado:
+            figura_json = self._entradas.get(clave)
+        return None if figura_json is None else len(figura_json)
+
+    def limpiar(self) -> None:
+        with self._candado:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Contadores para monitoreo: aciertos, fallos, tasa de acierto, desalojos y memoria ocupada."""
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_acierto': self.aciertos / consultas if consultas else 0.0,
+                'desalojos': self.desalojos,
+                'entradas': len(self._entradas),
+                'memoria_mb': self._bytes / 2**20,
+            }
@@ -0,0 +1,177 @@
+# filtros.py
+
+"""
+Índices del dataset limpio para filtrar por año, departamento, municipio, artículo y zona
+sin recorrer todas las filas. Se arman una sola vez por archivo; cada combinación de filtros
+se resuelve con las posiciones de las filas y termina en un cubo filtrado con su propia huella.
+FuenteDatos es lo que el dashboard le pide a un backend; el backend SQLite (fuente_sqlite.py) lo cumple igual.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Protocol, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analisis import DIMENSIONES_CUBO
+from instrumentacion import etapa
+
+# Columnas con filtro por valores (multiselección); el año se filtra por rango.
+COLUMNAS_FILTRO: List[str] = ['DEPARTAMENTO', 'MUNICIPIO', 'ARTICULO', 'ZONA']
+
+
+@dataclass(frozen=True)
+class Filtros:
+    """Selección del panel de filtros. Una tupla vacía o un límite en None significan "sin filtro"."""
+    anio_desde: Optional[int] = None
+    anio_hasta: Optional[int] = None
+    departamentos: Tuple[str, ...] = ()
+    municipios: Tuple[str, ...] = ()
+    articulos: Tuple[str, ...] = ()
+    zonas: Tuple[str, ...] = ()
+
+    def por_columna(self) -> Dict[str, Tuple[str, ...]]:
+        return {
+            'DEPARTAMENTO': self.departamentos, 'MUNICIPIO': self.municipios,
+            'ARTICULO': self.articulos, 'ZONA': self.zonas,
+        }
+
+    @property
+    def vacios(self) -> bool:
+        return self.anio_desde is None and self.anio_hasta is None and not any(self.por_columna().values())
+
+    def huella(self, huella_datos: str) -> str:
+        """Huella del subconjunto: la de los datos combinada con la selección (valores ordenados)."""
+        firma = repr((self.anio_desde, self.anio_hasta) + tuple(tuple(sorted(v)) for v in self.por_columna().values()))
+        return hashlib.blake2b(f"{huella_datos}|{firma}".encode(), digest_size=16).hexdigest()
+
+
+class FuenteDatos(Protocol):
+    """Consultas del panel de filtros y del cubo filtrado, sea sobre las filas en memoria o sobre SQLite."""
+    filas: int
+
+    def rango_anios(self) -> Tuple[int, int]: ...
+
+    def valores(self, col: str, filtros: Optional[Filtros] = None) -> List[str]: ...
+
+    def cubo_filtrado(self, filtros: Filtros) -> pd.DataFrame: ...
+
+
+class _IndiceColumna:
+    """Posiciones de las filas agrupadas por código: las de `codigo` son orden[inicio[codigo]:inicio[codigo + 1]]."""
+
+    def __init__(self, codigos: np.ndarray, valores: pd.Index):
+        self.codigos = codigos
+        self.valores = valores
+        self.orden = np.argsort(codigos, kind='stable').astype(np.int32)
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+        self.inicio = np.concatenate(([int((codigos < 0).sum())], conteos)).cumsum()
+
+    def tamanio(self, codigos: np.ndarray) -> int:
+        return int((self.inicio[codigos + 1] - self.inicio[codigos]).sum())
+
+    def posiciones(self, codigos: np.ndarray) -> np.ndarray:
+        # Los códigos contiguos (un rango de años) salen como un solo tramo de `orden`, sin copiar por valor.
+        if len(codigos) and codigos[-1] - codigos[0] == len(codigos) - 1:
+            return self.orden[self.inicio[codigos[0]]:self.inicio[codigos[-1] + 1]]
+        return np.concatenate([self.orden[self.inicio[c]:self.inicio[c + 1]] for c in codigos])
+
+    def permitidos(self, codigos: np.ndarray) -> np.ndarray:
+        # Tabla código -> bool para verificar un filtro sobre posiciones ya elegidas.
+        tabla = np.zeros(len(self.valores), dtype=bool)
+        tabla[codigos] = True
+        return tabla
+
+
+class IndiceFiltros:
+    """
+    Índices por valor de cada columna filtrable, más la celda del cubo a la que pertenece cada fila.
+    Un filtro se resuelve partiendo del índice más selectivo y verificando los demás solo sobre esas
+    posiciones; el cubo filtrado sale de un np.bincount por celda, sin volver a agrupar.
+    """
+
+    def __init__(self, df: pd.DataFrame, cubo: pd.DataFrame):
+        self.cubo = cubo
+        self.filas = len(df)
+        self.columnas: Dict[str, _IndiceColumna] = {}
+        for col in COLUMNAS_FILTRO:
+            if col not in df.columns: continue
+            serie = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype('category')
+            self.columnas[col] = _IndiceColumna(serie.cat.codes.to_numpy(), serie.cat.categories)
+
+        anios = df['ANIO'].to_numpy() if 'ANIO' in df.columns else np.zeros(len(df), dtype=np.int16)
+        self.anio_base = int(anios.min()) if len(anios) else 0
+        valores_anio = pd.Index(np.arange(self.anio_base, int(anios.max(initial=0)) + 1))
+        self.anio = _IndiceColumna((anios - self.anio_base).astype(np.int32), valores_anio)
+
+        # Las celdas se numeran en el mismo orden en que construir_cubo deja sus filas.
+        dimensiones = [col for col in DIMENSIONES_CUBO if col in df.columns]
+        # Las filas sin celda (alguna dimensión nula) van a una celda extra que se descarta al final.
+        self.celda = df.groupby(dimensiones, observed=True).ngroup().to_numpy(dtype=np.int32)
+        self.celda[self.celda < 0] = len(cubo)
+        self.cantidad = df['CANTIDAD'].to_numpy(dtype=np.int64)
+
+    def valores(self, col: str, filtros: Optional[Filtros] = None) -> List[str]:
+        """Valores presentes en `col`, opcionalmente solo entre las filas que cumplen `filtros`."""
+        if col not in self.columnas: return []
+        indice = self.columnas[col]
+        posiciones = None if filtros is None else self.posiciones(filtros)
+        if posiciones is None:
+            presentes = np.flatnonzero(np.diff(indice.inicio))
+        else:
+            codigos = indice.codigos[posiciones]
+            presentes = np.flatnonzero(np.bincount(codigos[codigos >= 0], minlength=len(indice.valores)))
+        return [str(v) for v in indice.valores[presentes]]
+
+    def rango_anios(self) -> Tuple[int, int]:
+        """Primer y último año válido (los registros sin fecha tienen ANIO = 0)."""
+        con_filas = np.flatnonzero(np.diff(self.anio.inicio))
+        anios = self.anio.valores[con_filas]
+        anios = anios[anios > 0]
+        return (int(anios.min()), int(anios.max())) if len(anios) else (0, 0)
+
+    def _condiciones(self, filtros: Filtros) -> List[Tuple[_IndiceColumna, np.ndarray]]:
+        condiciones = []
+        if filtros.anio_desde is not None or filtros.anio_hasta is not None:
+            desde, hasta = self.rango_anios()
+            desde = max(filtros.anio_desde or desde, 1) - self.anio_base
+            hasta = min(filtros.anio_hasta or hasta, self.anio_base + len(self.anio.valores) - 1) - self.anio_base
+            condiciones.append((self.anio, np.arange(max(desde, 0), hasta + 1)))
+        for col, seleccion in filtros.por_columna().items():
+            if not seleccion or col not in self.columnas: continue
+            indice = self.columnas[col]
+            codigos = indice.valores.get_indexer(list(seleccion))
+            condiciones.append((indice, np.sort(codigos[codigos >= 0])))
+        return condiciones
+
+    def posiciones(self, filtros: Filtros) -> Optional[np.ndarray]:
+        """Posiciones de las filas que cumplen todos los filtros, o None si no hay ningún filtro activo."""
+        condiciones = self._condiciones(filtros)
+        if not condiciones: return None
+        condiciones.sort(key=lambda c: c[0].tamanio(c[1]))
+        indice, codigos = condiciones[0]
+        posiciones = indice.posiciones(codigos) if len(codigos) else np.empty(0, dtype=np.int32)
+        for indice, codigos in condiciones[1:]:
+            posiciones = posiciones[indice.permitidos(codigos)[indice.codigos[posiciones]]]
+        return posiciones
+
+    def cubo_filtrado(self, filtros: Filtros) -> pd.DataFrame:
+        """Cubo con solo las filas que cumplen `filtros`; su huella combina la de los datos y la selección."""
+        with etapa("filtros.posiciones", self.filas) as registro:
+            posiciones = self.posiciones(filtros)
+            registro.filas_salida = self.filas if posiciones is None else len(posiciones)
+        if posiciones is None: return self.cubo
+        if len(posiciones) == 0: return pd.DataFrame()
+
+        with etapa("filtros.cubo", len(posiciones)) as registro:
+            celdas, n_celdas = self.celda[posiciones], len(self.cubo)
+            presentes = (np.bincount(celdas, minlength=n_celdas + 1) > 0)[:n_celdas]
+            totales = np.bincount(celdas, weights=self.cantidad[posiciones], minlength=n_celdas + 1)[:n_celdas]
+            cubo = self.cubo[presentes].reset_index(drop=True)
+            cubo['CANTIDAD'] = totales[presentes].astype(np.int64)
+            registro.filas_salida = len(cubo)
+        cubo.attrs.update(self.cubo.attrs)
+        cubo.attrs['huella'] = filtros.huella(self.cubo.attrs.get('huella', ''))
+        cubo.attrs['filas_origen'] = len(posiciones)
+        return cubo
@@ -0,0 +1,271 @@
+# fuente_sqlite.py
+
+"""
+Backend opcional del dashboard sobre SQLite (solo biblioteca estándar), para datasets que no caben en memoria.
+El dataset limpio de la caché en disco se pasa, por bloques, a una base <huella>.sqlite junto a su entrada:
+las categorías se guardan como códigos enteros, con índices sobre las columnas que se filtran y el cubo
+completo ya agregado. Los filtros y el cubo filtrado se resuelven con WHERE y GROUP BY dentro de SQLite,
+así el proceso solo tiene en memoria el cubo. Se activa con DELITOS_BACKEND=sqlite.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from almacenamiento import DIRECTORIO_CACHE, leer_attrs_cache, leer_cache_por_bloques, ruta_cache, ruta_sqlite
+from analisis import DIMENSIONES_CUBO
+from filtros import COLUMNAS_FILTRO, Filtros
+from instrumentacion import etapa
+from procesamiento import asegurar_cache, huella_origen
+
+# "memoria" (por defecto): el dataset completo en un DataFrame; "sqlite": las consultas van a la base.
+BACKEND_DATOS = os.environ.get("DELITOS_BACKEND", "memoria")
+# Filas que se leen de la caché y se insertan en cada lote al construir la base.
+FILAS_LOTE_SQLITE = 100_000
+
+# Índices de la tabla de filas. El de año va en el orden del cubo y trae todas las columnas que se filtran
+# (cubre la consulta): cualquier cubo filtrado se agrega recorriendo solo ese índice, ya ordenado y sin
+# ir a la tabla. El de departamento + municipio ofrece los municipios de los departamentos elegidos y
+# el de artículo resuelve los filtros por artículo más selectivos.
+INDICES_SQLITE: Dict[str, Tuple[str, ...]] = {
+    'idx_anio': ('ANIO', 'MES', 'DEPARTAMENTO', 'ARTICULO', 'CANTIDAD', 'MUNICIPIO', 'ZONA'),
+    'idx_departamento': ('DEPARTAMENTO', 'MUNICIPIO'),
+    'idx_articulo': ('ARTICULO',),
+}
+
+
+def _lista(columnas: List[str]) -> str:
+    return ", ".join(f'"{col}"' for col in columnas)
+
+
+def _valores_sql(serie: pd.Series, tipo: str, codigos: Dict[Any, int]) -> List[Any]:
+    # Valores de una columna listos para insertar: las categorías pasan a su código en `codigos`
+    # (que crece con los valores nuevos de cada bloque) y los nulos a None.
+    if tipo == 'category':
+        serie = serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+        mapa = np.array([codigos.setdefault(valor, len(codigos)) for valor in serie.cat.categories] + [-1], dtype=np.int64)
+        globales = mapa[serie.cat.codes.to_numpy()]
+        if (globales >= 0).all(): return globales.tolist()
+        return [None if codigo < 0 else codigo for codigo in globales.tolist()]
+    if tipo == 'str': return serie.astype(object).where(serie.notna(), None).tolist()
+    return serie.to_numpy().tolist()
+
+
+def construir_sqlite(huella: str) -> bool:
+    """
+    Arma la base SQLite de la entrada `huella` leyendo la caché por bloques (la memoria no depende del
+    tamaño del dataset) y la deja en su lugar de forma atómica. Devuelve False si no se pudo.
+    """
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=DIRECTORIO_CACHE, suffix=".tmp")
+    os.close(descriptor)
+    conexion = sqlite3.connect(ruta_temporal)
+    try:
+        # Es un archivo temporal: si el proceso muere a mitad se descarta, no hace falta diario.
+        conexion.execute("PRAGMA journal_mode = OFF")
+        conexion.execute("PRAGMA synchronous = OFF")
+        tipos: Dict[str, str] = {}
+        codigos: Dict[str, Dict[Any, int]] = {}
+        filas = 0
+        with etapa("sqlite.filas") as registro:
+            for bloque in leer_cache_por_bloques(huella, FILAS_LOTE_SQLITE):
+                if not tipos:
+                    for col in bloque.columns:
+                        dtype = bloque[col].dtype
+                        if isinstance(dtype, pd.CategoricalDtype) or col in COLUMNAS_FILTRO: tipos[col] = 'category'
+                        elif isinstance(dtype, np.dtype) and dtype.kind in "biuf": tipos[col] = dtype.str
+                        else: tipos[col] = 'str'
+                    definicion = ", ".join(f'"{col}" {"TEXT" if tipo == "str" else "REAL" if "f" in tipo else "INTEGER"}'
+                                           for col, tipo in tipos.items())
+                    conexion.execute(f"CREATE TABLE delitos ({definicion})")
+                valores = [_valores_sql(bloque[col], tipo, codigos.setdefault(col, {})) for col, tipo in tipos.items()]
+                conexion.executemany(f"INSERT INTO delitos VALUES ({', '.join('?' * len(tipos))})", zip(*valores))
+                filas += len(bloque)
+            registro.filas_salida = filas
+        if not tipos: raise ValueError("La entrada de la caché no tiene filas.")
+
+        with etapa("sqlite.indices", filas):
+            for nombre, columnas in INDICES_SQLITE.items():
+                if all(col in tipos for col in columnas): conexion.execute(f"CREATE INDEX {nombre} ON delitos ({_lista(list(columnas))})")
+            conexion.execute("ANALYZE")
+            dimensiones = _lista([col for col in DIMENSIONES_CUBO if col in tipos])
+            conexion.execute(f'CREATE TABLE cubo AS SELECT {dimensiones}, SUM("CANTIDAD") AS "CANTIDAD", COUNT(*) AS "FILAS" '
+                             f"FROM delitos GROUP BY {dimensiones}")
+
+        conexion.execute("CREATE TABLE categorias (columna TEXT, codigo INTEGER, valor TEXT)")
+        conexion.executemany("INSERT INTO categorias VALUES (?, ?, ?)",
+                             [(col, codigo, str(valor)) for col, mapa in codigos.items() for valor, codigo in mapa.items()])
+        fechas_invalidas = conexion.execute('SELECT COUNT(*) FROM delitos WHERE "MES" = 0').fetchone()[0] if 'MES' in tipos else 0
+        meta = {"attrs": {**leer_attrs_cache(huella), "huella": huella}, "tipos": tipos, "filas": filas,
+                "fechas_invalidas": fechas_invalidas}
+        conexion.execute("CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT)")
+        conexion.executemany("INSERT INTO meta VALUES (?, ?)", [(clave, json.dumps(valor)) for clave, valor in meta.items()])
+        conexion.commit()
+        conexion.close()
+        os.replace(ruta_temporal, ruta_sqlite(huella))
+    except (OSError, ValueError, sqlite3.Error, pa.ArrowException):
+        conexion.close()
+        if os.path.exists(ruta_temporal): os.remove(ruta_temporal)
+        return False
+    return True
+
+
+class FuenteSQLite:
+    """
+    Lo mismo que IndiceFiltros (rango de años, valores para los filtros y cubo filtrado), con las consultas
+    resueltas en SQLite. Una sola conexión de solo lectura, compartida por las sesiones con un candado.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, check_same_thread=False)
+        self._candado = threading.Lock()
+        meta = {clave: json.loads(valor) for clave, valor in self._consultar("SELECT clave, valor FROM meta")}
+        self.attrs: Dict[str, Any] = meta["attrs"]
+        self.tipos: Dict[str, str] = meta["tipos"]
+        self.filas: int = meta["filas"]
+        self._fechas_invalidas: int = meta["fechas_invalidas"]
+        self.dimensiones = [col for col in DIMENSIONES_CUBO if col in self.tipos]
+
+        # Los códigos se asignaron en orden de llegada; `_orden` los lleva al código de las categorías
+        # ordenadas alfabéticamente, como las deja compactar_tipos.
+        self._categorias: Dict[str, pd.Index] = {}
+        self._orden: Dict[str, np.ndarray] = {}
+        self._codigo: Dict[str, Dict[str, int]] = {}
+        por_columna: Dict[str, List[Tuple[int, str]]] = {}
+        for col, codigo, valor in self._consultar("SELECT columna, codigo, valor FROM categorias"):
+            por_columna.setdefault(col, []).append((codigo, valor))
+        for col, tipo in self.tipos.items():
+            if tipo != 'category': continue
+            pares = sorted(por_columna.get(col, []))
+            valores = np.array([valor for _, valor in pares], dtype=object)
+            orden = np.argsort(valores, kind='stable')
+            self._categorias[col] = pd.Index(valores[orden], dtype='str')
+            self._orden[col] = np.append(np.argsort(orden), -1)
+            self._codigo[col] = {valor: codigo for codigo, valor in pares}
+        self._valores: Dict[str, List[str]] = {}
+        self._cubo: Optional[pd.DataFrame] = None
+
+        fila = self._consultar('SELECT MIN("ANIO"), MAX("ANIO") FROM delitos WHERE "ANIO" > 0') if 'ANIO' in self.tipos else []
+        self._rango = (int(fila[0][0]), int(fila[0][1])) if fila and fila[0][0] is not None else (0, 0)
+
+    def _consultar(self, sql: str, parametros: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        with self._candado:
+            return self._conexion.execute(sql, parametros).fetchall()
+
+    def _columna(self, col: str, valores: List[Any]) -> Any:
+        # Columna leída de la base con el tipo que tenía en el DataFrame (categorías ordenadas incluidas).
+        tipo = self.tipos[col]
+        if tipo == 'category':
+            codigos = np.array([-1 if v is None else v for v in valores], dtype=np.int64)
+            return pd.Categorical.from_codes(self._orden[col][codigos], categories=self._categorias[col], validate=False)
+        if tipo == 'str': return pd.array(valores, dtype='str')
+        return np.array(valores, dtype=np.dtype(tipo))
+
+    def rango_anios(self) -> Tuple[int, int]:
+        """Primer y último año válido (los registros sin fecha tienen ANIO = 0)."""
+        return self._rango
+
+    def _condiciones(self, filtros: Filtros) -> Tuple[List[str], List[Any]]:
+        # Mismas reglas que IndiceFiltros._condiciones; una selección sin valores conocidos no deja filas.
+        condiciones: List[str] = []
+        parametros: List[Any] = []
+        if (filtros.anio_desde is not None or filtros.anio_hasta is not None) and 'ANIO' in self.tipos:
+            desde, hasta = self.rango_anios()
+            condiciones.append('"ANIO" BETWEEN ? AND ?')
+            parametros += [max(filtros.anio_desde or desde, 1), filtros.anio_hasta or hasta]
+        for col, seleccion in filtros.por_columna().items():
+            if not seleccion or col not in self._codigo: continue
+            codigos = [self._codigo[col][valor] for valor in seleccion if valor in self._codigo[col]]
+            if not codigos:
+                condiciones.append("0")
+                continue
+            condiciones.append(f'"{col}" IN ({", ".join("?" * len(codigos))})')
+            parametros += codigos
+        return condiciones, parametros
+
+    def valores(self, col: str, filtros: Optional[Filtros] = None) -> List[str]:
+        """Valores presentes en `col`, opcionalmente solo entre las filas que cumplen `filtros`."""
+        if col not in self._codigo: return []
+        condiciones, parametros = self._condiciones(filtros) if filtros is not None else ([], [])
+        if not condiciones and col in self._valores: return self._valores[col]
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        codigos = [c for (c,) in self._consultar(f'SELECT DISTINCT "{col}" FROM delitos {donde}', tuple(parametros)) if c is not None]
+        presentes = np.sort(self._orden[col][np.array(codigos, dtype=np.int64)]) if codigos else np.empty(0, dtype=np.int64)
+        valores = [str(v) for v in self._categorias[col][presentes]]
+        if not condiciones: self._valores[col] = valores
+        return valores
+
+    def cubo_filtrado(self, filtros: Filtros) -> pd.DataFrame:
+        """Cubo con solo las filas que cumplen `filtros`, agregado por SQLite con el mismo resultado que IndiceFiltros."""
+        condiciones, parametros = self._condiciones(filtros)
+        if not condiciones and self._cubo is not None: return self._cubo
+        dimensiones = _lista(self.dimensiones)
+        if condiciones:
+            sql = (f'SELECT {dimensiones}, SUM("CANTIDAD"), COUNT(*) FROM delitos WHERE {" AND ".join(condiciones)} '
+                   f"GROUP BY {dimensiones}")
+        else:
+            sql = f'SELECT {dimensiones}, "CANTIDAD", "FILAS" FROM cubo'
+        with etapa("sqlite.cubo", self.filas) as registro:
+            grupos = self._consultar(sql, tuple(parametros))
+            filas_origen = sum(grupo[-1] for grupo in grupos)
+            # Las filas con alguna dimensión nula cuentan como registros pero no tienen celda en el cubo.
+            grupos = [grupo for grupo in grupos if None not in grupo[:len(self.dimensiones)]]
+            registro.filas_salida = len(grupos)
+        if filas_origen == 0: return pd.DataFrame()
+
+        columnas = list(zip(*grupos)) if grupos else [()] * (len(self.dimensiones) + 2)
+        cubo = pd.DataFrame({col: self._columna(col, list(valores)) for col, valores in zip(self.dimensiones, columnas)})
+        cubo['CANTIDAD'] = np.array(columnas[len(self.dimensiones)], dtype=np.int64)
+        cubo = cubo.sort_values(self.dimensiones, kind='stable').reset_index(drop=True)
+        cubo.attrs.update(self.attrs)
+        cubo.attrs['filas_origen'] = filas_origen
+        if condiciones: cubo.attrs['huella'] = filtros.huella(self.attrs.get('huella', ''))
+        else: self._cubo = cubo
+        return cubo
+
+    def muestra(self, n: int = 5) -> pd.DataFrame:
+        """Primeras `n` filas del dataset, con los tipos y los attrs del DataFrame limpio."""
+        filas = self._consultar(f"SELECT * FROM delitos LIMIT {int(n)}")
+        columnas = list(zip(*filas)) if filas else [()] * len(self.tipos)
+        muestra = pd.DataFrame({col: self._columna(col, list(valores)) for col, valores in zip(self.tipos, columnas)})
+        muestra.attrs.update(self.attrs)
+        return muestra
+
+    def resumen(self) -> Dict[str, Any]:
+        """Datos de la vista previa: registros, columnas, años, fechas inválidas, duplicados y tamaño en disco."""
+        return {
+            "filas": self.filas, "columnas": len(self.tipos), "anios": self.rango_anios(),
+            "fechas_invalidas": self._fechas_invalidas,
+            "duplicados_eliminados": self.attrs.get('duplicados_eliminados', 0),
+            "mb": os.path.getsize(self.ruta) / 2**20,
+        }
+
+
+def abrir_fuente_sqlite(data_input: Any) -> Optional[FuenteSQLite]:
+    """
+    Base SQLite de `data_input`. En un arranque en frío con la base ya armada no se limpia ni se lee nada más;
+    si falta, se arma desde la caché en disco (que se llena primero si hace falta). None si no se pudo.
+    """
+    if data_input is None: return None
+    try:
+        huella = huella_origen(data_input)
+    except (FileNotFoundError, OSError, AttributeError):
+        return None
+    if not os.path.exists(ruta_sqlite(huella)):
+        with etapa("sqlite.construccion"):
+            if asegurar_cache(data_input) != huella or not construir_sqlite(huella): return None
+    # La base se desaloja junto con su entrada de la caché: usarla cuenta como uso de la entrada.
+    try: os.utime(ruta_cache(huella))
+    except OSError: pass
+    try:
+        return FuenteSQLite(ruta_sqlite(huella))
+    except (sqlite3.Error, KeyError, ValueError):
+        return None
@@ -0,0 +1,646 @@
+# graficos.py
+
+"""
+Funciones que arman las figuras de Plotly del dashboard a partir del cubo (o del dataset limpio).
+No dependen de Streamlit: las usan app.py, el modo batch (batch.py) y los benchmarks.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from analisis import estacionalidad, indice_estacional, matriz_mensual, top_k
+from pronosticos import pronostico_de, pronosticos
+
+# Tema del dashboard (fondo negro); el modo batch exporta con el mismo para que las claves coincidan.
+TEMA_POR_DEFECTO = 'plotly_dark'
+# Con la variable en "0" las figuras viajan al navegador tal como las arma Plotly (para comparar tamaños).
+TRANSPORTE_COMPACTO = os.environ.get("DELITOS_TRANSPORTE_COMPACTO", "1") == "1"
+# Meses de historia que acompañan al pronóstico en su gráfico de líneas.
+MESES_HISTORIA_PRONOSTICO = 36
+NOMBRES_MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+# ==============================================================================
+# FUNCIONES DE VISUALIZACIÓN (MEJORADAS PARA FONDO NEGRO)
+# ==============================================================================
+
+def generar_tendencia_anual(df: pd.DataFrame, theme: Optional[str] = None) -> go.Figure:
+    """Se hizo este gráfico de barras para visualizar la tendencia histórica por intervalos de año."""
+    if df.empty or 'ANIO' not in df.columns: return go.Figure()
+    max_anio = df['ANIO'].max() if not df.empty else 2025
+    bins = [2000, 2005, 2010, 2015, 2020, max_anio + 1]
+    labels = [f"{bins[i]}-{bins[i+1]-1}" for i in range(len(bins)-1)]
+    df_tendencia = df[(df['ANIO'] >= 2000) & (df['ANIO'] <= max_anio)].copy()
+    df_tendencia['INTERVALO_ANIO'] = pd.cut(df_tendencia['ANIO'], bins=bins, labels=labels, right=False)
+    df_tendencia_intervalos = (df_tendencia.groupby('INTERVALO_ANIO', observed=False)['CANTIDAD'].sum().reset_index())
+
+    fig = px.bar(
+        df_tendencia_intervalos, 
+        x='INTERVALO_ANIO', 
+        y='CANTIDAD', 
+        color='CANTIDAD',
+        color_continuous_scale='Viridis',  # Escala que funciona bien en fondo oscuro
+        text_auto=True,
+        template='plotly_dark'  # Tema oscuro para Plotly
+    )
+    
+    # Mejoras en la visualización para fondo negro
+    fig.update_traces(
+        texttemplate='%{value:,.0f}', 
+        textposition='outside',
+        textfont=dict(color='#ffffff', size=12),
+        marker_line_color='rgba(255, 255, 255, 0.3)',
+        marker_line_width=1,
+        opacity=0.9
+    )
+    
+    fig.update_layout(
+        title_text="<b>📈 Tendencia de Casos por Intervalos de Año</b>", 
+        title_font=dict(size=18, color='#ffffff'),
+        xaxis_title="Intervalo de Años", 
+        yaxis_title="Número de Casos", 
+        margin=dict(t=60, b=50, l=50, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        )
+    )
+    return fig
+
+
+def generar_top_conductas(df: pd.DataFrame, n_top: int = 8, theme: Optional[str] = None) -> go.Figure:
+    """Se hizo este gráfico de barras horizontales para identificar el Top N de Artículos de delito (Visión General)."""
+    if df.empty or 'ARTICULO' not in df.columns: return go.Figure()
+    df_conducta_top = top_k(df, 'ARTICULO', n_top)
+
+    fig = px.bar(
+        df_conducta_top, 
+        x='CANTIDAD', 
+        y='ARTICULO', 
+        orientation='h', 
+        color='CANTIDAD',
+        color_continuous_scale='Plasma',  # Escala vibrante para fondo oscuro
+        text_auto=True,
+        template='plotly_dark'
+    )
+    
+    # Mejoras en la visualización
+    fig.update_traces(
+        texttemplate='%{value:,.0f}',
+        textposition='outside',
+        textfont=dict(color='#ffffff', size=11),
+        marker_line_color='rgba(255, 255, 255, 0.3)',
+        marker_line_width=1,
+        opacity=0.9
+    )
+    
+    fig.update_layout(
+        title_text=f"<b>🔥 Top {n_top} Artículos de Conductas Delictivas Ambientales</b>", 
+        title_font=dict(size=18, color='#ffffff'),
+        xaxis_title="Número de Casos", 
+        yaxis_title="Artículo de Delito", 
+        margin=dict(t=60, b=50, l=200, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0', size=11),
+            autorange="reversed",
+            categoryorder='total ascending'
+        )
+    )
+    return fig
+
+
+def generar_top_departamentos(df: pd.DataFrame, n_top: int = 10, theme: Optional[str] = None) -> go.Figure:
+    """Este gráfico se hizo para mostrar el Top N de departamentos más afectados, el foco geográfico."""
+    if df.empty or 'DEPARTAMENTO' not in df.columns: return go.Figure()
+    df_depto_top = top_k(df, 'DEPARTAMENTO', n_top)
+
+    fig = px.bar(
+        df_depto_top, 
+        x='DEPARTAMENTO', 
+        y='CANTIDAD', 
+        color='CANTIDAD',
+        color_continuous_scale='Oranges',
+        text_auto=True,
+        template='plotly_dark'
+    )
+    
+    # Mejoras en la visualización
+    fig.update_traces(
+        texttemplate='%{value:,.0f}',
+        textposition='outside',
+        textfont=dict(color='#ffffff', size=11),
+        marker_line_color='rgba(255, 255, 255, 0.3)',
+        marker_line_width=1,
+        opacity=0.9
+    )
+    
+    fig.update_layout(
+        title_text=f"<b>📍 Top {n_top} Departamentos más Afectados</b>", 
+        title_font=dict(size=18, color='#ffffff'),
+        xaxis_title="Departamento", 
+        yaxis_title="Número de Casos", 
+        xaxis_tickangle=-45, 
+        margin=dict(t=60, b=120, l=50, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0', size=10)
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        )
+    )
+    return fig
+
+
+def generar_heatmap_conducta_anual(df: pd.DataFrame, theme: Optional[str] = None) -> go.Figure:
+    """Se hizo un Mapa de calor para mostrar la evolución de los delitos por año (usando Escala Log para suavizar)."""
+    if df.empty or 'ARTICULO' not in df.columns or 'ANIO' not in df.columns: return go.Figure()
+    df_heatmap_data = (df.groupby(['ANIO', 'ARTICULO'], observed=True)['CANTIDAD'].sum().reset_index())
+    df_heatmap_pivot = df_heatmap_data.pivot_table(index='ARTICULO', columns='ANIO', values='CANTIDAD', fill_value=0, observed=True)
+    df_heatmap_log = np.log1p(df_heatmap_pivot)
+
+    fig = px.imshow(
+        df_heatmap_log, 
+        x=df_heatmap_log.columns.astype(str), 
+        y=df_heatmap_log.index,
+        color_continuous_scale='YlOrRd',
+        aspect="auto", 
+        template='plotly_dark',
+        text_auto=False,
+        labels=dict(color="Log(1 + Casos)")
+    )
+
+    # Mejoras en la visualización
+    fig.update_layout(
+        title_text="<b>🌡️ Mapa de Calor: Evolución Temporal por Tipo de Delito (Log)</b>", 
+        title_font=dict(size=18, color='#ffffff'),
+        xaxis_title="Año", 
+        yaxis_title="Artículo de Delito", 
+        xaxis_tickangle=-45, 
+        height=700, 
+        margin=dict(t=70, b=50, l=200, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0', size=10)
+        ),
+        yaxis=dict(
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0', size=9)
+        )
+    )
+    fig.update_coloraxes(
+        colorbar_title='Log(1 + Casos)',
+        colorbar_title_font=dict(size=12, color='#e0e0e0'),
+        colorbar_tickfont=dict(size=10, color='#b0b0b0')
+    )
+    
+    return fig
+
+
+def generar_evolucion_top5_conductas(df: pd.DataFrame, theme: Optional[str] = None) -> go.Figure:
+    """Se hizo este gráfico de líneas para rastrear la evolución anual de las 5 conductas más frecuentes."""
+    if df.empty or 'ARTICULO' not in df.columns or 'ANIO' not in df.columns: return go.Figure()
+
+    top5_articulos = top_k(df, 'ARTICULO', 5)['ARTICULO'].tolist()
+    df_top5_filtrado = df[df['ARTICULO'].isin(top5_articulos)].copy()
+    df_tendencia = (df_top5_filtrado.groupby(['ANIO', 'ARTICULO'], observed=True)['CANTIDAD'].sum().reset_index())
+    
+    fig = px.line(
+        df_tendencia, 
+        x='ANIO', 
+        y='CANTIDAD', 
+        color='ARTICULO', 
+        markers=True, 
+        line_shape='spline', 
+        template='plotly_dark',
+        line_dash_sequence=['solid', 'dash', 'dot', 'dashdot', 'longdash'],
+        symbol_sequence=['circle', 'square', 'diamond', 'cross', 'x']
+    )
+    
+    # Mejoras en la visualización
+    fig.update_traces(
+        mode='lines+markers',
+        marker=dict(size=9),
+        line=dict(width=3.5)
+    )
+    
+    fig.update_layout(
+        title="<b>📊 Evolución Anual de las 5 Conductas más Frecuentes</b>",
+        title_font=dict(size=18, color='#ffffff'),
+        xaxis_title="Año", 
+        yaxis_title="Cantidad de Casos", 
+        legend_title="Artículo", 
+        hovermode="x unified",
+        font=dict(color="#e0e0e0"),
+        hoverlabel=dict(
+            bgcolor="rgba(20, 20, 30, 0.9)", 
+            font_color="white",
+            font_size=12
+        ), 
+        margin=dict(t=70, b=50, l=50, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickformat="d",
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.3,
+            xanchor="center",
+            x=0.5,
+            font=dict(size=11, color='#e0e0e0'),
+            bgcolor='rgba(20, 20, 30, 0.7)',
+            bordercolor='rgba(0, 212, 255, 0.3)',
+            borderwidth=1
+        )
+    )
+    
+    return fig
+
+
+def generar_distribucion_top_depto_bar(df: pd.DataFrame, depto_critico: str, theme: Optional[str] = None) -> go.Figure:
+    """Generamos un gráfico de barras horizontal de la distribución de delitos en el departamento más afectado."""
+    if df.empty or 'DEPARTAMENTO' not in df.columns or depto_critico == "N/A": return go.Figure()
+    
+    df_distribucion = top_k(df, 'ARTICULO', 5, DEPARTAMENTO=depto_critico)
+    
+    fig = px.bar(
+        df_distribucion, 
+        x='CANTIDAD', 
+        y='ARTICULO', 
+        orientation='h',
+        title=f'<b>📋 Composición del Delito en: {depto_critico}</b>',
+        template='plotly_dark',
+        color='CANTIDAD',
+        color_continuous_scale='Reds',
+        text_auto=True
+    )
+    
+    # Mejoras en la visualización
+    fig.update_traces(
+        texttemplate='%{value:,.0f}',
+        textposition='outside',
+        textfont=dict(color='#ffffff', size=11),
+        marker_line_color='rgba(255, 255, 255, 0.3)',
+        marker_line_width=1,
+        opacity=0.9
+    )
+    
+    fig.update_layout(
+        title_font=dict(size=16, color='#ffffff'),
+        yaxis_title="Artículo de Delito", 
+        xaxis_title="Número de Casos", 
+        margin=dict(t=60, b=50, l=200, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0', size=11),
+            autorange="reversed",
+            categoryorder='total ascending'
+        )
+    )
+    return fig
+
+
+def generar_distribucion_mensual(df: pd.DataFrame, delito_critico: str, theme: Optional[str] = None) -> go.Figure:
+    """Generamos un gráfico de barras para la distribución mensual del delito más frecuente (Estacionalidad)."""
+    if df.empty or 'MES' not in df.columns or delito_critico == "N/A": return go.Figure()
+    
+    # El mes ya viene calculado desde la carga (0 = fecha inválida), no se vuelve a convertir la fecha.
+    df_filtrado = df[(df['ARTICULO'] == delito_critico) & (df['MES'] > 0)]
+    df_mensual = (df_filtrado.groupby('MES')['CANTIDAD'].sum().reset_index())
+    
+    meses = NOMBRES_MESES
+    df_mensual['NOMBRE_MES'] = df_mensual['MES'].apply(lambda x: meses[x-1])
+    
+    fig = px.bar(
+        df_mensual, 
+        x='NOMBRE_MES', 
+        y='CANTIDAD', 
+        title=f'<b>📅 Estacionalidad Mensual del Delito: {delito_critico}</b>',
+        template='plotly_dark',
+        color='CANTIDAD',
+        color_continuous_scale='Viridis',
+        text_auto=True,
+        category_orders={"NOMBRE_MES": meses}
+    )
+    
+    # Mejoras en la visualización
+    fig.update_traces(
+        texttemplate='%{value:,.0f}',
+        textposition='outside',
+        textfont=dict(color='#ffffff', size=11),
+        marker_line_color='rgba(255, 255, 255, 0.3)',
+        marker_line_width=1,
+        opacity=0.9
+    )
+    
+    fig.update_layout(
+        title_font=dict(size=16, color='#ffffff'),
+        xaxis_title="Mes", 
+        yaxis_title="Casos Acumulados", 
+        margin=dict(t=60, b=50, l=50, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickangle=0,
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        )
+    )
+
+    # Pronóstico de los próximos meses en el eje derecho: son casos de un solo mes, no acumulados.
+    pronostico = pronostico_de(pronosticos(df), 'ARTICULO', delito_critico).sort_values('MES')
+    if not pronostico.empty:
+        fig.add_trace(go.Scatter(
+            x=[meses[mes - 1] for mes in pronostico['MES']], y=pronostico['PRONOSTICO'], yaxis='y2',
+            mode='lines+markers', name="Pronóstico próximos meses", customdata=pronostico['ANIO'],
+            hovertemplate='%{x} %{customdata}: %{y:,.0f} casos<extra></extra>',
+            line=dict(color='#ff6b00', width=3), marker=dict(size=7)
+        ))
+        fig.update_layout(
+            yaxis2=dict(
+                title="Casos Pronosticados", overlaying='y', side='right', showgrid=False, rangemode='tozero',
+                title_font=dict(size=14, color='#ff6b00'),
+                tickfont=dict(color='#b0b0b0')
+            ),
+            legend=dict(orientation='h', x=0, y=1.02, yanchor='bottom', font=dict(color='#e0e0e0')),
+            margin=dict(t=90, b=50, l=50, r=60)
+        )
+    return fig
+
+
+def generar_pronostico_mensual(df: pd.DataFrame, dimension: str, valor: str, theme: Optional[str] = None) -> go.Figure:
+    """Casos mensuales recientes de un departamento o artículo y, a continuación, su pronóstico."""
+    if df.empty or dimension not in df.columns or valor == "N/A": return go.Figure()
+    resultado = matriz_mensual(df, dimension)
+    pronostico = pronostico_de(pronosticos(df), dimension, valor)
+    if resultado is None or valor not in resultado[1] or pronostico.empty: return go.Figure()
+    primero, valores, casos = resultado
+    historia = casos[-MESES_HISTORIA_PRONOSTICO:, valores.get_loc(valor)]
+    periodos = primero + len(casos) - len(historia) + np.arange(len(historia))
+    fechas = [f"{periodo // 12}-{periodo % 12 + 1:02d}-01" for periodo in periodos]
+    # El pronóstico arranca en el último mes observado para que las dos líneas queden unidas.
+    fechas_pronostico = fechas[-1:] + [f"{anio}-{mes:02d}-01" for anio, mes in zip(pronostico['ANIO'], pronostico['MES'])]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=fechas, y=historia, mode='lines+markers', name="Casos registrados",
+        line=dict(color='#00d4ff', width=2), marker=dict(size=5)
+    ))
+    fig.add_trace(go.Scatter(
+        x=fechas_pronostico, y=np.concatenate([historia[-1:], pronostico['PRONOSTICO'].to_numpy()]),
+        mode='lines+markers', name=f"Pronóstico ({pronostico['MODELO'].iloc[0].replace('_', ' ')})",
+        line=dict(color='#ff6b00', width=3, dash='dash'), marker=dict(size=6)
+    ))
+
+    fig.update_layout(
+        title_text=f"<b>🔮 Pronóstico Mensual: {valor}</b>",
+        title_font=dict(size=16, color='#ffffff'),
+        template='plotly_dark',
+        xaxis_title="Mes",
+        yaxis_title="Número de Casos",
+        hovermode='x unified',
+        margin=dict(t=90, b=50, l=50, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        legend=dict(orientation='h', x=0, y=1.02, yanchor='bottom', font=dict(color='#e0e0e0')),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0'),
+            rangemode='tozero'
+        )
+    )
+    return fig
+
+
+def generar_indice_estacional(df: pd.DataFrame, departamentos: Tuple[str, ...] = (), articulos: Tuple[str, ...] = (),
+                              theme: Optional[str] = None) -> go.Figure:
+    """Índice estacional de la selección departamento × artículo (1 = mes promedio), desde la tabla precalculada."""
+    if df.empty: return go.Figure()
+    df_indice = indice_estacional(estacionalidad(df), departamentos, articulos)
+    if df_indice['INDICE'].isna().all(): return go.Figure()
+    df_indice['NOMBRE_MES'] = [NOMBRES_MESES[mes - 1] for mes in df_indice['MES']]
+    seleccion = " · ".join(filter(None, [", ".join(departamentos), ", ".join(articulos)])) or "Todas las series"
+
+    fig = px.bar(
+        df_indice,
+        x='NOMBRE_MES',
+        y='INDICE',
+        title=f'<b>📆 Índice Estacional: {seleccion}</b>',
+        template='plotly_dark',
+        color='INDICE',
+        color_continuous_scale='RdYlGn_r',
+        color_continuous_midpoint=1.0,
+        text_auto=True,
+        category_orders={"NOMBRE_MES": NOMBRES_MESES},
+        hover_data={'MEDIA': ':,.1f'},
+    )
+
+    fig.update_traces(
+        texttemplate='%{value:.2f}',
+        textposition='outside',
+        textfont=dict(color='#ffffff', size=11),
+        marker_line_color='rgba(255, 255, 255, 0.3)',
+        marker_line_width=1,
+        opacity=0.9
+    )
+    fig.add_hline(y=1.0, line_dash="dash", line_color='rgba(255, 255, 255, 0.5)')
+
+    fig.update_layout(
+        title_font=dict(size=16, color='#ffffff'),
+        xaxis_title="Mes",
+        yaxis_title="Índice (1 = mes promedio)",
+        margin=dict(t=60, b=50, l=50, r=50),
+        plot_bgcolor='rgba(15, 15, 25, 0.8)',
+        paper_bgcolor='rgba(15, 15, 25, 0.5)',
+        font=dict(size=12, color='#e0e0e0'),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickangle=0,
+            tickfont=dict(color='#b0b0b0')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(100, 100, 150, 0.2)',
+            title_font=dict(size=14, color='#00d4ff'),
+            tickfont=dict(color='#b0b0b0')
+        )
+    )
+    return fig
+
+
+# ==============================================================================
+# FIGURAS DEL TABLERO (LAS QUE EL MODO BATCH DEJA PRECALCULADAS)
+# ==============================================================================
+
+GENERADORES: Dict[str, Callable[..., go.Figure]] = {
+    generador.__name__: generador for generador in [
+        generar_evolucion_top5_conductas, generar_heatmap_conducta_anual,
+        generar_top_departamentos, generar_top_conductas, generar_tendencia_anual,
+        generar_distribucion_top_depto_bar, generar_distribucion_mensual, generar_indice_estacional,
+        generar_pronostico_mensual,
+    ]
+}
+
+
+def figuras_del_tablero(departamento_critico: str, delito_critico: str,
+                        tema: str = TEMA_POR_DEFECTO) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Generador y parámetros de cada figura del dashboard sin filtros, tal como los pide app.py
+    (las figuras de focos se omiten cuando el KPI es "N/A", igual que en la sección).
+    """
+    figuras: List[Tuple[str, Dict[str, Any]]] = [
+        ('generar_evolucion_top5_conductas', {'theme': tema}),
+        ('generar_heatmap_conducta_anual', {'theme': tema}),
+        ('generar_top_departamentos', {'theme': tema}),
+        ('generar_top_conductas', {'theme': tema}),
+        ('generar_tendencia_anual', {'theme': tema}),
+    ]
+    if departamento_critico != 'N/A':
+        figuras.append(('generar_distribucion_top_depto_bar', {'depto_critico': departamento_critico, 'theme': tema}))
+        figuras.append(('generar_pronostico_mensual', {'dimension': 'DEPARTAMENTO', 'valor': departamento_critico, 'theme': tema}))
+    if delito_critico != 'N/A':
+        figuras.append(('generar_distribucion_mensual', {'delito_critico': delito_critico, 'theme': tema}))
+    return figuras
+
+
+# ==============================================================================
+# TRANSPORTE COMPACTO (LO QUE VIAJA AL NAVEGADOR EN CADA RERUN)
+# ==============================================================================
+
+# Del tema solo se envían las claves que usan los gráficos cartesianos del tablero: polar, geo, 3D,
+# ternario, sliders y las escalas de color por defecto nunca se dibujan (cada figura fija la suya).
+CLAVES_LAYOUT_TEMA = (
+    'autotypenumbers', 'colorway', 'font', 'hovermode', 'hoverlabel', 'paper_bgcolor', 'plot_bgcolor',
+    'coloraxis', 'xaxis', 'yaxis', 'title', 'annotationdefaults', 'shapedefaults',
+)
+
+
+def _sin_redefinidas(plantilla: Dict[str, Any], layout: Dict[str, Any]) -> Dict[str, Any]:
+    # Lo que el layout de la figura ya fija nunca se toma de la plantilla: no hace falta enviarlo.
+    resultado = {}
+    for clave, valor in plantilla.items():
+        propio = layout.get(clave)
+        if propio is None: resultado[clave] = valor
+        elif isinstance(valor, dict) and isinstance(propio, dict):
+            resto = _sin_redefinidas(valor, propio)
+            if resto: resultado[clave] = resto
+    return resultado
+
+
+def compactar_figura(figura: go.Figure) -> go.Figure:
+    """
+    Deja la figura con el mismo dibujo y menos bytes: la plantilla (unos 7 KB repetidos en cada figura)
+    se reduce a lo que estos gráficos usan y no redefinen, con los valores por defecto solo de los tipos
+    de traza presentes, y los arreglos float64 pasan a float32 (los enteros ya los achica Plotly).
+    Modifica la figura y la devuelve.
+    """
+    layout = figura.layout.to_plotly_json()
+    plantilla = layout.pop('template', None)
+    if plantilla:
+        plantilla = plantilla.to_plotly_json() if hasattr(plantilla, 'to_plotly_json') else plantilla
+        tipos = {traza.type for traza in figura.data}
+        base = {clave: valor for clave, valor in plantilla.get('layout', {}).items() if clave in CLAVES_LAYOUT_TEMA}
+        # La plantilla de 'xaxis' vale para todos los ejes x; solo se recorta si la figura tiene uno.
+        ejes_extra = {clave[:5] for clave in layout if clave[:5] in ('xaxis', 'yaxis') and clave[5:]}
+        recortable = {clave: valor for clave, valor in layout.items() if clave not in ejes_extra}
+        figura.layout.template = {
+            'layout': _sin_redefinidas(base, recortable),
+            'data': {tipo: valores for tipo, valores in plantilla.get('data', {}).items() if tipo in tipos},
+        }
+    for traza in figura.data:
+        for propiedad in ('x', 'y', 'z', 'customdata'):
+            if propiedad not in traza: continue
+            valores = traza[propiedad]
+            if isinstance(valores, np.ndarray) and valores.dtype == np.float64:
+                traza[propiedad] = valores.astype(np.float32)
+    return figura
+
+
+def para_transporte(figura: go.Figure) -> go.Figure:
+    """La figura que se envía al navegador: compacta, salvo con DELITOS_TRANSPORTE_COMPACTO=0."""
+    return compactar_figura(figura) if TRANSPORTE_COMPACTO else figura
+
+
+def tamanio_figura(figura: go.Figure) -> int:
+    """Bytes del JSON que st.plotly_chart envía al navegador por esta figura."""
+    return len(pio.to_json(figura, validate=False))
+
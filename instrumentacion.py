@@ -0,0 +1,110 @@
+# instrumentacion.py
+
+"""
+Medición de las etapas del pipeline: tiempo, filas de entrada y salida y variación de memoria.
+Cada hilo (una sesión de Streamlit corre en su propio hilo) junta los registros de su corrida
+actual; si se activa el log JSONL, la corrida se agrega entera al terminar, para seguir regresiones en el tiempo.
+No depende de Streamlit.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+# Log estructurado (una línea JSON por etapa), desactivado por defecto: se activa con la ruta del archivo,
+# por ejemplo DELITOS_LOG_ETAPAS=.logs_delitos/etapas.jsonl.
+RUTA_LOG_ETAPAS = os.environ.get("DELITOS_LOG_ETAPAS", "")
+# Al superar este tamaño el log se rota a "<ruta>.1" (se conserva una sola rotación).
+MAX_MB_LOG_ETAPAS = float(os.environ.get("DELITOS_LOG_ETAPAS_MAX_MB", "50"))
+
+_PAGINA_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_local = threading.local()
+_candado_log = threading.Lock()
+
+
+@dataclass
+class RegistroEtapa:
+    """Una etapa medida. `filas_salida` vale lo mismo que `filas_entrada` si la etapa no la fija."""
+    nombre: str
+    filas_entrada: Optional[int] = None
+    filas_salida: Optional[int] = None
+    segundos: float = 0.0
+    memoria_delta_mb: float = 0.0
+    nivel: int = 0
+    detalle: Dict[str, Any] = field(default_factory=dict)
+
+
+def memoria_actual_mb() -> float:
+    """Memoria residente del proceso (RSS). Fuera de Linux se usa lo asignado según tracemalloc, si está activo."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA_BYTES / 2**20
+    except (OSError, ValueError, IndexError):
+        import tracemalloc
+        return tracemalloc.get_traced_memory()[0] / 2**20 if tracemalloc.is_tracing() else 0.0
+
+
+def iniciar_corrida() -> str:
+    """Empieza una corrida nueva en este hilo (un rerun del dashboard) y devuelve su identificador."""
+    _local.corrida = uuid.uuid4().hex[:12]
+    _local.registros = []
+    _local.volcados = 0
+    _local.nivel = 0
+    return _local.corrida
+
+
+def registros_corrida() -> List[RegistroEtapa]:
+    """Etapas medidas en la corrida actual de este hilo, en el orden en que empezaron."""
+    return list(getattr(_local, "registros", []))
+
+
+@contextmanager
+def etapa(nombre: str, filas: Optional[int] = None, **detalle: Any) -> Iterator[RegistroEtapa]:
+    """
+    Mide el bloque `with`: tiempo de reloj, filas y variación de RSS. Dentro del bloque se pueden fijar
+    `registro.filas_salida` y agregar datos a `registro.detalle`. Las etapas anidadas suben de nivel.
+    """
+    registro = RegistroEtapa(nombre=nombre, filas_entrada=filas, nivel=getattr(_local, "nivel", 0), detalle=detalle)
+    _local.nivel = registro.nivel + 1
+    # Se agrega al empezar, así la lista queda en orden de inicio (cada etapa antes de sus sub-etapas).
+    if hasattr(_local, "registros"): _local.registros.append(registro)
+    memoria_inicial = memoria_actual_mb()
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro.segundos = time.perf_counter() - inicio
+        registro.memoria_delta_mb = memoria_actual_mb() - memoria_inicial
+        if registro.filas_salida is None: registro.filas_salida = registro.filas_entrada
+        _local.nivel = registro.nivel
+
+
+def volcar_log() -> int:
+    """
+    Agrega al log de RUTA_LOG_ETAPAS, en una sola escritura, las etapas de la corrida de este hilo que aún no
+    estaban en él; se llama al terminar la corrida. Las líneas de una corrida quedan juntas aunque otras
+    sesiones escriban a la vez, y las etapas medidas fuera de una corrida (en los procesos de un pool) no
+    se escriben. Devuelve las líneas agregadas.
+    """
+    pendientes = registros_corrida()[getattr(_local, "volcados", 0):]
+    if not RUTA_LOG_ETAPAS or not pendientes: return 0
+    marca, pid, corrida = time.time(), os.getpid(), getattr(_local, "corrida", None)
+    lineas = "".join(json.dumps({"marca": marca, "pid": pid, "corrida": corrida, **asdict(registro)}, default=str) + "\n"
+                     for registro in pendientes)
+    # El log es diagnóstico: si no se puede escribir, el pipeline sigue igual.
+    try:
+        with _candado_log:
+            directorio = os.path.dirname(RUTA_LOG_ETAPAS)
+            if directorio: os.makedirs(directorio, exist_ok=True)
+            if os.path.exists(RUTA_LOG_ETAPAS) and os.path.getsize(RUTA_LOG_ETAPAS) > MAX_MB_LOG_ETAPAS * 2**20:
+                os.replace(RUTA_LOG_ETAPAS, RUTA_LOG_ETAPAS + ".1")
+            with open(RUTA_LOG_ETAPAS, "a", encoding="utf-8") as f: f.write(lineas)
+    except OSError:
+        return 0
+    _local.volcados = getattr(_local, "volcados", 0) + len(pendientes)
+    return len(pendientes)
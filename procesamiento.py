@@ -0,0 +1,829 @@
+# procesamiento.py
+
+"""
+Preprocesamiento y limpieza de datos del Dashboard de Delitos Ambientales.
+Estas funciones no dependen de Streamlit, así se pueden usar desde scripts y benchmarks.
+"""
+
+import hashlib
+import io
+import os
+import re
+from itertools import repeat
+import pandas as pd
+import numpy as np
+from typing import Callable, Dict, List, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+from almacenamiento import (
+    leer_cache, guardar_cache, guardar_cache_por_bloques, ruta_cache, leer_attrs_cache, anexar_a_cache,
+    leer_hashes, guardar_hashes, leer_cubo, guardar_cubo, guardar_origen, origenes_guardados,
+)
+from analisis import construir_cubo, combinar_cubos
+from instrumentacion import etapa
+
+# Versión de las reglas de limpieza. Se sube cada vez que cambie el resultado del pipeline,
+# así las entradas viejas de la caché en disco dejan de coincidir.
+VERSION_LIMPIEZA = "5"
+
+# Ingesta por bloques: memoria que puede usar la limpieza y tamaño de archivo a partir del cual se activa sola.
+PRESUPUESTO_MEMORIA_MB = int(os.environ.get("DELITOS_PRESUPUESTO_MB", "512"))
+UMBRAL_STREAMING_MB = int(os.environ.get("DELITOS_UMBRAL_STREAMING_MB", "1024"))
+# Un bloque llega a ocupar unas 4 veces su tamaño crudo mientras se limpia (crudo + limpio + temporales).
+FACTOR_PICO_LIMPIEZA = 4
+FILAS_MUESTRA = 10_000
+MIN_FILAS_BLOQUE = 1_000
+# Junto a cada entrada de la caché se guardan los hashes de sus filas, para deduplicar cargas posteriores.
+PERSISTIR_HASHES = os.environ.get("DELITOS_PERSISTIR_HASHES", "1") == "1"
+
+# Formatos de fecha que se prueban sobre una muestra del export; en empate gana el primero (día primero).
+FORMATOS_FECHA: List[str] = [
+    "%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %I:%M:%S %p", "%d-%m-%Y",
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d",
+    "%m/%d/%Y", "%m/%d/%Y %I:%M:%S %p",
+]
+MUESTRA_FECHAS = 500
+
+# Columnas de texto que se guardan como categorías (códigos enteros + tabla de valores).
+COLUMNAS_CATEGORICAS = ['DEPARTAMENTO', 'MUNICIPIO', 'DESCRIPCION_CONDUCTA', 'ARTICULO', 'ZONA', 'FECHA_HECHO']
+# Cualquier otra columna de texto también se vuelve categórica si sus valores distintos no pasan de esta fracción.
+FRACCION_MAX_CATEGORIA = 0.5
+
+# Esquema de ingesta: columnas del export que usa el dashboard (por su nombre canónico) y su tipo de lectura.
+# Las demás se leen como texto solo para el hash de duplicados y no se guardan; la cantidad se lee como número
+# y, si trae texto, como texto (se convierte al limpiar).
+ESQUEMA_INGESTA: Dict[str, str] = {
+    'DEPARTAMENTO': 'str', 'MUNICIPIO': 'str', 'FECHA_HECHO': 'str',
+    'DESCRIPCION_CONDUCTA': 'str', 'ZONA': 'str', 'CANTIDAD': 'float64',
+}
+# Otras formas del encabezado (ya pasadas por limpiar_texto) y el nombre canónico al que corresponden.
+ALIAS_COLUMNAS: Dict[str, str] = {
+    'DEPTO': 'DEPARTAMENTO', 'DEPARTAMENTO_HECHO': 'DEPARTAMENTO', 'MUNICIPIO_HECHO': 'MUNICIPIO',
+    'FECHA': 'FECHA_HECHO', 'FECHA_DEL_HECHO': 'FECHA_HECHO', 'FECHA_DE_HECHO': 'FECHA_HECHO',
+    'CONDUCTA': 'DESCRIPCION_CONDUCTA', 'DESCRIPCION_DE_LA_CONDUCTA': 'DESCRIPCION_CONDUCTA',
+    'ZONA_HECHO': 'ZONA',
+}
+# Hash de fila de las columnas que el esquema descarta; vive solo hasta eliminar_duplicados.
+COLUMNA_HASH_DESCARTADAS = 'HASH_COLUMNAS_DESCARTADAS'
+# Motor de read_csv para las lecturas completas ("pyarrow" o "c"); la lectura por bloques siempre usa "c".
+MOTOR_CSV = os.environ.get("DELITOS_MOTOR_CSV", "pyarrow")
+
+# Diccionario de reemplazos (CORREGIDO)
+REEMPLAZOS_CARACTERES: Dict[str, str] = {
+    "Ã‘O": "NO", "Ã‘o": "NO", "Ã‘": "N", "Ã±": "N", "Ñ": "N", "ñ": "N",
+    "Ã¡": "A", "Ã©": "E", "Ã­": "I", "Ã³": "O", "Ãº": "U", "Á": "A", "É": "E",
+    "Í": "I", "Ó": "O", "Ú": "U", "ÃÁ": "A", "ÃÉ": "E", "ÃÍ": "I", "ÃÓ": "O", 
+    "ÃÚ": "U", "ÃA": "A", "ÃE": "E", "ÃI": "I", "ÃO": "O", "ÃU": "U", "á": "A", 
+    "é": "E", "í": "I", "ó": "O", "ú": "U", "Ã¼": "U", "Ãœ": "U", "Ü": "U", 
+    "ü": "U", "¿": "", "?": "", "¡": "", "!": "", "Â¿": "", "Â¡": "",
+    "ï¿½": "", "Â": "", "â€œ": "", "â€": "", "â€™": "", "â€¢": "", "â€": "",
+    "â€\"": "", "\u2122": "", "\u00AE": "", "\u00A9": "", "\u00BA": "", "\u00AA": "", 
+    "\u20AC": "", "$": "", "\u00A3": "", "\u00BC": "", "\u00BD": "", "\u00BE": "",
+}
+
+# ==============================================================================
+# LAS FUNCIONES CLAVE DE PREPROCESAMIENTO Y LIMPIEZA DE DATOS
+# ==============================================================================
+
+# Todas las claves en una sola alternancia, las más largas primero: cada texto se recorre
+# una vez y "Ã‘O" gana sobre "Ã‘" sin depender del orden del diccionario.
+_PATRON_REEMPLAZOS = re.compile(
+    "|".join(re.escape(malo) for malo in sorted(REEMPLAZOS_CARACTERES, key=len, reverse=True))
+)
+
+def _reemplazar_coincidencia(coincidencia: re.Match) -> str:
+    return REEMPLAZOS_CARACTERES[coincidencia.group(0)]
+
+def _corregir_caracteres(texto: Any) -> str:
+    # Esta pequeña función se hizo para corregir los caracteres dañados en una sola pasada.
+    if pd.isna(texto): return ""
+    return _PATRON_REEMPLAZOS.sub(_reemplazar_coincidencia, str(texto).strip())
+
+def corregir_caracteres_serie(serie: pd.Series) -> pd.Series:
+    """Versión vectorizada de `_corregir_caracteres` sobre una columna completa."""
+    texto = serie.where(serie.notna(), "").astype(str).str.strip()
+    return texto.str.replace(_PATRON_REEMPLAZOS, _reemplazar_coincidencia, regex=True)
+
+def limpiar_texto(texto: Any, mayusculas: bool = True, espacios_a_guion: bool = False) -> str:
+    # Función general que se usó para estandarizar el formato de las celdas.
+    if pd.isna(texto): return ""
+    texto = str(texto).strip()
+    texto = _corregir_caracteres(texto)
+    texto = " ".join(texto.split())
+    if mayusculas: texto = texto.upper()
+    if espacios_a_guion: texto = texto.replace(" ", "_")
+    if texto in ["NAN", "NONE", "NULL", ""]: return ""
+    return texto
+
+def limpiar_serie_texto(serie: pd.Series, mayusculas: bool = True, espacios_a_guion: bool = False) -> pd.Series:
+    """
+    Aplica `limpiar_texto` a una columna completa limpiando cada valor distinto una sola vez.
+    La columna se factoriza, se limpian solo los únicos y el resultado se reparte con indexación vectorizada.
+    """
+    codigos, unicos = pd.factorize(serie)
+    limpios = np.empty(len(unicos) + 1, dtype=object)
+    limpios[:-1] = [limpiar_texto(valor, mayusculas, espacios_a_guion) for valor in unicos]
+    # Los nulos quedan con código -1, que apunta a esta última posición.
+    limpios[-1] = ""
+    return pd.Series(limpios[codigos], index=serie.index, name=serie.name)
+
+def nombre_canonico(columna: str) -> str:
+    """Nombre limpio de una columna del encabezado; las variantes de ALIAS_COLUMNAS se llevan al canónico."""
+    col_limpia = limpiar_texto(columna, mayusculas=True, espacios_a_guion=True)
+    return ALIAS_COLUMNAS.get(col_limpia, col_limpia)
+
+def estandarizar_nombres_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    # Aquí se hizo el trabajo de limpiar los nombres de las columnas para facilitar el manejo.
+    # La copia es superficial: solo cambian las etiquetas, los datos no se duplican.
+    df_copy = df.copy(deep=False)
+    columnas_nuevas: List[str] = []
+    for col in df_copy.columns:
+        columnas_nuevas.append(nombre_canonico(col))
+    df_copy.columns = columnas_nuevas
+    return df_copy
+
+def limpiar_columnas_texto(df: pd.DataFrame) -> pd.DataFrame:
+    # Esta parte se trabajó para asegurar la consistencia del texto en las celdas.
+    # Copia superficial: cada columna limpia reemplaza a la original sin copiar el resto del frame.
+    df_copy = df.copy(deep=False)
+    columnas_texto = df_copy.select_dtypes(include=['object']).columns.tolist()
+
+    for col in columnas_texto:
+        usar_guion = col not in ['DEPARTAMENTO', 'MUNICIPIO']
+        df_copy[col] = limpiar_serie_texto(df_copy[col], mayusculas=True, espacios_a_guion=usar_guion)
+    return df_copy
+
+
+# ==============================================================================
+# ESQUEMA DE INGESTA: SOLO LAS COLUMNAS QUE USA EL DASHBOARD, CON TIPOS DECLARADOS
+# ==============================================================================
+
+def columnas_ingesta(columnas: Iterable[str]) -> Dict[str, str]:
+    """
+    Tipo de lectura de cada columna cruda que está en ESQUEMA_INGESTA (por su nombre canónico); las demás
+    quedan fuera. Si dos columnas dan el mismo nombre vale la primera, y la cantidad es la primera columna
+    que contenga "CANTIDAD", como en limpiar_bloque.
+    """
+    tipos: Dict[str, str] = {}
+    canonicas = set()
+    for col in columnas:
+        canonica = nombre_canonico(col)
+        if 'CANTIDAD' in canonica: canonica = 'CANTIDAD'
+        if canonica in ESQUEMA_INGESTA and canonica not in canonicas:
+            tipos[col] = ESQUEMA_INGESTA[canonica]
+            canonicas.add(canonica)
+    return tipos
+
+def tipos_lectura(columnas: Iterable[str], tipos: Dict[str, str]) -> Dict[str, str]:
+    # Las columnas del esquema con su tipo; las descartadas, como texto (plegar_columnas_descartadas).
+    return {col: tipos.get(col, "str") for col in columnas}
+
+def plegar_columnas_descartadas(crudo: pd.DataFrame, tipos: Dict[str, str]) -> pd.DataFrame:
+    """
+    Reemplaza las columnas crudas que no están en `tipos` por COLUMNA_HASH_DESCARTADAS: el hash de sus valores
+    limpios, como los dejaría limpiar_bloque. Así eliminar_duplicados sigue distinguiendo dos registros que solo
+    difieren en esas columnas (GENERO, CODIGO_DANE, ...), igual que cuando se guardaban enteras.
+    """
+    descartadas = [col for col in crudo.columns if col not in tipos]
+    if not descartadas: return crudo
+    # Como en limpiar_serie_texto, cada valor distinto se limpia y se hashea una sola vez (los nulos quedan en "").
+    hashes: Dict[str, np.ndarray] = {}
+    for col in descartadas:
+        codigos, unicos = pd.factorize(crudo[col])
+        limpios = [limpiar_texto(valor, mayusculas=True, espacios_a_guion=True) for valor in unicos] + [""]
+        hashes[col] = pd.util.hash_array(np.asarray(limpios, dtype=object))[codigos]
+    df = crudo.drop(columns=descartadas)
+    df[COLUMNA_HASH_DESCARTADAS] = hash_filas(pd.DataFrame(hashes, index=crudo.index))
+    return df
+
+def leer_csv(abrir: Callable[[], Any], **opciones: Any) -> pd.DataFrame:
+    """
+    read_csv con el esquema de ingesta: las columnas del dashboard con sus tipos y las demás plegadas en
+    un hash para la deduplicación, con MOTOR_CSV (o el `engine` que se pase).
+    `abrir()` devuelve el origen (se llama una vez por lectura). Si el encabezado no trae ninguna columna
+    conocida, se lee todo como antes; si la cantidad no es numérica, se relee esa columna como texto.
+    """
+    columnas = pd.read_csv(abrir(), nrows=0).columns
+    tipos = columnas_ingesta(columnas)
+    motor = opciones.pop("engine", MOTOR_CSV)
+    if not tipos: return pd.read_csv(abrir(), **opciones)
+    # El motor de pyarrow no acepta nrows.
+    if "nrows" in opciones: motor = "c"
+    try:
+        crudo = pd.read_csv(abrir(), dtype=tipos_lectura(columnas, tipos), engine=motor, **opciones)
+    except ValueError:
+        crudo = pd.read_csv(abrir(), dtype="str", engine=motor, **opciones)
+    return plegar_columnas_descartadas(crudo, tipos)
+
+
+# ==============================================================================
+# PIPELINE DE CARGA CON CACHÉ EN DISCO
+# ==============================================================================
+
+def huella_origen(data_input: Any) -> str:
+    """Huella del contenido del archivo fuente más la versión de las reglas de limpieza."""
+    huella = hashlib.blake2b(digest_size=16)
+    if isinstance(data_input, (str, os.PathLike)):
+        with open(data_input, "rb") as archivo:
+            for bloque in iter(lambda: archivo.read(1 << 20), b""): huella.update(bloque)
+    else:
+        huella.update(data_input.getvalue())
+    huella.update(f"limpieza-v{VERSION_LIMPIEZA}".encode())
+    return huella.hexdigest()
+
+def _abrir_origen(data_input: Any) -> Any:
+    # Las rutas se leen directo del disco; los archivos subidos se envuelven en un buffer nuevo en cada lectura.
+    return data_input if isinstance(data_input, (str, os.PathLike)) else io.BytesIO(data_input.getvalue())
+
+def _tamanio_origen(data_input: Any) -> int:
+    if isinstance(data_input, (str, os.PathLike)): return os.path.getsize(data_input)
+    return len(data_input.getvalue())
+
+def limpiar_bloque(df_crudo: pd.DataFrame, formato_fecha: Optional[str] = None) -> pd.DataFrame:
+    """
+    Limpieza fila a fila del CSV crudo: columnas, texto, año, cantidad y artículo.
+    No toca los duplicados, así sirve igual para el archivo completo que para un bloque suelto.
+    Para un bloque que se anexa a un dataset ya limpio, `formato_fecha` es el formato de ese dataset.
+    """
+    filas = len(df_crudo)
+    with etapa("limpieza.nombres_columnas", filas):
+        df = estandarizar_nombres_columnas(df_crudo)
+    with etapa("limpieza.texto", filas):
+        df = limpiar_columnas_texto(df)
+    
+    # Se convirtió la fecha una sola vez, con el formato detectado en una muestra, en año, mes y día del año.
+    with etapa("limpieza.fechas", filas):
+        if 'FECHA_HECHO' in df.columns:
+            partes_fecha = parsear_fechas(df['FECHA_HECHO'], formato_fecha)
+            for col in partes_fecha.columns: df[col] = partes_fecha[col]
+            df.attrs['formato_fecha'] = partes_fecha.attrs['formato_fecha']
+        else: df['ANIO'] = 0 
+        
+    # Se hizo la unificación de la columna de cantidad.
+    with etapa("limpieza.cantidad", filas):
+        columnas_cantidad = [col for col in df.columns if 'CANTIDAD' in col]
+        if columnas_cantidad:
+            col_cantidad = columnas_cantidad[0]
+            if col_cantidad != 'CANTIDAD':
+                df = df.rename(columns={col_cantidad: 'CANTIDAD'})
+            df['CANTIDAD'] = pd.to_numeric(df['CANTIDAD'], errors='coerce').fillna(0).astype(int)
+        else: df['CANTIDAD'] = 1 
+
+    # Las columnas de texto ya quedan sin nulos al limpiarlas; las numéricas conservan su tipo
+    # (antes un fillna("") las volvía object y cada bloque terminaba con un esquema distinto).
+
+    # Se hizo la extracción del artículo de delito para una mejor categorización.
+    with etapa("limpieza.articulo", filas):
+        if 'DESCRIPCION_CONDUCTA' in df.columns:
+            df['ARTICULO'] = df['DESCRIPCION_CONDUCTA'].astype(str).str.split('.').str[0]
+            df['ARTICULO'] = limpiar_serie_texto(df['ARTICULO'], espacios_a_guion=False)
+
+    with etapa("limpieza.compactar_tipos", filas):
+        return compactar_tipos(df)
+
+def detectar_formato_fecha(textos: pd.Series, preferido: Optional[str] = None) -> Optional[str]:
+    """
+    Prueba FORMATOS_FECHA sobre una muestra de fechas y devuelve el que convierte más valores. Si `preferido`
+    (el del dataset al que se van a anexar) convierte tantos como el mejor, gana el empate: unas pocas fechas
+    con el día ≤ 12 no deciden entre día y mes primero.
+    """
+    muestra = textos[textos != ""].head(MUESTRA_FECHAS)
+    mejor_formato, mejor_aciertos = None, 0
+    for formato in ([preferido] if preferido else []) + [f for f in FORMATOS_FECHA if f != preferido]:
+        aciertos = pd.to_datetime(muestra, format=formato, errors='coerce').notna().sum()
+        if aciertos > mejor_aciertos: mejor_formato, mejor_aciertos = formato, aciertos
+    return mejor_formato
+
+def parsear_fechas(fechas: pd.Series, formato_preferido: Optional[str] = None) -> pd.DataFrame:
+    """
+    Convierte FECHA_HECHO en ANIO, MES y DIA_ANIO (0 = fecha inválida) con un formato explícito
+    (detectar_formato_fecha, con `formato_preferido` en los empates).
+    Solo se convierte cada fecha distinta una vez y el resultado se reparte por código.
+    """
+    codigos, unicos = pd.factorize(fechas)
+    # La limpieza cambia los espacios por "_" ("01/02/2010_12:00:00_AM"); se revierte para convertir.
+    textos = pd.Series(np.asarray(unicos, dtype=object)).astype(str).str.replace("_", " ")
+    formato = detectar_formato_fecha(textos, formato_preferido)
+    convertidas = pd.to_datetime(textos, format=formato, errors='coerce') if formato else pd.Series(pd.NaT, index=textos.index)
+
+    # Para las fechas que no convierten se conserva la regla anterior: el año son los últimos 4 caracteres.
+    anio_texto = pd.to_numeric(textos.str[-4:], errors='coerce')
+    anio = convertidas.dt.year.fillna(anio_texto).fillna(0)
+
+    def _repartir(valores: pd.Series, tipo: type) -> np.ndarray:
+        # El código -1 (fecha nula) cae en el 0 agregado al final.
+        return np.append(valores.fillna(0).to_numpy(dtype=tipo), tipo(0))[codigos]
+
+    partes = pd.DataFrame({
+        'ANIO': _repartir(anio, np.int16),
+        'MES': _repartir(convertidas.dt.month, np.int8),
+        'DIA_ANIO': _repartir(convertidas.dt.dayofyear, np.int16),
+    }, index=fechas.index)
+    partes.attrs['formato_fecha'] = formato
+    return partes
+
+def contar_fechas_invalidas(df: pd.DataFrame) -> int:
+    """Registros cuya FECHA_HECHO está vacía o no se pudo convertir (MES = 0)."""
+    return int((df['MES'] == 0).sum()) if 'MES' in df.columns else 0
+
+def compactar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja el dataset limpio con un esquema compacto: categorías para el texto repetido,
+    int16 para el año y el día del año, int8 para el mes e int32 para la cantidad (si el rango lo permite).
+    Es idempotente, así se puede aplicar otra vez al leer la caché.
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Categorías siempre ordenadas alfabéticamente, aunque vengan de bloques distintos.
+            if not serie.cat.categories.is_monotonic_increasing:
+                df[col] = serie.cat.reorder_categories(serie.cat.categories.sort_values())
+        elif pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            if col in COLUMNAS_CATEGORICAS or serie.nunique() <= FRACCION_MAX_CATEGORIA * len(serie):
+                df[col] = serie.astype('category')
+
+    if 'ANIO' in df.columns: df['ANIO'] = df['ANIO'].astype(np.int16)
+    if 'MES' in df.columns: df['MES'] = df['MES'].astype(np.int8)
+    if 'DIA_ANIO' in df.columns: df['DIA_ANIO'] = df['DIA_ANIO'].astype(np.int16)
+    if 'CANTIDAD' in df.columns:
+        limites = np.iinfo(np.int32)
+        cabe = df.empty or (df['CANTIDAD'].min() >= limites.min and df['CANTIDAD'].max() <= limites.max)
+        df['CANTIDAD'] = df['CANTIDAD'].astype(np.int32 if cabe else np.int64)
+    return df
+
+def uso_memoria_por_columna(df: pd.DataFrame) -> pd.Series:
+    """Bytes que ocupa cada columna (contando el contenido real de los textos)."""
+    return df.memory_usage(deep=True, index=False)
+
+def solo_lectura(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Misma tabla, sin copiar, con los arreglos de las columnas numéricas y los códigos de las categóricas
+    marcados como de solo lectura: así se puede compartir un solo objeto entre todas las sesiones, y una
+    escritura en el lugar falla en vez de cambiarle los datos a las demás. Asignar una columna sigue
+    siendo posible; con Copy-on-Write solo afecta al objeto que la recibe.
+    """
+    columnas: Dict[str, Any] = {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.array.codes
+            codigos.flags.writeable = False
+            columnas[col] = pd.Categorical.from_codes(codigos, dtype=serie.dtype, validate=False)
+        elif isinstance(serie.dtype, np.dtype):
+            valores = serie.to_numpy()
+            valores.flags.writeable = False
+            columnas[col] = valores
+        else: columnas[col] = serie.array
+    compartido = pd.DataFrame(columnas, index=df.index, copy=False)
+    compartido.attrs.update(df.attrs)
+    return compartido
+
+def limpiar_dataset(df_delitos: pd.DataFrame, vistos: Optional["ConjuntoHashes"] = None) -> pd.DataFrame:
+    # Aquí se hizo la limpieza completa del CSV crudo ya cargado en memoria.
+    return eliminar_duplicados(limpiar_bloque(df_delitos), vistos)
+
+# ==============================================================================
+# ELIMINACIÓN DE DUPLICADOS POR HASH DE FILA
+# ==============================================================================
+
+def hash_filas(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash de 64 bits por fila, vectorizado columna por columna. Las categóricas se hashean una vez por
+    categoría y luego por código, con el mismo resultado que el texto: una fila da el mismo hash
+    venga de un bloque compactado o no. Con 10 millones de filas, la probabilidad de que dos filas
+    distintas choquen es del orden de 1e-6.
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+class ConjuntoHashes:
+    """
+    Hashes de las filas ya aceptadas, ordenados (8 bytes por fila), para reconocer duplicados entre
+    bloques y entre cargas. Se guarda en disco junto a la entrada de la caché (almacenamiento.guardar_hashes).
+    """
+
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        self.hashes = np.empty(0, dtype=np.uint64) if hashes is None else np.sort(hashes)
+        self.duplicados = 0
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def agregar(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Máscara de las filas a conservar: la primera aparición de cada hash que no estuviera ya en el conjunto.
+        Los hashes conservados pasan a formar parte del conjunto.
+        """
+        conservar = ~pd.Series(hashes).duplicated().to_numpy()
+        if len(self.hashes):
+            posiciones = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            conservar &= self.hashes[posiciones] != hashes
+        # Los dos tramos ya vienen ordenados: el sort estable (timsort) solo los mezcla.
+        self.hashes = np.sort(np.concatenate([self.hashes, np.sort(hashes[conservar])]), kind="stable")
+        self.duplicados += len(hashes) - int(conservar.sum())
+        return conservar
+
+def eliminar_duplicados(df: pd.DataFrame, vistos: Optional[ConjuntoHashes] = None) -> pd.DataFrame:
+    """
+    Se eliminaron los duplicados encontrados en el set de datos en una sola pasada: un hash por fila
+    y la primera aparición de cada uno. Con `vistos` también se descartan las filas que ya estaban
+    en el conjunto (bloques o cargas anteriores). El conteo queda en attrs['duplicados_eliminados'].
+    El hash de las columnas descartadas entra en el de la fila y después se quita.
+    """
+    with etapa("limpieza.duplicados", len(df)) as registro:
+        hashes = hash_filas(df)
+        if vistos is None: conservar = ~pd.Series(hashes).duplicated().to_numpy()
+        else: conservar = vistos.agregar(hashes)
+        duplicados = len(df) - int(conservar.sum())
+        if duplicados: df = df[conservar].reset_index(drop=True)
+        if COLUMNA_HASH_DESCARTADAS in df.columns: df = df.drop(columns=COLUMNA_HASH_DESCARTADAS)
+        df.attrs['duplicados_eliminados'] = df.attrs.get('duplicados_eliminados', 0) + duplicados
+        registro.filas_salida = len(df)
+    return df
+
+def cargar_datos_limpios(
+    data_input: Any,
+    usar_cache: bool = True,
+    por_bloques: Optional[bool] = None,
+    presupuesto_mb: int = PRESUPUESTO_MEMORIA_MB,
+    procesos: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Carga el CSV y devuelve el dataset limpio. Con `usar_cache` se consulta primero la caché en disco
+    (clave: huella del archivo + versión de limpieza) y, si no hay entrada, se limpia y se guarda.
+    Los archivos de más de UMBRAL_STREAMING_MB (o con `por_bloques=True`) se limpian por bloques,
+    escribiendo cada bloque en la caché a medida que sale, con la memoria acotada por `presupuesto_mb`.
+    Los demás se limpian en `procesos` procesos (None = automático, 1 = serial).
+    Al escribir la caché se guardan también los hashes de las filas (PERSISTIR_HASHES). Si el archivo
+    es un export anterior con filas agregadas al final, solo se limpian esas filas (cargar_incremental).
+    """
+    if data_input is None: return pd.DataFrame()
+
+    try:
+        huella = huella_origen(data_input)
+        if por_bloques is None: por_bloques = _tamanio_origen(data_input) > UMBRAL_STREAMING_MB * 2**20
+    except (FileNotFoundError, OSError, AttributeError):
+        return pd.DataFrame()
+
+    with etapa("cache_disco.lectura") as registro:
+        df = leer_cache(huella) if usar_cache else None
+        registro.filas_salida = None if df is None else len(df)
+        registro.detalle['acierto'] = df is not None
+    es_ruta = isinstance(data_input, (str, os.PathLike))
+    if df is None and usar_cache and es_ruta: df = cargar_incremental(data_input, huella)
+    vistos = ConjuntoHashes() if usar_cache and PERSISTIR_HASHES else None
+    if df is None and por_bloques:
+        # El modo por bloques siempre escribe en la caché: es su destino incremental.
+        if not _limpiar_a_cache_por_bloques(data_input, huella, presupuesto_mb, vistos): return pd.DataFrame()
+        df = leer_cache(huella)
+        if df is None: return pd.DataFrame()
+    elif df is None:
+        if procesos is None: procesos = procesos_limpieza(data_input)
+        # Si los bloques del modo paralelo no coinciden en esquema, se sigue por el camino serial.
+        if procesos > 1: df = limpiar_en_paralelo(data_input, procesos, vistos)
+        if df is None:
+            try:
+                with etapa("lectura_csv") as registro:
+                    df_delitos = leer_csv(lambda: _abrir_origen(data_input))
+                    registro.filas_salida = len(df_delitos)
+            except FileNotFoundError:
+                return pd.DataFrame()
+            except Exception:
+                return pd.DataFrame()
+            df = limpiar_dataset(df_delitos, vistos)
+        if usar_cache:
+            with etapa("cache_disco.escritura", len(df)):
+                if guardar_cache(huella, df) and vistos is not None: guardar_hashes(huella, vistos.hashes)
+
+    if usar_cache and es_ruta: guardar_origen(huella, _tamanio_origen(data_input))
+
+    # Las entradas escritas por bloques traen categorías sin ordenar; compactar_tipos las normaliza.
+    with etapa("compactar_tipos", len(df)):
+        df = compactar_tipos(df)
+    df.attrs["huella"] = huella
+    return df
+
+def asegurar_cache(data_input: Any, presupuesto_mb: int = PRESUPUESTO_MEMORIA_MB) -> Optional[str]:
+    """
+    Deja el dataset limpio en la caché en disco y devuelve su huella, o None si no se pudo. A diferencia
+    de cargar_datos_limpios no lo devuelve: si ya está en la caché o se limpia por bloques, no pasa
+    entero por memoria (lo usa el backend SQLite).
+    """
+    if data_input is None: return None
+    try:
+        huella = huella_origen(data_input)
+        por_bloques = _tamanio_origen(data_input) > UMBRAL_STREAMING_MB * 2**20
+    except (FileNotFoundError, OSError, AttributeError):
+        return None
+    if os.path.exists(ruta_cache(huella)): return huella
+    if not por_bloques:
+        df = cargar_datos_limpios(data_input, presupuesto_mb=presupuesto_mb)
+        return huella if not df.empty and os.path.exists(ruta_cache(huella)) else None
+    vistos = ConjuntoHashes() if PERSISTIR_HASHES else None
+    if not _limpiar_a_cache_por_bloques(data_input, huella, presupuesto_mb, vistos): return None
+    if isinstance(data_input, (str, os.PathLike)): guardar_origen(huella, _tamanio_origen(data_input))
+    return huella
+
+
+# ==============================================================================
+# INGESTA POR BLOQUES (STREAMING) PARA EXPORTS QUE NO CABEN EN MEMORIA
+# ==============================================================================
+
+def planificar_bloques(data_input: Any, presupuesto_mb: int = PRESUPUESTO_MEMORIA_MB) -> Tuple[int, Dict[str, str]]:
+    """
+    Con una muestra del inicio del archivo se estima cuántas filas caben en el presupuesto de memoria
+    y se fijan los tipos de lectura, para que todos los bloques salgan con el mismo esquema.
+    Devuelve los tipos solo de las columnas que se leen (las del esquema de ingesta).
+    """
+    muestra = leer_csv(lambda: _abrir_origen(data_input), nrows=FILAS_MUESTRA)
+    bytes_por_fila = muestra.memory_usage(deep=True).sum() / max(len(muestra), 1)
+    filas_bloque = int(presupuesto_mb * 2**20 / (bytes_por_fila * FACTOR_PICO_LIMPIEZA))
+
+    # Numérico completo en la muestra -> float64 (admite nulos en bloques posteriores); lo demás, texto.
+    tipos: Dict[str, str] = {}
+    for col in muestra.columns.drop(COLUMNA_HASH_DESCARTADAS, errors='ignore'):
+        numerica = pd.api.types.is_numeric_dtype(muestra[col]) and muestra[col].notna().all()
+        tipos[col] = "float64" if numerica else "str"
+    return max(filas_bloque, MIN_FILAS_BLOQUE), tipos
+
+def limpiar_por_bloques(
+    data_input: Any, presupuesto_mb: int = PRESUPUESTO_MEMORIA_MB, vistos: Optional[ConjuntoHashes] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee el CSV en bloques de tamaño fijo y entrega cada bloque limpio y sin duplicados, también entre bloques
+    (y contra `vistos`, si trae hashes de cargas anteriores). Cada bloque lleva en attrs el conteo acumulado.
+    """
+    filas_bloque, tipos = planificar_bloques(data_input, presupuesto_mb)
+    if vistos is None: vistos = ConjuntoHashes()
+
+    columnas = pd.read_csv(_abrir_origen(data_input), nrows=0).columns
+    with pd.read_csv(_abrir_origen(data_input), chunksize=filas_bloque, dtype=tipos_lectura(columnas, tipos)) as lector:
+        for bloque_crudo in lector:
+            bloque = limpiar_bloque(plegar_columnas_descartadas(bloque_crudo, tipos))
+            del bloque_crudo
+            bloque = eliminar_duplicados(bloque, vistos)
+            bloque.attrs['duplicados_eliminados'] = vistos.duplicados
+            yield bloque
+
+def _limpiar_a_cache_por_bloques(
+    data_input: Any, huella: str, presupuesto_mb: int, vistos: Optional[ConjuntoHashes],
+) -> bool:
+    # Limpia por bloques directo a la entrada `huella` (y sus hashes); False si el archivo no se pudo leer.
+    try:
+        with etapa("limpieza_por_bloques") as registro:
+            registro.filas_salida = guardar_cache_por_bloques(huella, limpiar_por_bloques(data_input, presupuesto_mb, vistos))
+    except (OSError, ValueError):
+        return False
+    if vistos is not None: guardar_hashes(huella, vistos.hashes)
+    return True
+
+
+# ==============================================================================
+# LIMPIEZA EN PARALELO POR RANGOS DE BYTES
+# ==============================================================================
+
+# Por debajo de este tamaño por proceso, arrancar el pool cuesta más de lo que se gana.
+MIN_MB_POR_PROCESO = float(os.environ.get("DELITOS_MIN_MB_POR_PROCESO", "32"))
+
+def procesos_limpieza(data_input: Any) -> int:
+    """
+    Procesos para limpiar `data_input`: uno por CPU disponible, sin bajar de MIN_MB_POR_PROCESO
+    por proceso. DELITOS_PROCESOS_LIMPIEZA lo fija a mano. Los archivos subidos se limpian en serie.
+    """
+    if not isinstance(data_input, (str, os.PathLike)): return 1
+    if os.environ.get("DELITOS_PROCESOS_LIMPIEZA"): return max(1, int(os.environ["DELITOS_PROCESOS_LIMPIEZA"]))
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    por_tamanio = int(os.path.getsize(data_input) / (MIN_MB_POR_PROCESO * 2**20))
+    return max(1, min(cpus, por_tamanio))
+
+def rangos_de_bytes(ruta: str, partes: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Encabezado del CSV y `partes` rangos [inicio, fin) que empiezan y terminan en un salto de línea.
+    Supone, como el export de la Fiscalía, que ningún registro tiene saltos de línea dentro de comillas.
+    """
+    tamanio = os.path.getsize(ruta)
+    with open(ruta, "rb") as f:
+        encabezado = f.readline()
+        cortes = [len(encabezado)]
+        for i in range(1, partes):
+            f.seek(max(cortes[-1], len(encabezado) + (tamanio - len(encabezado)) * i // partes))
+            f.readline()
+            cortes.append(min(f.tell(), tamanio))
+    cortes.append(tamanio)
+    rangos = [(inicio, fin) for inicio, fin in zip(cortes, cortes[1:]) if fin > inicio]
+    return encabezado, rangos
+
+def _limpiar_rango(ruta: str, encabezado: bytes, inicio: int, fin: int,
+                   formato_fecha: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    # Corre en un proceso del pool: lee solo su rango y devuelve el bloque limpio y los tipos leídos.
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        contenido = encabezado + f.read(fin - inicio)
+    crudo = leer_csv(lambda: io.BytesIO(contenido))
+    return limpiar_bloque(crudo, formato_fecha), {col: str(tipo) for col, tipo in crudo.dtypes.items()}
+
+def _unir_bloques(bloques: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena los bloques columna por columna. Las categóricas se unen sobre sus códigos
+    (union_categoricals), sin pasar por texto; una columna que en algún bloque no quedó como
+    categoría se une como texto y compactar_tipos decide sobre el total, igual que el camino serial.
+    """
+    columnas = {}
+    for col in bloques[0].columns:
+        series = [bloque[col] for bloque in bloques]
+        if all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            columnas[col] = pd.api.types.union_categoricals(series, sort_categories=True)
+        elif any(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            columnas[col] = pd.concat([s.astype(str) for s in series], ignore_index=True)
+        else:
+            columnas[col] = pd.concat(series, ignore_index=True)
+    return compactar_tipos(pd.DataFrame(columnas, copy=False))
+
+def limpiar_en_paralelo(ruta: str, procesos: int, vistos: Optional[ConjuntoHashes] = None) -> Optional[pd.DataFrame]:
+    """
+    Limpia el CSV en `procesos` rangos de bytes en un pool de procesos y une los bloques en orden,
+    con el mismo resultado que read_csv + limpiar_dataset. Devuelve None si los bloques no son
+    comparables (tipos leídos o formato de fecha distintos, o un rango que no se pudo leer):
+    en ese caso quien llama sigue por el camino serial.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # forkserver: el servidor de Streamlit tiene varios hilos y hacer fork de él no es seguro.
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+    encabezado, rangos = rangos_de_bytes(ruta, procesos)
+    with etapa("limpieza_paralela", procesos=len(rangos)) as registro:
+        try:
+            with ProcessPoolExecutor(max_workers=len(rangos), mp_context=contexto) as pool:
+                resultados = list(pool.map(_limpiar_rango, repeat(ruta), repeat(encabezado),
+                                           [i for i, _ in rangos], [f for _, f in rangos]))
+        except (ValueError, UnicodeDecodeError, BrokenProcessPool):
+            return None
+        bloques = [bloque for bloque, _ in resultados]
+        tipos_leidos = {tuple(tipos.items()) for _, tipos in resultados}
+        formatos = {bloque.attrs.get('formato_fecha') for bloque in bloques}
+        if len(tipos_leidos) > 1 or len(formatos) > 1:
+            registro.detalle['serial'] = "bloques con esquema distinto"
+            return None
+        registro.filas_entrada = sum(len(bloque) for bloque in bloques)
+        df = _unir_bloques(bloques)
+        df.attrs['formato_fecha'] = formatos.pop()
+    return eliminar_duplicados(df, vistos)
+
+
+# ==============================================================================
+# INGESTA INCREMENTAL: SOLO LAS FILAS QUE SE AGREGARON AL EXPORT
+# ==============================================================================
+
+def cubo_del_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cubo del dataset limpio: el que está guardado junto a su entrada de la caché (la ingesta incremental
+    lo deja actualizado) o, si no hay, uno nuevo que queda guardado para las próximas actualizaciones.
+    """
+    huella = df.attrs.get('huella')
+    cubo = leer_cubo(huella) if huella else None
+    if cubo is None:
+        cubo = construir_cubo(df)
+        if huella and not cubo.empty and os.path.exists(ruta_cache(huella)): guardar_cubo(huella, cubo)
+    cubo.attrs.update(df.attrs)
+    cubo.attrs['filas_origen'] = len(df)
+    return cubo
+
+def _huellas_de_prefijos(ruta: str, cortes: List[int]) -> Dict[int, str]:
+    """Huella (la de huella_origen) de los primeros `corte` bytes del archivo, para cada corte, en una sola lectura."""
+    huella = hashlib.blake2b(digest_size=16)
+    huellas: Dict[int, str] = {}
+    leidos = 0
+    with open(ruta, "rb") as archivo:
+        for corte in sorted(set(cortes)):
+            while leidos < corte:
+                bloque = archivo.read(min(1 << 20, corte - leidos))
+                if not bloque: return huellas
+                huella.update(bloque)
+                leidos += len(bloque)
+            prefijo = huella.copy()
+            prefijo.update(f"limpieza-v{VERSION_LIMPIEZA}".encode())
+            huellas[corte] = prefijo.hexdigest()
+    return huellas
+
+def buscar_base_incremental(ruta: str) -> Optional[Tuple[str, int]]:
+    """
+    Entrada de la caché cuyo archivo fuente es un prefijo de `ruta` (el export del mes anterior):
+    devuelve su huella y su tamaño en bytes, o None. Si hay varias, la más larga.
+    """
+    tamanio = os.path.getsize(ruta)
+    candidatas = [(bytes_base, huella) for huella, bytes_base in origenes_guardados().items() if bytes_base < tamanio]
+    if not candidatas: return None
+    huellas = _huellas_de_prefijos(ruta, [bytes_base for bytes_base, _ in candidatas])
+    coinciden = [(bytes_base, huella) for bytes_base, huella in candidatas if huellas.get(bytes_base) == huella]
+    if not coinciden: return None
+    bytes_base, huella = max(coinciden)
+    return huella, bytes_base
+
+def anexar_delta(huella_base: str, huella: str, delta: pd.DataFrame) -> bool:
+    """
+    Deja en la entrada `huella` el dataset de `huella_base` más las filas limpias de `delta`: se descartan
+    las que ya estaban (con los hashes guardados de la base), se agregan como una parte nueva y el cubo
+    guardado se actualiza sumando el cubo del delta. Devuelve False si el delta no es compatible con la base:
+    otras columnas o tipos, o fechas leídas con otro formato (el delta se limpia con el de la base como
+    preferido, así que solo difiere si sus fechas de verdad no lo siguen).
+    """
+    hashes_base = leer_hashes(huella_base)
+    # Sin los hashes guardados no se pueden recalcular: las filas de la base ya no tienen las columnas descartadas.
+    if hashes_base is None: return False
+    attrs = leer_attrs_cache(huella_base)
+    # Como en limpiar_en_paralelo: un formato distinto cambiaría día y mes en unas filas y no en otras.
+    if attrs.get('formato_fecha') != delta.attrs.get('formato_fecha'): return False
+    vistos = ConjuntoHashes(hashes_base)
+    delta = eliminar_duplicados(delta, vistos)
+    attrs['duplicados_eliminados'] = attrs.get('duplicados_eliminados', 0) + delta.attrs['duplicados_eliminados']
+    if not anexar_a_cache(huella_base, huella, delta, attrs): return False
+    if PERSISTIR_HASHES: guardar_hashes(huella, vistos.hashes)
+
+    cubo_base = leer_cubo(huella_base)
+    if cubo_base is not None:
+        cubo = combinar_cubos(cubo_base, construir_cubo(delta))
+        cubo.attrs['huella'] = huella
+        guardar_cubo(huella, cubo)
+    return True
+
+def cargar_incremental(ruta: str, huella: str) -> Optional[pd.DataFrame]:
+    """
+    Si `ruta` es un export ya limpiado con filas agregadas al final, limpia solo esas filas, las anexa
+    a la entrada anterior y devuelve el dataset completo. El costo crece con el delta, no con la historia
+    (la lectura del Parquet final y la mezcla de hashes sí recorren todo, pero no se limpia nada de nuevo).
+    Devuelve None si no hay una base o si el delta no se puede anexar: quien llama limpia todo el archivo.
+    """
+    encontrada = buscar_base_incremental(ruta)
+    if encontrada is None: return None
+    huella_base, bytes_base = encontrada
+    with etapa("incremental", base=huella_base) as registro:
+        with open(ruta, "rb") as f: encabezado = f.readline()
+        formato = leer_attrs_cache(huella_base).get('formato_fecha')
+        try:
+            delta, _ = _limpiar_rango(ruta, encabezado, bytes_base, os.path.getsize(ruta), formato)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, ValueError, KeyError):
+            return None
+        registro.filas_entrada = len(delta)
+        if delta.empty or not anexar_delta(huella_base, huella, delta): return None
+    return leer_cache(huella)
+
+def huella_con_delta(huella_base: str, delta: str) -> str:
+    """
+    Huella del dataset de `huella_base` con las filas del CSV `delta` anexadas. Depende solo de las dos:
+    volver a anexar el mismo delta encuentra la entrada ya hecha en lugar de duplicar sus filas.
+    """
+    return hashlib.blake2b(f"{huella_base}+{huella_origen(delta)}".encode(), digest_size=16).hexdigest()
+
+def _reconstruir_con_deltas(ruta: str, deltas: Sequence[str], huella: str) -> pd.DataFrame:
+    """
+    Limpieza completa del export y de los deltas, para cuando un delta no se puede anexar a la entrada anterior.
+    Cada delta se limpia con el formato de fecha del export como preferido; uno cuyas fechas siguen otro formato
+    se convierte con el suyo (en vez de perder sus fechas) y queda anotado en el registro de la etapa.
+    """
+    vistos = ConjuntoHashes() if PERSISTIR_HASHES else None
+    with etapa("incremental.reconstruccion", deltas=len(deltas)) as registro:
+        bloques = [limpiar_bloque(leer_csv(lambda: _abrir_origen(ruta)))]
+        formato = bloques[0].attrs.get('formato_fecha')
+        bloques += [limpiar_bloque(leer_csv(lambda origen=origen: _abrir_origen(origen)), formato) for origen in deltas]
+        distintos = [origen for origen, bloque in zip(deltas, bloques[1:]) if bloque.attrs.get('formato_fecha') != formato]
+        if distintos: registro.detalle['formato_fecha_distinto'] = distintos
+        registro.filas_entrada = sum(len(bloque) for bloque in bloques)
+        df = compactar_tipos(pd.concat(bloques, ignore_index=True))
+        df.attrs['formato_fecha'] = formato
+        df = eliminar_duplicados(df, vistos)
+        registro.filas_salida = len(df)
+    if guardar_cache(huella, df) and vistos is not None: guardar_hashes(huella, vistos.hashes)
+    return df
+
+def cargar_con_deltas(ruta: str, deltas: Sequence[str]) -> pd.DataFrame:
+    """
+    Dataset limpio del export `ruta` más las filas de los CSV `deltas` (las de cada mes), anexadas en orden
+    sin escribir en ningún archivo de entrada. Cada delta se limpia solo y se anexa a la entrada de la caché
+    del paso anterior (anexar_delta), con la huella de huella_con_delta: correr de nuevo con los mismos
+    deltas no agrega nada. Si un delta no es compatible con esa entrada (otras columnas o tipos), se limpia
+    todo de nuevo, el export y los deltas hasta ese.
+    """
+    df = cargar_datos_limpios(ruta)
+    if df.empty or not deltas: return df
+    huella = df.attrs['huella']
+    reconstruido: Optional[pd.DataFrame] = None
+    for i, delta in enumerate(deltas):
+        huella_base, huella = huella, huella_con_delta(huella, delta)
+        if os.path.exists(ruta_cache(huella)): continue
+        with etapa("incremental.delta", base=huella_base) as registro:
+            formato = leer_attrs_cache(huella_base).get('formato_fecha') if os.path.exists(ruta_cache(huella_base)) else None
+            bloque = limpiar_bloque(leer_csv(lambda: _abrir_origen(delta)), formato)
+            registro.filas_entrada = len(bloque)
+            anexado = anexar_delta(huella_base, huella, bloque)
+            registro.detalle['reconstruccion'] = not anexado
+        reconstruido = None if anexado else _reconstruir_con_deltas(ruta, deltas[:i + 1], huella)
+
+    # Si la última reconstrucción no se pudo guardar en la caché, se usa la que quedó en memoria.
+    df = leer_cache(huella) if reconstruido is None or os.path.exists(ruta_cache(huella)) else reconstruido
+    if df is None: return pd.DataFrame()
+    with etapa("compactar_tipos", len(df)):
+        df = compactar_tipos(df)
+    df.attrs["huella"] = huella
+    return df
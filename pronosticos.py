@@ -0,0 +1,195 @@
+# pronosticos.py
+
+"""
+Pronóstico de los casos mensuales de cada departamento y de cada artículo con modelos estacionales livianos,
+solo con NumPy: Holt-Winters aditivo (parámetros elegidos en una grilla, todas las combinaciones y series a la vez)
+o, si ajusta peor, el ingenuo estacional (el mismo mes del año anterior). Las series se reparten en bloques entre
+los procesos de un pool. El resultado queda en memoria y junto a la entrada de la caché en disco, por huella:
+solo se vuelve a ajustar cuando cambian los datos.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import product
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import guardar_pronosticos, leer_pronosticos, ruta_cache
+from analisis import MemoLRU, matriz_mensual
+from instrumentacion import etapa
+
+# Meses que se pronostican después del último mes con datos; se puede cambiar por variable de entorno.
+HORIZONTE_MESES = int(os.environ.get("DELITOS_HORIZONTE_PRONOSTICO", "12"))
+DIMENSIONES_PRONOSTICO = ('DEPARTAMENTO', 'ARTICULO')
+MESES_TEMPORADA = 12
+# Grilla de Holt-Winters: suavizado del nivel, de la tendencia (0 = sin tendencia) y de la estacionalidad.
+GRILLA_ALFA = (0.1, 0.3, 0.5, 0.8)
+GRILLA_BETA = (0.0, 0.05, 0.2)
+GRILLA_GAMMA = (0.05, 0.2, 0.5)
+# Con menos series por proceso, arrancar el pool cuesta más que ajustarlas en serie.
+MIN_SERIES_POR_PROCESO = int(os.environ.get("DELITOS_MIN_SERIES_POR_PROCESO", "256"))
+
+# Pronósticos ya calculados, por huella del dataset.
+MAX_MEMO_PRONOSTICOS = 16
+_MEMO_PRONOSTICOS = MemoLRU(MAX_MEMO_PRONOSTICOS)
+
+MODELOS = ['holt_winters', 'ingenuo_estacional', 'media']
+
+
+def _holt_winters(casos: np.ndarray, horizonte: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Holt-Winters aditivo de todas las columnas de `casos` (mes × serie) con cada combinación de la grilla a la vez:
+    el estado tiene forma combinación × serie y el único bucle es sobre los meses. Se inicializa con la primera
+    temporada y se queda, por serie, con la combinación de menor error absoluto medio a un paso.
+    Devuelve el pronóstico (horizonte × serie) y ese error.
+    """
+    m = MESES_TEMPORADA
+    n_meses, n_series = casos.shape
+    grilla = np.array(list(product(GRILLA_ALFA, GRILLA_BETA, GRILLA_GAMMA)))
+    alfa, beta, gamma = (grilla[:, i:i + 1] for i in range(3))
+    nivel = np.tile(casos[:m].mean(axis=0), (len(grilla), 1))
+    tendencia = np.zeros_like(nivel)
+    estacion = np.tile(casos[:m] - casos[:m].mean(axis=0), (len(grilla), 1, 1))
+    error = np.zeros_like(nivel)
+    for t in range(m, n_meses):
+        y, s = casos[t], estacion[:, t % m]
+        error += np.abs(y - (nivel + tendencia + s))
+        nivel_nuevo = alfa * (y - s) + (1 - alfa) * (nivel + tendencia)
+        tendencia = beta * (nivel_nuevo - nivel) + (1 - beta) * tendencia
+        estacion[:, t % m] = gamma * (y - nivel_nuevo) + (1 - gamma) * s
+        nivel = nivel_nuevo
+
+    series = np.arange(n_series)
+    mejor = error.argmin(axis=0)
+    pasos = np.arange(1, horizonte + 1)
+    temporada = (n_meses - 1 + pasos) % m
+    pronostico = (nivel[mejor, series] + pasos[:, None] * tendencia[mejor, series]
+                  + estacion[mejor[None, :], temporada[:, None], series[None, :]])
+    return np.clip(pronostico, 0, None), error[mejor, series] / (n_meses - m)
+
+
+def _ajustar_bloque(casos: np.ndarray, horizonte: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Corre en un proceso del pool (o en serie): pronóstico, código de modelo (índice en MODELOS) y error absoluto
+    medio a un paso de cada columna de `casos`. Con dos temporadas o más compiten Holt-Winters y el ingenuo
+    estacional; con una sola queda el ingenuo; con menos, la media.
+    """
+    m = MESES_TEMPORADA
+    n_meses, n_series = casos.shape
+    if n_meses < m:
+        return (np.tile(casos.mean(axis=0), (horizonte, 1)), np.full(n_series, MODELOS.index('media')),
+                np.abs(casos - casos.mean(axis=0)).mean(axis=0))
+    ingenuo = casos[n_meses - m + np.arange(horizonte) % m]
+    error_ingenuo = np.abs(casos[m:] - casos[:-m]).mean(axis=0) if n_meses > m else np.full(n_series, np.nan)
+    if n_meses < 2 * m:
+        return ingenuo, np.full(n_series, MODELOS.index('ingenuo_estacional')), error_ingenuo
+    holt_winters, error_hw = _holt_winters(casos, horizonte)
+    usa_hw = error_hw <= error_ingenuo
+    return (np.where(usa_hw, holt_winters, ingenuo), np.where(usa_hw, 0, MODELOS.index('ingenuo_estacional')),
+            np.where(usa_hw, error_hw, error_ingenuo))
+
+
+def procesos_pronostico(n_series: int) -> int:
+    """
+    Procesos para ajustar `n_series`: uno por CPU disponible, sin bajar de MIN_SERIES_POR_PROCESO series
+    por proceso. DELITOS_PROCESOS_PRONOSTICO lo fija a mano. Dentro de un proceso del pool del modo batch, en serie.
+    """
+    if multiprocessing.current_process().daemon: return 1
+    if os.environ.get("DELITOS_PROCESOS_PRONOSTICO"): return max(1, int(os.environ["DELITOS_PROCESOS_PRONOSTICO"]))
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    return max(1, min(cpus, n_series // MIN_SERIES_POR_PROCESO))
+
+
+def _ajustar(casos: np.ndarray, horizonte: int, procesos: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Las columnas se reparten en bloques contiguos; si el pool falla, se ajustan en serie.
+    if procesos > 1:
+        bloques = [casos[:, columnas] for columnas in np.array_split(np.arange(casos.shape[1]), procesos)]
+        # forkserver: el servidor de Streamlit tiene varios hilos y hacer fork de él no es seguro.
+        metodos = multiprocessing.get_all_start_methods()
+        contexto = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                resultados = list(pool.map(_ajustar_bloque, bloques, [horizonte] * procesos))
+            return tuple(np.concatenate(partes, axis=-1) for partes in zip(*resultados))
+        except BrokenProcessPool:
+            pass
+    return _ajustar_bloque(casos, horizonte)
+
+
+def calcular_pronosticos(df: pd.DataFrame, horizonte: int = HORIZONTE_MESES,
+                         procesos: Optional[int] = None) -> pd.DataFrame:
+    """
+    Pronóstico de los `horizonte` meses que siguen al último mes con datos, para cada valor de
+    DIMENSIONES_PRONOSTICO: DIMENSION, VALOR, ANIO, MES, PRONOSTICO, MODELO y ERROR_MEDIO (error absoluto medio
+    a un paso del modelo elegido). attrs lleva el último año y mes con datos. Vacío si no hay meses válidos.
+    """
+    matrices: List[Tuple[str, pd.Index, Tuple[int, np.ndarray]]] = []
+    ultimo = None
+    for dimension in DIMENSIONES_PRONOSTICO:
+        if dimension not in df.columns: continue
+        resultado = matriz_mensual(df, dimension)
+        if resultado is None: continue
+        primero, valores, casos = resultado
+        ultimo = max(ultimo or 0, primero + len(casos) - 1)
+        matrices.append((dimension, valores, (primero, casos)))
+    if not matrices: return pd.DataFrame(columns=['DIMENSION', 'VALOR', 'ANIO', 'MES', 'PRONOSTICO', 'MODELO', 'ERROR_MEDIO'])
+
+    # Todas las series terminan en el mismo mes (el último del cubo) para ajustarse juntas.
+    inicio = min(primero for _, _, (primero, _) in matrices)
+    casos = np.zeros((ultimo - inicio + 1, sum(len(valores) for _, valores, _ in matrices)))
+    columna = 0
+    for _, valores, (primero, parcial) in matrices:
+        casos[primero - inicio:primero - inicio + len(parcial), columna:columna + len(valores)] = parcial
+        columna += len(valores)
+    procesos = procesos or procesos_pronostico(casos.shape[1])
+    with etapa("pronosticos.ajuste", casos.shape[1], procesos=procesos):
+        pronostico, modelo, error = _ajustar(casos, horizonte, procesos)
+
+    periodos = ultimo + 1 + np.arange(horizonte)
+    n_series = casos.shape[1]
+    dimensiones = np.concatenate([[dimension] * len(valores) for dimension, valores, _ in matrices])
+    nombres = np.concatenate([np.asarray(valores, dtype=object) for _, valores, _ in matrices])
+    tabla = pd.DataFrame({
+        'DIMENSION': pd.Categorical(np.repeat(dimensiones, horizonte), categories=list(DIMENSIONES_PRONOSTICO)),
+        'VALOR': pd.Categorical(np.repeat(nombres, horizonte)),
+        'ANIO': np.tile(periodos // 12, n_series).astype(np.int16),
+        'MES': np.tile(periodos % 12 + 1, n_series).astype(np.int8),
+        'PRONOSTICO': pronostico.T.ravel(),
+        'MODELO': pd.Categorical.from_codes(np.repeat(modelo, horizonte), categories=MODELOS),
+        'ERROR_MEDIO': np.repeat(error, horizonte),
+    })
+    tabla.attrs.update({'ultimo_anio': int(ultimo // 12), 'ultimo_mes': int(ultimo % 12 + 1)})
+    return tabla
+
+
+def pronosticos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    calcular_pronosticos memorizado por huella del dataset. Si la huella tiene entrada en la caché en disco,
+    los pronósticos se guardan a su lado y se leen de allí en el próximo arranque (se desalojan con ella).
+    """
+    huella = df.attrs.get('huella')
+
+    def calcular() -> pd.DataFrame:
+        en_disco = huella is not None and os.path.exists(ruta_cache(huella))
+        tabla = leer_pronosticos(huella) if en_disco else None
+        if tabla is None:
+            with etapa("pronosticos", len(df)): tabla = calcular_pronosticos(df)
+            if en_disco and not tabla.empty: guardar_pronosticos(huella, tabla)
+        return tabla
+
+    return calcular() if huella is None else _MEMO_PRONOSTICOS.obtener(huella, calcular)
+
+
+def memorizar_pronosticos(huella: str, tabla: pd.DataFrame) -> None:
+    """Deja en la memoria pronósticos ya calculados (por ejemplo, los que recibe un proceso del modo batch)."""
+    _MEMO_PRONOSTICOS.guardar(huella, tabla)
+
+
+def pronostico_de(tabla: pd.DataFrame, dimension: str, valor: str) -> pd.DataFrame:
+    """Filas de `tabla` de una serie (`valor` de `dimension`), en orden de mes."""
+    if tabla.empty: return tabla
+    return tabla[(tabla['DIMENSION'] == dimension).to_numpy() & (tabla['VALOR'] == valor).to_numpy()]
@@ -0,0 +1,52 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+# Los módulos del dashboard están en la raíz del repositorio.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import almacenamiento  # noqa: E402
+
+ENCABEZADO = ("DEPARTAMENTO,MUNICIPIO,CODIGO DANE,ARMAS MEDIOS,FECHA HECHO,GENERO,AGRUPA EDAD PERSONA,"
+              "CANTIDAD,DESCRIPCIÓN CONDUCTA,ZONA")
+DEPARTAMENTOS = ["ANTIOQUIA", "bogotá, d.c.", "META", "CHOCÓ"]
+CONDUCTAS = ["ARTÍCULO 328. APROVECHAMIENTO ILÍCITO DE LOS RECURSOS NATURALES RENOVABLES",
+             "ARTÍCULO 332. CONTAMINACIÓN AMBIENTAL", "ARTÍCULO 331. DAÑOS EN LOS RECURSOS NATURALES"]
+
+
+def fecha_de(i: int, dias: int = 28, mes_primero: bool = False) -> str:
+    """Fecha de la fila `i`: día (i // 3) % dias + 1 y mes i % 12 + 1 de 2018 a 2021, con el día o el mes primero."""
+    dia, mes = (i // 3) % dias + 1, i % 12 + 1
+    return f"{mes:02d}/{dia:02d}/{2018 + i % 4}" if mes_primero else f"{dia:02d}/{mes:02d}/{2018 + i % 4}"
+
+
+def filas_delitos(n: int, desde: int = 0, dias: int = 28, mes_primero: bool = False) -> list:
+    """`n` filas de CSV distintas entre sí (y de las de otro `desde`), con fechas de fecha_de."""
+    filas = []
+    for i in range(desde, desde + n):
+        departamento = DEPARTAMENTOS[i % len(DEPARTAMENTOS)]
+        fecha = fecha_de(i, dias, mes_primero)
+        filas.append(f'"{departamento}",MUNICIPIO {i % 7},{1000 + i},CONTUNDENTES,{fecha},'
+                     f'{"MASCULINO" if i % 2 else "FEMENINO"},ADULTOS,{i % 3 + 1},{CONDUCTAS[i % 3]},URBANA')
+    return filas
+
+
+@pytest.fixture
+def escribir_csv(tmp_path):
+    """Escribe un CSV de delitos en tmp_path con las filas dadas (y el encabezado dado) y devuelve su ruta."""
+    def escribir(nombre: str, filas: list, encabezado: str = ENCABEZADO) -> str:
+        ruta = tmp_path / nombre
+        ruta.write_text("\n".join([encabezado, *filas]) + "\n", encoding="utf-8")
+        return str(ruta)
+    return escribir
+
+
+@pytest.fixture(autouse=True)
+def cache_temporal(tmp_path, monkeypatch):
+    # Cada prueba con su propia caché en disco.
+    directorio = tmp_path / "cache"
+    monkeypatch.setattr(almacenamiento, "DIRECTORIO_CACHE", str(directorio))
+    return directorio
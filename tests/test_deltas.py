@@ -0,0 +1,125 @@
+# tests/test_deltas.py
+
+import os
+
+import pandas as pd
+
+from almacenamiento import ruta_cache
+from conftest import ENCABEZADO, fecha_de, filas_delitos
+from instrumentacion import iniciar_corrida, registros_corrida
+from procesamiento import cargar_con_deltas, cargar_datos_limpios, huella_con_delta, huella_origen
+
+
+def _sin_tocar(ruta: str, huella: str) -> bool:
+    return huella_origen(ruta) == huella
+
+
+def test_anexar_un_delta_sin_modificar_el_export(escribir_csv):
+    export = escribir_csv("export.csv", filas_delitos(200))
+    # Dos filas repetidas del export: no se vuelven a contar.
+    delta = escribir_csv("delta.csv", filas_delitos(50, desde=200) + filas_delitos(2))
+    huella_export = huella_origen(export)
+
+    iniciar_corrida()
+    df = cargar_con_deltas(export, [delta])
+
+    assert [r.detalle['reconstruccion'] for r in registros_corrida() if r.nombre == "incremental.delta"] == [False]
+    assert _sin_tocar(export, huella_export)
+    assert len(df) == 250
+    assert df['CANTIDAD'].sum() == sum(i % 3 + 1 for i in range(250))
+    assert df.attrs['huella'] == huella_con_delta(huella_export, delta)
+    assert os.path.isdir(ruta_cache(df.attrs['huella']))
+    # Correr de nuevo con el mismo delta no agrega filas.
+    assert len(cargar_con_deltas(export, [delta])) == 250
+
+
+def test_deltas_encadenados(escribir_csv):
+    export = escribir_csv("export.csv", filas_delitos(200))
+    enero = escribir_csv("enero.csv", filas_delitos(30, desde=200))
+    febrero = escribir_csv("febrero.csv", filas_delitos(20, desde=230))
+
+    iniciar_corrida()
+    df = cargar_con_deltas(export, [enero, febrero])
+    anexados = [r.detalle['reconstruccion'] for r in registros_corrida() if r.nombre == "incremental.delta"]
+    completo = cargar_datos_limpios(escribir_csv("completo.csv", filas_delitos(250)), usar_cache=False)
+
+    assert anexados == [False, False]
+    assert len(df) == len(completo) == 250
+    assert df.attrs['huella'] == huella_con_delta(huella_con_delta(huella_origen(export), enero), febrero)
+    columnas = ['DEPARTAMENTO', 'ANIO', 'MES', 'ARTICULO', 'CANTIDAD']
+    ordenar = lambda d: d[columnas].astype(str).sort_values(columnas).reset_index(drop=True)
+    pd.testing.assert_frame_equal(ordenar(df), ordenar(completo))
+    # El primer paso de la cadena quedó en la caché y sirve de base para el siguiente.
+    assert os.path.isdir(ruta_cache(huella_con_delta(huella_origen(export), enero)))
+
+
+def test_esquema_distinto_reconstruye_todo(escribir_csv):
+    export = escribir_csv("export.csv", filas_delitos(200))
+    # El delta no trae ZONA: no cabe en el esquema de la entrada del export.
+    filas = [fila.rsplit(",", 1)[0] for fila in filas_delitos(40, desde=200)]
+    delta = escribir_csv("delta.csv", filas, encabezado=ENCABEZADO.rsplit(",", 1)[0])
+    huella_export = huella_origen(export)
+
+    iniciar_corrida()
+    df = cargar_con_deltas(export, [delta])
+
+    assert [r.detalle['reconstruccion'] for r in registros_corrida() if r.nombre == "incremental.delta"] == [True]
+    assert any(r.nombre == "incremental.reconstruccion" for r in registros_corrida())
+    assert _sin_tocar(export, huella_export)
+    assert len(df) == 240
+    assert df['CANTIDAD'].sum() == sum(i % 3 + 1 for i in range(240))
+    assert (df['ZONA'] == "URBANA").sum() == 200
+    assert os.path.exists(ruta_cache(df.attrs['huella']))
+    assert len(cargar_con_deltas(export, [delta])) == 240
+
+
+def test_delta_con_fechas_ambiguas_usa_el_formato_de_la_base(escribir_csv):
+    # Export con el mes primero; en el delta todos los días son ≤ 12, así que los dos formatos convierten todo.
+    export = escribir_csv("export.csv", filas_delitos(200, mes_primero=True))
+    delta = escribir_csv("delta.csv", filas_delitos(40, desde=200, dias=12, mes_primero=True))
+
+    df = cargar_con_deltas(export, [delta])
+
+    assert df.attrs['formato_fecha'] == "%m/%d/%Y"
+    assert sorted(df['MES'].astype(int).tolist()) == sorted(i % 12 + 1 for i in range(240))
+
+
+def test_export_que_crece_solo_limpia_las_filas_nuevas(escribir_csv):
+    # El camino del dashboard: el mismo archivo con filas agregadas al final (cargar_incremental).
+    ruta = escribir_csv("export.csv", filas_delitos(200, mes_primero=True))
+    cargar_datos_limpios(ruta, procesos=1)
+    nuevas = filas_delitos(40, desde=200, dias=12, mes_primero=True) + filas_delitos(3, mes_primero=True)
+    with open(ruta, "a", encoding="utf-8") as f: f.write("\n".join(nuevas) + "\n")
+
+    iniciar_corrida()
+    df = cargar_datos_limpios(ruta, procesos=1)
+    registros = registros_corrida()
+    frio = cargar_datos_limpios(ruta, usar_cache=False, procesos=1)
+
+    incremental = [r for r in registros if r.nombre == "incremental"]
+    assert len(incremental) == 1 and incremental[0].filas_entrada == len(nuevas)
+    assert not any(r.nombre in ("lectura_csv", "limpieza_paralela") for r in registros)
+    assert all(r.filas_entrada == len(nuevas) for r in registros if r.nombre == "limpieza.texto")
+    assert len(df) == len(frio) == 240
+    assert df['CANTIDAD'].sum() == frio['CANTIDAD'].sum()
+    columnas = ['DEPARTAMENTO', 'ANIO', 'MES', 'DIA_ANIO', 'ARTICULO', 'CANTIDAD']
+    ordenar = lambda d: d[columnas].astype(str).sort_values(columnas).reset_index(drop=True)
+    pd.testing.assert_frame_equal(ordenar(df), ordenar(frio))
+
+
+def test_delta_con_otro_formato_de_fecha_reconstruye(escribir_csv):
+    export = escribir_csv("export.csv", filas_delitos(200, mes_primero=True))
+    # Fechas ISO: no se pueden anexar con el formato de la base; al reconstruir cada archivo usa el suyo.
+    filas = [fila.replace(fecha_de(i), f"{2018 + i % 4}-{i % 12 + 1:02d}-{(i // 3) % 28 + 1:02d}")
+             for i, fila in enumerate(filas_delitos(40, desde=200), start=200)]
+    delta = escribir_csv("delta.csv", filas)
+
+    iniciar_corrida()
+    df = cargar_con_deltas(export, [delta])
+
+    assert [r.detalle['reconstruccion'] for r in registros_corrida() if r.nombre == "incremental.delta"] == [True]
+    reconstruccion = next(r for r in registros_corrida() if r.nombre == "incremental.reconstruccion")
+    assert reconstruccion.detalle['formato_fecha_distinto'] == [delta]
+    assert len(df) == 240
+    assert (df['MES'] > 0).all()
+    assert sorted(df['MES'].astype(int).tolist()) == sorted(i % 12 + 1 for i in range(240))
@@ -0,0 +1,41 @@
+# tests/test_estacionalidad.py
+
+import numpy as np
+import pandas as pd
+
+from analisis import COLUMNAS_MEDIA_MES, calcular_estacionalidad, indice_estacional
+
+
+def _cubo(periodos, cantidad):
+    """Cubo de una sola serie (META × 328) con `cantidad(anio, mes)` casos en cada (anio, mes) de `periodos`."""
+    return pd.DataFrame({
+        'ANIO': [anio for anio, _ in periodos], 'MES': [mes for _, mes in periodos],
+        'DEPARTAMENTO': "META", 'ARTICULO': "ARTICULO 328",
+        'CANTIDAD': [cantidad(anio, mes) for anio, mes in periodos],
+    })
+
+
+def test_pico_con_temporadas_completas():
+    periodos = [(anio, mes) for anio in (2023, 2024) for mes in range(1, 13)]
+    tabla = calcular_estacionalidad(_cubo(periodos, lambda anio, mes: 30 if mes == 9 else 10))
+    fila = tabla.series.iloc[0]
+    assert fila['MES_PICO'] == 9
+    assert np.isclose(fila['INDICE_PICO'], 30 / (140 / 12))
+
+
+def test_sin_temporada_completa_no_hay_pico():
+    # Solo de marzo a octubre de 2025, como con el filtro de años 2025-2025 a mitad de año.
+    periodos = [(2025, mes) for mes in range(3, 11)]
+    tabla = calcular_estacionalidad(_cubo(periodos, lambda anio, mes: 20 if mes == 7 else 10))
+    fila = tabla.series.iloc[0]
+    assert fila['MES_PICO'] == 0
+    assert np.isnan(fila['INDICE_PICO'])
+    medias = fila[COLUMNAS_MEDIA_MES].to_numpy(dtype=float)
+    assert np.isnan(medias[[0, 1, 10, 11]]).all() and not np.isnan(medias[2:10]).any()
+
+    perfil = indice_estacional(tabla)
+    observados = perfil['MES'].between(3, 10)
+    assert perfil.loc[~observados, 'INDICE'].isna().all()
+    # Normalizado sobre los meses observados: su promedio es 1.
+    assert np.isclose(perfil.loc[observados, 'INDICE'].mean(), 1.0)
+    assert perfil.loc[perfil['INDICE'].idxmax(), 'MES'] == 7
@@ -0,0 +1,36 @@
+# tests/test_instrumentacion.py
+
+import json
+
+import instrumentacion
+from instrumentacion import etapa, iniciar_corrida, volcar_log
+
+
+def _corrida() -> str:
+    corrida = iniciar_corrida()
+    with etapa("carga", 10) as registro:
+        with etapa("carga.limpieza", 10): pass
+        registro.filas_salida = 8
+    return corrida
+
+
+def test_sin_ruta_no_se_escribe_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentacion, "RUTA_LOG_ETAPAS", "")
+    monkeypatch.chdir(tmp_path)
+    _corrida()
+    assert volcar_log() == 0
+    assert not any(tmp_path.iterdir())
+
+
+def test_la_corrida_se_escribe_una_vez_al_volcar(tmp_path, monkeypatch):
+    ruta = tmp_path / "logs" / "etapas.jsonl"
+    monkeypatch.setattr(instrumentacion, "RUTA_LOG_ETAPAS", str(ruta))
+    corrida = _corrida()
+    # Las etapas no escriben nada mientras corren.
+    assert not ruta.exists()
+
+    assert volcar_log() == 2
+    assert volcar_log() == 0
+    lineas = [json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines()]
+    assert [(l["nombre"], l["nivel"], l["corrida"]) for l in lineas] == [("carga", 0, corrida), ("carga.limpieza", 1, corrida)]
+    assert lineas[0]["filas_salida"] == 8
@@ -0,0 +1,37 @@
+# tests/test_kpis.py
+
+import pandas as pd
+
+from analisis import calcular_kpis, calcular_tendencias
+
+
+def _cubo(departamentos, articulos):
+    return pd.DataFrame({
+        'ANIO': [2020, 2021] * (len(departamentos) // 2), 'MES': 1,
+        'DEPARTAMENTO': departamentos, 'ARTICULO': articulos, 'CANTIDAD': range(1, len(departamentos) + 1),
+    })
+
+
+def test_mas_frecuente_con_varios_valores():
+    kpis = calcular_kpis(_cubo(["META", "META", "CHOCO", "CHOCO"], ["ARTICULO 328"] * 3 + ["ARTICULO 332"]))
+    assert kpis.departamento_mas_afectado == "CHOCO"
+    assert kpis.delito_mas_frecuente == "ARTICULO 328"
+
+
+def test_mas_frecuente_con_un_solo_valor():
+    # Con un departamento filtrado, el más afectado es ese mismo (antes salía "N/A" y se ocultaban los focos).
+    kpis = calcular_kpis(_cubo(["META", "META"], ["ARTICULO 328", "ARTICULO 328"]))
+    assert kpis.departamento_mas_afectado == "META"
+    assert kpis.delito_mas_frecuente == "ARTICULO 328"
+
+
+def test_anio_parcial_sin_registros_sin_mes():
+    # 2021 llega hasta junio: se estima con la razón frente a enero-junio de 2020 (15 / 10), sin contar
+    # en ese período los registros de 2020 con MES = 0.
+    cubo = pd.DataFrame({
+        'ANIO': [2020, 2020, 2020, 2021], 'MES': [3, 9, 0, 6],
+        'DEPARTAMENTO': "META", 'ARTICULO': "ARTICULO 328", 'CANTIDAD': [10, 50, 40, 15],
+    })
+    tendencias = calcular_tendencias(cubo)
+    assert tendencias.meses_ultimo_anio == 6
+    assert tendencias.casos[:, 0].tolist() == [100, 150]
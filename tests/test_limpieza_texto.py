@@ -0,0 +1,38 @@
+# tests/test_limpieza_texto.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import _limpiar_columnas_texto_por_celda
+from procesamiento import limpiar_columnas_texto, limpiar_serie_texto
+
+VALORES = [
+    "NARIÃ‘O", "nariño", "  Nariño  ", None, np.nan, "", "   ", "nan", "NULL", "None",
+    "bogotá, d.c.", "BOGOTÃ, D.C.", "San  Andrés", "ARTÃCULO 328. CONTAMINACIÃ“N AMBIENTAL",
+    "artículo 328.   contaminación ambiental", "Rural", " URBANA", "NARIÃ‘O",
+]
+
+
+def _crudo(dtype) -> pd.DataFrame:
+    n = len(VALORES)
+    return pd.DataFrame({
+        'DEPARTAMENTO': pd.Series(VALORES, dtype=dtype),
+        'DESCRIPCION_CONDUCTA': pd.Series(VALORES[::-1], dtype=dtype),
+        'ZONA': pd.Series([None] * n, dtype=dtype),
+        'CANTIDAD': np.arange(n),
+    })
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_por_unicos_igual_que_por_celda(dtype):
+    # Nulos (código -1 de factorize → ""), mojibake, espacios de más y textos que equivalen a vacío.
+    crudo = _crudo(dtype)
+    pd.testing.assert_frame_equal(limpiar_columnas_texto(crudo), _limpiar_columnas_texto_por_celda(crudo))
+
+
+def test_columna_con_valores_mezclados():
+    serie = pd.Series(["Meta", 3, None, 3.5, "meta", np.nan, " META "], dtype=object)
+    esperado = ["META", "3", "", "3.5", "META", "", "META"]
+    assert limpiar_serie_texto(serie).tolist() == esperado
+    assert limpiar_serie_texto(serie).index.equals(serie.index)
@@ -0,0 +1,30 @@
+# tests/test_memo.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+from analisis import MemoLRU
+
+
+def test_memo_lru_desaloja_la_menos_usada():
+    memo = MemoLRU(2)
+    memo.guardar("a", 1)
+    memo.guardar("b", 2)
+    assert memo.obtener("a", lambda: -1) == 1
+    memo.guardar("c", 3)
+    assert len(memo) == 2
+    assert memo.obtener("a", lambda: -1) == 1
+    # "b" se desalojó: se vuelve a calcular.
+    assert memo.obtener("b", lambda: -1) == -1
+
+
+def test_memo_lru_entre_hilos():
+    # Muchas sesiones leyendo y desalojando a la vez: sin el candado, otra podía desalojar la clave entre
+    # la consulta y move_to_end (KeyError).
+    memo = MemoLRU(8)
+
+    def sesion(i: int) -> bool:
+        return all(memo.obtener(clave % 24, lambda: clave % 24) == clave % 24 for clave in range(i, i + 2000))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(sesion, range(32)))
+    assert len(memo) == 8
@@ -0,0 +1,26 @@
+# tests/test_reemplazos.py
+
+import numpy as np
+import pandas as pd
+
+from benchmark import _corregir_caracteres_secuencial, muestras_mojibake
+from procesamiento import REEMPLAZOS_CARACTERES, _corregir_caracteres, corregir_caracteres_serie
+
+
+def test_regex_igual_al_bucle_anterior_en_las_muestras():
+    # Departamentos, conductas y zonas en sus tres escrituras (correcta, con mojibake y en minúsculas).
+    muestras = muestras_mojibake() + [None, np.nan, "", "  NARIÃ‘O  "]
+    assert [_corregir_caracteres(t) for t in muestras] == [_corregir_caracteres_secuencial(t) for t in muestras]
+
+
+def test_serie_igual_a_la_version_por_texto():
+    muestras = muestras_mojibake() + [None, "  ARTÃCULO 328  "]
+    esperado = [_corregir_caracteres(t) for t in muestras]
+    assert corregir_caracteres_serie(pd.Series(muestras, dtype=object)).tolist() == esperado
+    assert corregir_caracteres_serie(pd.Series(muestras, dtype="str")).tolist() == esperado
+
+
+def test_cada_secuencia_se_reemplaza_entera():
+    # Gana la coincidencia más larga: "â€¢" no deja el "¢" suelto que dejaba el bucle al quitar antes "â€".
+    for malo, bueno in REEMPLAZOS_CARACTERES.items():
+        assert _corregir_caracteres(f"X{malo}Y") == f"X{bueno}Y"
@@ -0,0 +1,57 @@
+# tests/test_solo_lectura.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analisis import calcular_kpis, construir_cubo
+from conftest import filas_delitos
+from procesamiento import cargar_datos_limpios, solo_lectura
+
+
+@pytest.fixture
+def dataset(escribir_csv):
+    return cargar_datos_limpios(escribir_csv("export.csv", filas_delitos(300)), usar_cache=False)
+
+
+def test_comparte_los_arreglos_sin_copiar(dataset):
+    compartido = solo_lectura(dataset)
+    pd.testing.assert_frame_equal(compartido, dataset)
+    assert compartido.attrs == dataset.attrs
+    assert np.shares_memory(compartido['CANTIDAD'].to_numpy(), dataset['CANTIDAD'].to_numpy())
+    assert np.shares_memory(compartido['DEPARTAMENTO'].array.codes, dataset['DEPARTAMENTO'].array.codes)
+
+
+def test_una_escritura_en_el_lugar_falla(dataset):
+    compartido = solo_lectura(dataset)
+    with pytest.raises(ValueError): compartido['CANTIDAD'].to_numpy()[0] = 99
+    with pytest.raises(ValueError): compartido.loc[0, 'CANTIDAD'] = 99
+    with pytest.raises(ValueError): compartido['DEPARTAMENTO'].array.codes[0] = 0
+    pd.testing.assert_frame_equal(compartido, dataset)
+
+
+def test_asignar_una_columna_solo_afecta_a_esa_sesion(dataset):
+    # Con Copy-on-Write, la columna nueva queda solo en el objeto que la recibe.
+    compartido = solo_lectura(dataset)
+    sesion = compartido.copy(deep=False)
+    sesion['CANTIDAD'] = sesion['CANTIDAD'] * 2
+    assert (sesion['CANTIDAD'] == dataset['CANTIDAD'] * 2).all()
+    pd.testing.assert_frame_equal(compartido, dataset)
+
+
+def test_sesiones_concurrentes_sobre_el_mismo_objeto(dataset):
+    # Como con st.cache_resource: todas las sesiones reciben el mismo objeto y lo consultan a la vez.
+    compartido = solo_lectura(dataset)
+    esperado = (calcular_kpis(dataset), construir_cubo(dataset))
+
+    def sesion(_: int):
+        return calcular_kpis(compartido), construir_cubo(compartido)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        resultados = list(pool.map(sesion, range(32)))
+    for kpis, cubo in resultados:
+        assert kpis == esperado[0]
+        pd.testing.assert_frame_equal(cubo, esperado[1])
+    pd.testing.assert_frame_equal(compartido, dataset)